@@ -0,0 +1,190 @@
+"""
+Admission control for CPU-heavy routes
+
+Heavy computations (training and prediction) run through an
+AdmissionController: at most max_concurrent execute at once per worker,
+further ones wait in a priority queue, and a request that cannot start within
+the queue-time budget gets a fast 503 with Retry-After instead of tying up a
+thread. The queue is capped so heavy work (running plus waiting) never holds
+more than its share of the worker's threads, leaving the rest for light pages
+and /health. Admission happens inside single-flight computations, so requests
+coalesced onto an in-progress one do not take execution slots of their own;
+while they wait for its result (or for another worker's lock) they hold a
+place in the queue through hold(), under the same cap and a time budget.
+"""
+import heapq
+import itertools
+import logging
+import math
+import threading
+import time
+from flask import jsonify, make_response, request
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+QUEUE_DEPTH = REGISTRY.gauge(
+    'admission_queue_depth', 'Requests waiting for a heavy-route slot', ('pool',)
+)
+ACTIVE = REGISTRY.gauge(
+    'admission_active', 'Heavy-route requests currently executing', ('pool',)
+)
+DECISIONS = REGISTRY.counter(
+    'admission_requests_total', 'Admission decisions by result (admitted, queued, rejected, timeout)',
+    ('pool', 'result')
+)
+HOLDING = REGISTRY.gauge(
+    'admission_holding', 'Requests waiting for a coalesced or cross-worker heavy computation', ('pool',)
+)
+WAIT_TIME = REGISTRY.histogram(
+    'admission_wait_seconds', 'Time admitted requests spent queued', ('pool',)
+)
+
+class Overloaded(Exception):
+    """Raised when a request cannot be admitted within its queue-time budget"""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class _Waiter:
+    __slots__ = ('event', 'admitted', 'cancelled')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.admitted = False
+        self.cancelled = False
+
+class AdmissionController:
+    """Concurrency limit with a priority wait queue (lower priority value is served first)"""
+
+    def __init__(self, pool, max_concurrent=2, max_waiting=8, queue_budget=5.0):
+        self.pool = pool
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_waiting = max(0, max_waiting)
+        self.queue_budget = queue_budget
+        self._active = 0
+        self._waiting = 0
+        self._holding = 0
+        self._queue = []
+        self._sequence = itertools.count()
+        self._service_time = None
+        self._lock = threading.Lock()
+
+    def _retry_after(self):
+        """Seconds until a slot is likely free, from the average service time and queue length"""
+        service_time = self._service_time or self.queue_budget
+        return max(1, math.ceil(service_time * (self._waiting + 1) / self.max_concurrent))
+
+    def _estimated_wait(self):
+        if self._service_time is None:
+            return 0.0
+        return self._service_time * (self._waiting + 1) / self.max_concurrent
+
+    def _update_gauges(self):
+        QUEUE_DEPTH.set(self._waiting, pool=self.pool)
+        ACTIVE.set(self._active, pool=self.pool)
+        HOLDING.set(self._holding, pool=self.pool)
+
+    def _queue_full(self):
+        return self._waiting + self._holding >= self.max_waiting
+
+    def acquire(self, priority=0, budget=None):
+        """Block until admitted; raises Overloaded when the queue is full or the budget runs out"""
+        budget = self.queue_budget if budget is None else budget
+        with self._lock:
+            if self._active < self.max_concurrent and not self._waiting:
+                self._active += 1
+                self._update_gauges()
+                DECISIONS.inc(pool=self.pool, result='admitted')
+                return 0.0
+            if self._queue_full() or self._estimated_wait() > budget:
+                DECISIONS.inc(pool=self.pool, result='rejected')
+                raise Overloaded(f"{self.pool} is at capacity", self._retry_after())
+            waiter = _Waiter()
+            heapq.heappush(self._queue, (priority, next(self._sequence), waiter))
+            self._waiting += 1
+            self._update_gauges()
+            DECISIONS.inc(pool=self.pool, result='queued')
+
+        started = time.perf_counter()
+        waiter.event.wait(budget)
+        with self._lock:
+            if not waiter.admitted:
+                # Left in the heap and skipped by release(); only the count changes now
+                waiter.cancelled = True
+                self._waiting -= 1
+                self._update_gauges()
+                DECISIONS.inc(pool=self.pool, result='timeout')
+                raise Overloaded(f"Waited {budget}s for {self.pool}", self._retry_after())
+        waited = time.perf_counter() - started
+        WAIT_TIME.observe(waited, pool=self.pool)
+        return waited
+
+    def release(self, service_time=None):
+        """Free a slot, handing it straight to the highest-priority waiter if there is one"""
+        with self._lock:
+            if service_time is not None:
+                self._service_time = service_time if self._service_time is None \
+                    else 0.8 * self._service_time + 0.2 * service_time
+            while self._queue:
+                _, _, waiter = heapq.heappop(self._queue)
+                if waiter.cancelled:
+                    continue
+                waiter.admitted = True
+                self._waiting -= 1
+                self._update_gauges()
+                waiter.event.set()
+                return
+            self._active -= 1
+            self._update_gauges()
+
+    def hold(self, wait, budget=None):
+        """
+        Wait outside the queue while counting against it: wait(timeout) blocks
+        until another computation is done and returns False on timeout. The
+        default budget is the queue budget plus one service time, as long as a
+        queued request could take. Raises Overloaded when the queue is full or
+        the wait times out.
+        """
+        if budget is None:
+            budget = self.queue_budget + (self._service_time or self.queue_budget)
+        with self._lock:
+            if self._queue_full():
+                DECISIONS.inc(pool=self.pool, result='rejected')
+                raise Overloaded(f"{self.pool} is at capacity", self._retry_after())
+            self._holding += 1
+            self._update_gauges()
+        try:
+            if not wait(budget):
+                DECISIONS.inc(pool=self.pool, result='timeout')
+                raise Overloaded(f"Waited {budget}s for a shared {self.pool} computation",
+                                 self._retry_after())
+        finally:
+            with self._lock:
+                self._holding -= 1
+                self._update_gauges()
+
+    def call(self, function, *args, priority=0, **kwargs):
+        """Run function once admitted; raises Overloaded instead of waiting past the budget"""
+        self.acquire(priority)
+        started = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            self.release(time.perf_counter() - started)
+
+def overloaded_response(error):
+    """Fast 503 with Retry-After for a request that was not admitted"""
+    logger.warning(f"Rejected {request.path}: {error}")
+    if request.path.startswith('/api/'):
+        response = make_response(jsonify({'error': 'Server is busy, please retry shortly'}), 503)
+    else:
+        response = make_response('Server is busy, please retry shortly.', 503)
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+def heavy_capacity(worker_threads, light_reserved, max_concurrent):
+    """Queue length that keeps heavy requests within the threads not reserved for light routes"""
+    heavy_threads = max(1, int(worker_threads * (1 - light_reserved)))
+    return max(0, heavy_threads - max_concurrent)
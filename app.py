@@ -1,4 +1,4 @@
-from flask import Flask, render_template, request, jsonify, flash, redirect, url_for
+from flask import Flask, Response, g, render_template, request, jsonify, flash, redirect, url_for
 from flask_sqlalchemy import SQLAlchemy
 from flask_wtf import FlaskForm
 from wtforms import StringField, SelectField, TextAreaField, FloatField
@@ -6,17 +6,32 @@ from wtforms.validators import InputRequired, Length, NumberRange
 from datetime import datetime
 import os
 import json
-import pickle
-import numpy as np
-import pandas as pd
-from geopy.geocoders import Nominatim
-from geopy.distance import geodesic
-import folium
-from folium import plugins
+import time
+import asyncio
+import importlib
 import logging
 from config import config
-from ml_model import DiseaseRiskPredictor
+from ml_model import create_predictor
+from sqlalchemy import text
 from database_models import db, DiseaseEntry
+from async_data import AsyncSupabaseManager, run_in_app_context
+from data_watermark import DataWatermark, conditional_get, get_data_watermark
+from report_jobs import ReportJobQueue, build_disease_report, normalize_report_params
+from entry_serializers import (ARROW_AVAILABLE, ARROW_MIMETYPE, ENTRY_FORMATS, columns_to_arrow,
+                               columns_to_json, dict_rows_to_columns, query_local_entry_columns)
+from event_stream import EventBroker, ChangePoller
+from risk_trends import RiskTrendCache, TREND_BUCKETS, build_trend_frame
+from profiling import PROFILER
+import tracing
+from tracing import span, traced
+from health_monitor import HealthProber
+from warmup import WarmUp
+from model_watcher import ModelWatcher
+from outbreaks import OutbreakDetector
+from single_flight import SingleFlight
+from risk_map import create_risk_map
+from admission import AdmissionController, Overloaded, heavy_capacity, overloaded_response
+from metrics import CONTENT_TYPE, MODEL_INFO, REGISTRY, REQUEST_LATENCY, record_cache, stage_timer, timed
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -41,8 +56,24 @@ def create_app():
     # Initialize database
     db.init_app(app)
 
-    # Initialize the ML model
-    risk_predictor = DiseaseRiskPredictor()
+    # Initialize the ML model; the saved model is loaded by the warm-up below
+    backend_options = {}
+    if app.config.get('ML_BACKEND', 'forest') == 'kde':
+        backend_options = {
+            'bandwidths_km': app.config.get('KDE_BANDWIDTHS_KM'),
+            'half_life_days': app.config.get('KDE_HALF_LIFE_DAYS', 14),
+            'window_days': app.config.get('KDE_WINDOW_DAYS', 90)
+        }
+    risk_predictor = create_predictor(
+        app.config.get('ML_BACKEND', 'forest'),
+        load=False,
+        per_disease=app.config.get('PER_DISEASE_MODELS', False),
+        processes=app.config.get('MODEL_TRAINING_PROCESSES'),
+        min_disease_rows=app.config.get('PER_DISEASE_MIN_ROWS', 30),
+        sample_per_disease=app.config.get('TRAINING_SAMPLE_PER_DISEASE', 0),
+        sample_half_life_days=app.config.get('TRAINING_SAMPLE_HALF_LIFE_DAYS', 180),
+        **backend_options
+    )
     
     # Initialize Supabase manager
     supabase_manager = None
@@ -52,6 +83,217 @@ def create_app():
             logger.info("Supabase integration enabled")
         except Exception as e:
             logger.warning(f"Failed to initialize Supabase: {e}")
+    async_supabase = AsyncSupabaseManager(supabase_manager) if supabase_manager else None
+
+    def supabase_online():
+        """Whether to read from Supabase; False while its circuit breaker is open"""
+        return supabase_manager is not None and supabase_manager.is_available()
+
+    def load_ml_entries():
+        """Get entries in ML format from Supabase, or the local DB when Supabase is not configured or its breaker is open"""
+        entries = []
+        
+        if supabase_online():
+            try:
+                entries = supabase_manager.get_entries_for_ml()
+            except Exception as e:
+                logger.warning(f"Failed to get ML data from Supabase: {e}")
+        
+        if not entries and not supabase_online():
+            try:
+                entries = DiseaseEntry.query.all()
+                entries = [entry.to_dict() for entry in entries]
+            except Exception as e:
+                logger.warning(f"Failed to get local entries: {e}")
+                entries = []
+        
+        return entries
+
+    def build_report(params):
+        """Build a report on a worker thread, outside of any request"""
+        risk_predictor.ensure_loaded()
+        with app.app_context():
+            return build_disease_report(load_ml_entries(), risk_predictor, **params)
+
+    report_queue = ReportJobQueue(
+        app.config.get('REPORT_JOBS_DB') or os.path.join(app.instance_path, 'report_jobs.db'),
+        build_report,
+        num_workers=app.config.get('REPORT_WORKERS', 2)
+    )
+
+    data_watermark = DataWatermark(
+        lambda: get_data_watermark(supabase_manager),
+        model_version=lambda: risk_predictor.model_version,
+        ttl=app.config.get('WATERMARK_TTL', 2.0)
+    )
+    trend_cache = RiskTrendCache()
+
+    heavy_work = AdmissionController(
+        'heavy',
+        max_concurrent=app.config.get('HEAVY_CONCURRENCY', 2),
+        # Threads held by event streams are not available to heavy or light requests
+        max_waiting=heavy_capacity(app.config.get('WORKER_THREADS', 32) - app.config.get('SSE_MAX_STREAMS', 8),
+                                   app.config.get('LIGHT_RESERVED', 0.25),
+                                   app.config.get('HEAVY_CONCURRENCY', 2)),
+        queue_budget=app.config.get('HEAVY_QUEUE_BUDGET', 5)
+    )
+
+    # Identical concurrent predictions share one computation, across workers when possible.
+    # Requests waiting on a shared computation hold a place in the heavy queue, so they
+    # stay within its share of threads; training may legitimately run for a while
+    training_flight = SingleFlight(
+        'train_model',
+        hold=lambda wait: heavy_work.hold(wait, budget=app.config.get('SINGLE_FLIGHT_LOCK_TIMEOUT', 60))
+    )
+    prediction_flight = SingleFlight(
+        'prediction',
+        lock_dir=(app.config.get('SINGLE_FLIGHT_DIR') or os.path.join(app.instance_path, 'single_flight'))
+        if app.config.get('SINGLE_FLIGHT_CROSS_WORKER', True) else None,
+        lock_timeout=app.config.get('SINGLE_FLIGHT_LOCK_TIMEOUT', 60),
+        hold=heavy_work.hold
+    )
+
+    def train_for_current_data():
+        """Train/update the model with latest data; concurrent callers share one training run"""
+        return training_flight.do(data_watermark.key(), heavy_work.call,
+                                  risk_predictor.train_model, supabase_manager)
+
+    def stream_entries_since(last_id):
+        """New entries for the live stream, from the same source as the pages"""
+        with app.app_context():
+            if supabase_online():
+                return supabase_manager.get_entries_since(last_id)
+            entries = (DiseaseEntry.query.filter(DiseaseEntry.id > last_id)
+                       .order_by(DiseaseEntry.id).limit(100).all())
+            return [entry.to_dict() for entry in entries]
+
+    def local_disease_counts():
+        """Per-disease counts from the local DB"""
+        rows = (db.session.query(DiseaseEntry.disease_name, db.func.count(DiseaseEntry.id))
+                .group_by(DiseaseEntry.disease_name).all())
+        return {disease: count for disease, count in rows}
+
+    def stream_disease_counts():
+        """Per-disease counts for the live stream"""
+        with app.app_context():
+            if supabase_online():
+                return supabase_manager.get_disease_counts()
+            return local_disease_counts()
+
+    def stream_watermark():
+        with app.app_context():
+            return data_watermark.refresh()
+
+    event_broker = EventBroker(
+        max_subscribers=app.config.get('SSE_MAX_STREAMS', 8),
+        max_duration=app.config.get('SSE_MAX_DURATION', 300)
+    )
+    change_poller = ChangePoller(
+        event_broker,
+        get_watermark=stream_watermark,
+        get_entries_since=stream_entries_since,
+        get_disease_counts=stream_disease_counts,
+        get_model_version=lambda: risk_predictor.model_version,
+        interval=app.config.get('SSE_POLL_INTERVAL', 5)
+    )
+
+    def outbreak_recent_entries(since):
+        """Entries that occurred since a time, to seed outbreak detection"""
+        with app.app_context():
+            if supabase_online():
+                return supabase_manager.get_entries_occurred_since(since)
+            entries = (DiseaseEntry.query.filter(DiseaseEntry.occurrence_date >= since)
+                       .order_by(DiseaseEntry.id).all())
+            return [entry.to_dict() for entry in entries]
+
+    # Background threads each worker process starts after the fork (gunicorn's
+    # post_fork hook), or on its first request
+    worker_tasks = app.extensions.setdefault('worker_tasks', [])
+
+    # Emerging clusters are pushed to live dashboards as they appear or grow
+    outbreak_detector = OutbreakDetector(
+        outbreak_recent_entries,
+        stream_entries_since,
+        get_source=lambda: 'supabase' if supabase_online() else 'local',
+        eps_km=app.config.get('OUTBREAK_EPS_KM', 1.0),
+        min_cases=app.config.get('OUTBREAK_MIN_CASES', 5),
+        window_days=app.config.get('OUTBREAK_WINDOW_DAYS', 14),
+        growth_days=app.config.get('OUTBREAK_GROWTH_DAYS', 7),
+        interval=app.config.get('OUTBREAK_INTERVAL', 60),
+        on_change=lambda cluster: event_broker.publish('outbreak', cluster)
+    )
+    if app.config.get('OUTBREAK_INTERVAL', 60) > 0:
+        worker_tasks.append(outbreak_detector.ensure_started)
+        app.before_request(outbreak_detector.ensure_started)
+
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def record_request_latency(response):
+        started = g.pop('request_started', None)
+        if started is not None:
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            REQUEST_LATENCY.observe(time.perf_counter() - started, route=route,
+                                    method=request.method, status=response.status_code)
+        return response
+
+    def collect_model_info():
+        MODEL_INFO.clear()
+        MODEL_INFO.set(1, version=risk_predictor.model_version or 'untrained')
+
+    REGISTRY.add_collector(collect_model_info)
+    if app.config.get('METRICS_DIR'):
+        REGISTRY.share(app.config['METRICS_DIR'], interval=app.config.get('METRICS_PUBLISH_INTERVAL', 5))
+        worker_tasks.append(REGISTRY.ensure_publishing)
+        app.before_request(REGISTRY.ensure_publishing)
+    PROFILER.init_app(app)
+    tracing.init_app(app)
+
+    def check_supabase():
+        return bool(supabase_manager) and supabase_manager.test_connection()
+
+    def probe_supabase():
+        """Query Supabase even while its breaker is open, still under the call deadline"""
+        return bool(supabase_manager) and supabase_manager.test_connection(through_breaker=False)
+
+    def check_local_db():
+        with app.app_context():
+            db.session.execute(text('SELECT 1'))
+            return True
+
+    def warm_imports():
+        """Import the modules the first prediction, map and geocode would otherwise pay for"""
+        for module in ('pandas', 'sklearn.ensemble', 'sklearn.linear_model', 'sklearn.neighbors', 'folium', 'geopy.geocoders'):
+            importlib.import_module(module)
+
+    warm_steps = {}
+    if app.config.get('MODEL_LOADING', 'background') != 'lazy':
+        warm_steps = {'model': risk_predictor.ensure_loaded, 'imports': warm_imports}
+        if supabase_manager:
+            warm_steps['supabase_clients'] = lambda: supabase_manager.client
+    warmup = WarmUp(warm_steps)
+    if app.config.get('MODEL_LOADING', 'background') == 'background':
+        # Also checked per request, so a forked worker starts its own warm-up
+        warmup.ensure_started()
+        app.before_request(warmup.ensure_started)
+    else:
+        warmup.run()
+
+    # Hot-load model versions published by other workers (or a training job). Started
+    # per worker, never while the app is imported: in a preloading gunicorn master it
+    # would reload the model there and a fork could copy its lock while held
+    if app.config.get('MODEL_RELOAD_INTERVAL', 5) > 0:
+        model_watcher = ModelWatcher(risk_predictor, interval=app.config['MODEL_RELOAD_INTERVAL'])
+        worker_tasks.append(model_watcher.ensure_started)
+        app.before_request(model_watcher.ensure_started)
+
+    health_prober = HealthProber(
+        {'supabase': check_supabase, 'local_db': check_local_db},
+        interval=app.config.get('HEALTH_PROBE_INTERVAL', 30),
+        deep_checks={'supabase': probe_supabase}
+    )
 
     class DiseaseEntryForm(FlaskForm):
         disease_name = SelectField('Disease Name', 
@@ -114,7 +356,7 @@ def create_app():
             recent_entries = []
             
             # Try Supabase first, then fallback to local DB
-            if supabase_manager:
+            if supabase_online():
                 try:
                     supabase_entries = supabase_manager.get_disease_entries(limit=10)
                     # Convert Supabase dict format to object-like format for template consistency
@@ -122,8 +364,8 @@ def create_app():
                 except Exception as e:
                     logger.warning(f"Failed to get entries from Supabase: {e}")
             
-            # Fallback to local database only if no Supabase
-            if not recent_entries and not supabase_manager:
+            # Fallback to local database if Supabase is not configured or its breaker is open
+            if not recent_entries and not supabase_online():
                 try:
                     recent_entries = DiseaseEntry.query.order_by(DiseaseEntry.created_at.desc()).limit(10).all()
                 except Exception as e:
@@ -143,8 +385,12 @@ def create_app():
         if form.validate_on_submit():
             try:
                 # Geocode the address
-                geolocator = Nominatim(user_agent=app.config['NOMINATIM_USER_AGENT'])
-                location = geolocator.geocode(form.address.data, timeout=10)
+                from geopy.geocoders import Nominatim
+                geolocator = Nominatim(user_agent=app.config['NOMINATIM_USER_AGENT'],
+                                       domain=app.config['NOMINATIM_DOMAIN'],
+                                       scheme=app.config['NOMINATIM_SCHEME'])
+                with stage_timer('geocode'), span('nominatim.geocode'):
+                    location = geolocator.geocode(form.address.data, timeout=10)
                 
                 if location is None:
                     flash('Could not geocode the provided address. Please check and try again.', 'error')
@@ -172,7 +418,7 @@ def create_app():
                 entry_id = None
                 
                 # Try to save to Supabase first
-                if supabase_manager:
+                if supabase_online():
                     try:
                         result = supabase_manager.create_disease_entry(entry_data)
                         if result:
@@ -200,6 +446,16 @@ def create_app():
                     entry_id = entry.id
                     flash('Disease entry registered successfully!', 'success')
                 
+                # The online backend learns the entry now; the forest waits for a retrain
+                try:
+                    risk_predictor.update([entry_data])
+                except Exception as e:
+                    logger.warning(f"Online model update failed: {e}")
+                
+                data_watermark.invalidate()
+                change_poller.notify()
+                outbreak_detector.notify()
+                
                 return redirect(url_for('risk_prediction', entry_id=entry_id))
                 
             except Exception as e:
@@ -210,27 +466,35 @@ def create_app():
         return render_template('register.html', form=form)
 
     @app.route('/risk-prediction/<int:entry_id>')
-    def risk_prediction(entry_id):
+    async def risk_prediction(entry_id):
         """Show risk prediction for a specific entry"""
         try:
-            entry = None
-            
-            # Try to get from Supabase first
-            if supabase_manager:
-                try:
-                    entry = supabase_manager.get_disease_entry_by_id(entry_id)
-                    logger.info(f"Searching for entry_id: {entry_id}, Found entry: {entry is not None}")
-                    if entry:
-                        logger.debug(f"Entry data: {entry}")
-                except Exception as e:
-                    logger.warning(f"Failed to get entry from Supabase: {e}")
+            async def lookup_entry():
+                entry = None
+                
+                # Try to get from Supabase first
+                if supabase_online():
+                    try:
+                        entry = await async_supabase.get_disease_entry_by_id(entry_id)
+                        logger.info(f"Searching for entry_id: {entry_id}, Found entry: {entry is not None}")
+                        if entry:
+                            logger.debug(f"Entry data: {entry}")
+                    except Exception as e:
+                        logger.warning(f"Failed to get entry from Supabase: {e}")
+                
+                # Fallback to local DB if Supabase is not configured or its breaker is open
+                if not entry and not supabase_online():
+                    try:
+                        entry = DiseaseEntry.query.get(entry_id)
+                    except Exception as e:
+                        logger.warning(f"Failed to get entry from local DB: {e}")
+                return entry
             
-            # Fallback to local DB only if no Supabase connection
-            if not entry and not supabase_manager:
-                try:
-                    entry = DiseaseEntry.query.get(entry_id)
-                except Exception as e:
-                    logger.warning(f"Failed to get entry from local DB: {e}")
+            # The entry lookup and the model's training fetch are independent, so run them concurrently
+            entry, _ = await asyncio.gather(
+                lookup_entry(),
+                run_in_app_context(app, train_for_current_data)
+            )
             
             if not entry:
                 logger.warning(f"Disease entry with ID {entry_id} not found")
@@ -240,9 +504,6 @@ def create_app():
             # Normalize entry for template compatibility
             normalized_entry = normalize_entry_for_template(entry)
             
-            # Train/update the model with latest data
-            risk_predictor.train_model(supabase_manager)
-            
             # Generate risk predictions - use normalized entry to avoid attribute errors
             if hasattr(normalized_entry, 'latitude'):
                 # SQLAlchemy object or normalized entry
@@ -252,97 +513,124 @@ def create_app():
                 lat, lng = entry['latitude'], entry['longitude']
                 disease = entry.get('disease_type', entry.get('disease_name', 'Unknown'))
             
-            risk_areas = risk_predictor.predict_risk_areas(lat, lng, disease)
+            def predict_with_map():
+                risk_areas = risk_predictor.predict_risk_areas(lat, lng, disease)
+                return risk_areas, create_risk_map(lat, lng, risk_areas)
             
-            # Create risk map
-            risk_map = create_risk_map(lat, lng, risk_areas)
+            # Generate risk predictions and the risk map once for all concurrent viewers of this location
+            risk_areas, risk_map = prediction_flight.do(
+                ('risk-prediction', lat, lng, disease, data_watermark.key()),
+                heavy_work.call, predict_with_map
+            )
             
             return render_template('risk_prediction.html', 
                                  entry=normalized_entry, 
                                  risk_areas=risk_areas,
                                  risk_map=risk_map)
+        except Overloaded as e:
+            return overloaded_response(e)
         except Exception as e:
             flash(f'Error generating risk prediction: {str(e)}', 'error')
             return redirect(url_for('index'))
 
     @app.route('/api/entries')
+    @conditional_get(data_watermark)
     def api_entries():
-        """API endpoint to get all disease entries"""
+        """API endpoint to get all disease entries (format=json|columnar|arrow)"""
+        response_format = request.args.get('format', 'json')
+        if response_format not in ENTRY_FORMATS:
+            return jsonify({'error': f"format must be one of {', '.join(ENTRY_FORMATS)}"}), 400
+        if response_format == 'arrow' and not ARROW_AVAILABLE:
+            return jsonify({'error': 'Arrow format requires pyarrow to be installed'}), 501
+        
         try:
             entries = []
+            columns = None
             
             # Try Supabase first
-            if supabase_manager:
+            if supabase_online():
                 try:
                     entries = supabase_manager.get_disease_entries(limit=1000)
                 except Exception as e:
                     logger.warning(f"Failed to get entries from Supabase: {e}")
+                if response_format != 'json':
+                    columns = dict_rows_to_columns(entries)
             
-            # Fallback to local database only if no Supabase
-            if not entries and not supabase_manager:
+            # Fallback to local database if Supabase is not configured or its breaker is open
+            if not entries and not supabase_online():
                 try:
-                    entries = DiseaseEntry.query.all()
-                    entries = [entry.to_dict() for entry in entries]
+                    if response_format == 'json':
+                        entries = DiseaseEntry.query.all()
+                        entries = [entry.to_dict() for entry in entries]
+                    else:
+                        columns = query_local_entry_columns()
                 except Exception as e:
                     logger.warning(f"Failed to get local entries for API: {e}")
                     entries = []
+                    columns = {}
             
+            if response_format == 'columnar':
+                return Response(columns_to_json(columns), mimetype='application/json')
+            if response_format == 'arrow':
+                return Response(columns_to_arrow(columns), mimetype=ARROW_MIMETYPE)
             return jsonify(entries)
         except Exception as e:
             return jsonify({'error': str(e)}), 500
 
     @app.route('/api/risk-map/<float:lat>/<float:lng>/<disease>')
+    @conditional_get(data_watermark, include_model=True)
     def api_risk_map(lat, lng, disease):
         """API endpoint to get risk map data"""
         try:
-            risk_predictor.train_model(supabase_manager)
-            risk_areas = risk_predictor.predict_risk_areas(lat, lng, disease)
+            def train_and_predict():
+                train_for_current_data()
+                return heavy_work.call(risk_predictor.predict_risk_areas, lat, lng, disease, priority=1)
+            
+            risk_areas = prediction_flight.do(
+                ('risk-map', lat, lng, disease, data_watermark.key()), train_and_predict
+            )
             return jsonify(risk_areas)
+        except Overloaded as e:
+            return overloaded_response(e)
         except Exception as e:
             return jsonify({'error': str(e)}), 500
 
     @app.route('/dashboard')
-    def dashboard():
+    @conditional_get(data_watermark)
+    async def dashboard():
         """Dashboard with statistics and visualizations"""
         try:
-            entries = []
+            disease_counts, recent_entries = {}, []
             
-            # Get entries from Supabase or local DB
-            if supabase_manager:
+            # Counts and recent entries are independent queries, so fetch them concurrently
+            if supabase_online():
                 try:
-                    entries = supabase_manager.get_entries_for_ml()
+                    disease_counts, recent_entries = await asyncio.gather(
+                        async_supabase.get_disease_counts(),
+                        async_supabase.get_disease_entries(limit=10)
+                    )
                 except Exception as e:
-                    logger.warning(f"Failed to get ML data from Supabase: {e}")
+                    logger.warning(f"Failed to get dashboard data from Supabase: {e}")
             
-            if not entries and not supabase_manager:
+            # Fallback to local database if Supabase is not configured or its breaker is open
+            if not disease_counts and not supabase_online():
                 try:
-                    entries = DiseaseEntry.query.all()
-                    entries = [entry.to_dict() for entry in entries]
+                    disease_counts = local_disease_counts()
+                    recent_entries = DiseaseEntry.query.order_by(DiseaseEntry.created_at.desc()).limit(10).all()
                 except Exception as e:
-                    logger.warning(f"Failed to get local entries for dashboard: {e}")
-                    entries = []
+                    logger.warning(f"Failed to get local dashboard data: {e}")
             
             # Calculate statistics
-            total_entries = len(entries)
+            total_entries = sum(disease_counts.values())
             
-            if entries:
-                # Group by disease type
-                disease_counts = {}
-                for entry in entries:
-                    disease_type = entry.get('disease_type', entry.get('disease_name', 'Unknown'))
-                    disease_counts[disease_type] = disease_counts.get(disease_type, 0) + 1
-                
-                # Get most common disease
-                most_common = max(disease_counts, key=disease_counts.get) if disease_counts else 'N/A'
-            else:
-                disease_counts = {}
-                most_common = 'N/A'
+            # Get most common disease
+            most_common = max(disease_counts, key=disease_counts.get) if disease_counts else 'N/A'
             
             return render_template('dashboard.html',
                                  total_entries=total_entries,
                                  disease_counts=disease_counts.items() if disease_counts else [],
                                  most_common=most_common,
-                                 recent_entries=[normalize_entry_for_template(entry) for entry in entries[:10]])  # Show recent 10 entries
+                                 recent_entries=[normalize_entry_for_template(entry) for entry in recent_entries])
         except Exception as e:
             flash(f'Error loading dashboard: {str(e)}', 'error')
             return render_template('dashboard.html',
@@ -351,94 +639,148 @@ def create_app():
                                  most_common='N/A',
                                  entries=[])
 
-    @app.route('/health')
-    def health():
-        """Health check endpoint"""
+    @app.route('/api/reports', methods=['POST'])
+    def api_create_report():
+        """Queue a background report; identical requests on unchanged data reuse the cached job"""
         try:
-            # Test database connection
-            if supabase_manager:
-                supabase_healthy = supabase_manager.test_connection()
-            else:
-                supabase_healthy = False
-            
-            # Test local database
-            try:
-                db.session.execute('SELECT 1')
-                local_db_healthy = True
-            except:
-                local_db_healthy = False
-            
+            params = normalize_report_params(request.get_json(silent=True) or request.form.to_dict())
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        try:
+            # Reports include model metrics, so a new model version invalidates them too
+            watermark = data_watermark.key(include_model=True)
+            job = report_queue.submit(params, watermark)
+            record_cache('reports', job['cached'])
+            job['status_url'] = url_for('api_report_status', job_id=job['id'])
+            return jsonify(job), (200 if job['status'] == 'done' else 202)
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    @app.route('/api/reports/<job_id>')
+    def api_report_status(job_id):
+        """Poll the status of a report job; the report is included once it is done"""
+        job = report_queue.get_job(job_id)
+        if job is None:
+            return jsonify({'error': 'Report job not found'}), 404
+        return jsonify(job)
+
+    @app.route('/api/trends')
+    def api_trends():
+        """Average risk score and case counts per week or month"""
+        bucket = request.args.get('bucket', 'month')
+        disease = request.args.get('disease', '').strip().lower() or None
+        if bucket not in TREND_BUCKETS:
+            return jsonify({'error': f"bucket must be one of {', '.join(TREND_BUCKETS)}"}), 400
+        
+        try:
+            watermark = data_watermark.key()
+            series = trend_cache.get(
+                watermark, bucket, disease,
+                lambda: build_trend_frame(load_ml_entries(), risk_predictor)
+            )
+            return jsonify(series)
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    @app.route('/api/clusters/outbreaks')
+    def api_outbreak_clusters():
+        """Outbreak clusters among recent cases, largest first, with size, centroid and growth rate"""
+        disease = request.args.get('disease', '').strip().lower() or None
+        try:
+            min_size = int(request.args.get('min_size', app.config.get('OUTBREAK_MIN_CASES', 5)))
+        except ValueError:
+            return jsonify({'error': 'min_size must be an integer'}), 400
+        
+        try:
+            # Picks up entries added since the last check; at most once per few seconds
+            outbreak_detector.refresh(min_interval=5)
             return jsonify({
-                'status': 'healthy',
-                'supabase': supabase_healthy,
-                'local_db': local_db_healthy,
+                'clusters': outbreak_detector.clusters(disease, min_size),
+                'tracked_cases': outbreak_detector.tracked_cases(),
+                'eps_km': outbreak_detector.eps_km,
+                'min_cases': outbreak_detector.min_cases,
+                'window_days': outbreak_detector.window_days,
+                'growth_days': outbreak_detector.growth_days,
                 'timestamp': datetime.utcnow().isoformat()
             })
         except Exception as e:
-            return jsonify({
-                'status': 'unhealthy',
-                'error': str(e),
-                'timestamp': datetime.utcnow().isoformat()
-            }), 500
+            return jsonify({'error': str(e)}), 500
 
-    def create_risk_map(center_lat, center_lng, risk_areas):
-        """Create a folium map with risk areas"""
+    @app.route('/api/stream')
+    def api_stream():
+        """Server-Sent Events stream of new entries, disease counts and model versions"""
         try:
-            # Create base map
-            m = folium.Map(
-                location=[center_lat, center_lng],
-                zoom_start=12,
-                tiles='OpenStreetMap'
-            )
-            
-            # Add center marker
-            folium.Marker(
-                [center_lat, center_lng],
-                popup='Disease Entry Location',
-                icon=folium.Icon(color='red', icon='info-sign')
-            ).add_to(m)
-            
-            # Add risk area circles
-            for area in risk_areas:
-                # Use risk_score (float) instead of risk_level (string)
-                risk_score = area.get('risk_score', area.get('risk_level', 0))
-                
-                # Ensure risk_score is a float
-                if isinstance(risk_score, str):
-                    # Convert string risk levels to numeric values
-                    risk_level_map = {
-                        'Very High': 0.9,
-                        'High': 0.7,
-                        'Medium': 0.5,
-                        'Low': 0.3
-                    }
-                    risk_score = risk_level_map.get(risk_score, 0.5)
-                
-                # Color based on risk score
-                if risk_score > 0.7:
-                    color = 'red'
-                    fillColor = 'red'
-                elif risk_score > 0.4:
-                    color = 'orange'
-                    fillColor = 'orange'
-                else:
-                    color = 'yellow'
-                    fillColor = 'yellow'
-                
-                folium.Circle(
-                    location=[area['lat'], area['lng']],
-                    radius=area.get('radius', 1000),
-                    popup=f"Risk Level: {float(risk_score):.2f}",
-                    color=color,
-                    fillColor=fillColor,
-                    fillOpacity=0.3,
-                    weight=2
-                ).add_to(m)
-            
-            return m._repr_html_()
-        except Exception as e:
-            logger.error(f"Error creating risk map: {e}")
-            return "<div class='alert alert-warning'>Map could not be loaded</div>"
+            subscription = event_broker.subscribe()
+        except Overloaded as e:
+            return overloaded_response(e)
+        initial = change_poller.snapshot_messages()
+        change_poller.ensure_started()
+        stream = event_broker.stream(
+            subscription,
+            initial=initial,
+            heartbeat=app.config.get('SSE_HEARTBEAT', 15)
+        )
+        response = Response(stream, mimetype='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        })
+        # Frees the slot even if the client goes away before the stream starts
+        response.call_on_close(lambda: event_broker.unsubscribe(subscription))
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        """Prometheus metrics, of every worker process when METRICS_DIR is set"""
+        return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+    @app.route('/health')
+    def health():
+        """
+        Health check endpoint, answered from the background prober's cached
+        results; a component not probed yet is null, not false
+        """
+        health_prober.ensure_started()
+        components = health_prober.snapshot()
+        return jsonify({
+            'status': 'healthy',
+            'supabase': components['supabase']['healthy'],
+            'local_db': components['local_db']['healthy'],
+            'supabase_breaker': supabase_manager.breaker.state if supabase_manager else None,
+            'components': components,
+            'timestamp': datetime.utcnow().isoformat()
+        })
+
+    @app.route('/ready')
+    def ready():
+        """Readiness probe: 503 until the model is loaded and heavy imports are warm"""
+        return jsonify({
+            'status': 'ready' if warmup.ready else 'warming_up',
+            'model_loaded': risk_predictor.is_loaded,
+            'model_version': risk_predictor.model_version,
+            'steps': warmup.snapshot(),
+            'timestamp': datetime.utcnow().isoformat()
+        }), (200 if warmup.ready else 503)
+
+    @app.route('/health/deep')
+    def health_deep():
+        """
+        Run every health check now; 503 if a configured dependency is down.
+        Supabase is queried past its circuit breaker, so this shows whether it
+        has recovered while the breaker is still open
+        """
+        health_prober.ensure_started()
+        components = health_prober.probe_all(deep=True)
+        required = ['supabase'] if supabase_manager else ['local_db']
+        healthy = all(components[name]['healthy'] for name in required)
+        return jsonify({
+            'status': 'healthy' if healthy else 'degraded',
+            'supabase': components['supabase']['healthy'],
+            'local_db': components['local_db']['healthy'],
+            'supabase_breaker': supabase_manager.breaker.state if supabase_manager else None,
+            'components': components,
+            'timestamp': datetime.utcnow().isoformat()
+        }), (200 if healthy else 503)
 
     return app
 
@@ -0,0 +1,65 @@
+"""
+Asyncio data access for async Flask views
+
+SupabaseManager is synchronous (supabase-py over a pooled httpx client), so
+each call runs on a worker thread via asyncio.to_thread. Awaiting several of
+them with asyncio.gather overlaps the round trips, making a page's data
+latency the slowest call rather than the sum of all of them. Context
+variables (tracing spans, the Flask app context, a request's profile capture)
+are carried into the thread.
+"""
+import asyncio
+from typing import Optional, Dict, Any
+
+from profiling import PROFILER
+
+def _profiled(function, *args, **kwargs):
+    with PROFILER.attach_thread():
+        return function(*args, **kwargs)
+
+async def run_in_app_context(app, function, *args, **kwargs):
+    """
+    Run a blocking function on a worker thread inside its own app context, so
+    anything it does through Flask-SQLAlchemy gets a separate session from the
+    request's
+    """
+    def call():
+        with app.app_context():
+            return _profiled(function, *args, **kwargs)
+    return await asyncio.to_thread(call)
+
+class AsyncSupabaseManager:
+    """Awaitable wrappers around the SupabaseManager read and write methods"""
+
+    def __init__(self, manager):
+        self.manager = manager
+
+    def is_available(self) -> bool:
+        return self.manager.is_available()
+
+    async def _call(self, method, *args, **kwargs):
+        return await asyncio.to_thread(_profiled, getattr(self.manager, method), *args, **kwargs)
+
+    async def test_connection(self) -> bool:
+        return await self._call('test_connection')
+
+    async def create_disease_entry(self, entry_data: Dict[str, Any]) -> Optional[Dict]:
+        return await self._call('create_disease_entry', entry_data)
+
+    async def get_disease_entries(self, limit: int = 100, offset: int = 0) -> list:
+        return await self._call('get_disease_entries', limit=limit, offset=offset)
+
+    async def get_disease_entry_by_id(self, entry_id: int) -> Optional[Dict[str, Any]]:
+        return await self._call('get_disease_entry_by_id', entry_id)
+
+    async def get_latest_entry_marker(self) -> Optional[Dict[str, Any]]:
+        return await self._call('get_latest_entry_marker')
+
+    async def get_entries_since(self, last_id: int, limit: int = 100) -> list:
+        return await self._call('get_entries_since', last_id, limit=limit)
+
+    async def get_disease_counts(self) -> Dict[str, int]:
+        return await self._call('get_disease_counts')
+
+    async def get_entries_for_ml(self) -> list:
+        return await self._call('get_entries_for_ml')
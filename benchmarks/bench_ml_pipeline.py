@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the ml_model pipeline
+
+Times prepare_features, calculate_risk_score, train_model (fed by a stubbed
+Supabase source), predict_risk_areas, save_model/load_model and
+create_risk_map over synthetic datasets, plus building the KDE backend's
+case-density index and answering predict_risk_areas from it. Results are written as JSON in the
+format benchmarks/compare.py reads, so a run can be saved as a baseline and
+later runs checked against it for regressions.
+
+The slow per-row stages are capped (see ROW_LIMITS) so the default run
+finishes in minutes; --no-limits runs every stage at every size.
+
+Usage: python benchmarks/bench_ml_pipeline.py [--rows 1000 10000 100000 1000000] [--repeat 3]
+                                              [--only train_model predict_risk_areas]
+                                              [--output results.json] [--save-baseline]
+                                              [--compare [baseline.json]] [--threshold 0.2]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kde_model import CaseDensityIndex, KDERiskPredictor
+from ml_model import DiseaseRiskPredictor, ModelSnapshot
+from risk_map import create_risk_map
+
+BENCHMARK_NAME = 'ml_pipeline'
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines', 'ml_pipeline.json')
+DEFAULT_ROWS = [1000, 10000, 100000, 1000000]
+DISEASES = ['dengue', 'malaria', 'chikungunya', 'typhoid', 'hepatitis_a',
+            'tuberculosis', 'covid19', 'influenza', 'other']
+CENTER = (13.0827, 80.2707)
+
+# Largest dataset each stage runs on by default; prepare_features computes a
+# geodesic per row and training fits a 100-tree forest, so 1M rows takes too long
+ROW_LIMITS = {
+    'prepare_features': 100000,
+    'train_model': 100000,
+    'predict_risk_areas': 100000,
+    'save_model': 100000,
+    'load_model': 100000,
+    'create_risk_map': 1000,
+}
+# Stages fast enough to run at every size
+UNLIMITED = ['calculate_risk_score', 'kde_build', 'kde_predict_risk_areas']
+
+def make_dataset(rows, seed=42):
+    """Synthetic entries in the normalized frame layout the model trains on"""
+    rng = np.random.default_rng(seed)
+    now = datetime.now()
+    return pd.DataFrame({
+        'latitude': CENTER[0] + rng.normal(0, 0.05, rows),
+        'longitude': CENTER[1] + rng.normal(0, 0.05, rows),
+        'disease_name': rng.choice(DISEASES, rows),
+        'patient_age': rng.integers(1, 90, rows).astype(float),
+        'severity': rng.integers(1, 6, rows),
+        'occurrence_date': pd.to_datetime(now) - pd.to_timedelta(rng.integers(0, 730 * 24, rows), unit='h')
+    })
+
+class StubSupabase:
+    """Stands in for SupabaseManager as train_model's data source"""
+
+    def __init__(self, frame):
+        records = frame.rename(columns={'disease_name': 'disease_type'})
+        records = records.assign(occurrence_date=records['occurrence_date'].dt.strftime('%Y-%m-%dT%H:%M:%S'))
+        self.entries = records.to_dict('records')
+
+    def get_entries_for_ml(self):
+        return self.entries
+
+def new_predictor(model_path):
+    """A predictor that neither loads nor overwrites the repo's model file"""
+    predictor = DiseaseRiskPredictor()
+    predictor.model_path = model_path
+    return predictor
+
+def time_call(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        # Pipeline code prints progress; keep it out of the report
+        with contextlib.redirect_stdout(io.StringIO()):
+            function()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+def bench_size(rows, repeat, selected, limits, workdir):
+    """Run the selected benchmarks on one dataset size"""
+    frame = make_dataset(rows)
+    model_path = os.path.join(workdir, f'model-{rows}.pkl')
+    trained = None
+
+    def needs(name):
+        return name in selected and rows <= limits.get(name, rows)
+
+    def trained_predictor():
+        nonlocal trained
+        if trained is None:
+            trained = new_predictor(model_path)
+            with contextlib.redirect_stdout(io.StringIO()):
+                trained.train_model(StubSupabase(frame))
+        return trained
+
+    cases = []
+    if needs('prepare_features'):
+        predictor = new_predictor(model_path)
+        cases.append(('prepare_features', lambda: predictor.prepare_features(frame)))
+    if needs('calculate_risk_score'):
+        predictor = new_predictor(model_path)
+        cases.append(('calculate_risk_score', lambda: predictor.calculate_risk_score(frame)))
+    if needs('train_model'):
+        source = StubSupabase(frame)
+        cases.append(('train_model', lambda: new_predictor(model_path).train_model(source)))
+    if needs('predict_risk_areas'):
+        predictor = trained_predictor()
+        cases.append(('predict_risk_areas', lambda: predictor.predict_risk_areas(CENTER[0], CENTER[1], 'dengue')))
+    if needs('save_model'):
+        predictor = trained_predictor()
+        cases.append(('save_model', predictor.save_model))
+    if needs('load_model'):
+        predictor = trained_predictor()
+        with contextlib.redirect_stdout(io.StringIO()):
+            predictor.save_model()
+        cases.append(('load_model', predictor.load_model))
+    if needs('kde_build'):
+        # Every case counts, so the index covers all rows of the dataset
+        cases.append(('kde_build', lambda: CaseDensityIndex(frame, window_days=None)))
+    if needs('kde_predict_risk_areas'):
+        predictor = KDERiskPredictor(load=False, window_days=None)
+        predictor._snapshot = ModelSnapshot(model=CaseDensityIndex(frame, window_days=None), is_trained=True)
+        cases.append(('kde_predict_risk_areas',
+                      lambda: predictor.predict_risk_areas(CENTER[0], CENTER[1], 'dengue')))
+    if needs('create_risk_map'):
+        risk_areas = trained_predictor().predict_risk_areas(CENTER[0], CENTER[1], 'dengue')
+        cases.append(('create_risk_map', lambda: create_risk_map(CENTER[0], CENTER[1], risk_areas)))
+
+    results = []
+    for name, function in cases:
+        timings = time_call(function, repeat)
+        median = statistics.median(timings)
+        results.append({
+            'name': name,
+            'rows': rows,
+            'repeat': repeat,
+            'min_s': round(min(timings), 6),
+            'median_s': round(median, 6),
+            'mean_s': round(statistics.mean(timings), 6),
+            'rows_per_s': round(rows / median, 1) if median else None
+        })
+        print(f"{name:<22}{rows:>10,}{median * 1000:>12.1f} ms{rows / median if median else 0:>16,.0f} rows/s")
+    return results
+
+def environment():
+    import sklearn
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'sklearn': sklearn.__version__
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=DEFAULT_ROWS)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--only', nargs='+', choices=list(ROW_LIMITS) + UNLIMITED,
+                        help='run only these benchmarks')
+    parser.add_argument('--no-limits', action='store_true', help='run every stage at every size')
+    parser.add_argument('--output', help='write results as JSON')
+    parser.add_argument('--save-baseline', action='store_true', help=f'write results to {BASELINE_PATH}')
+    parser.add_argument('--compare', nargs='?', const=BASELINE_PATH,
+                        help='baseline JSON to check these results against (default: the saved baseline)')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='allowed slowdown of the median before it counts as a regression')
+    args = parser.parse_args()
+
+    selected = set(args.only or list(ROW_LIMITS) + UNLIMITED)
+    limits = {} if args.no_limits else ROW_LIMITS
+
+    print(f"{'benchmark':<22}{'rows':>10}{'median':>15}{'throughput':>23}")
+    results = []
+    with tempfile.TemporaryDirectory(prefix='bench-ml-') as workdir:
+        # DiseaseRiskPredictor() loads disease_risk_model.pkl from the working directory
+        previous_cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            for rows in args.rows:
+                results.extend(bench_size(rows, args.repeat, selected, limits, workdir))
+        finally:
+            os.chdir(previous_cwd)
+
+    report = {
+        'benchmark': BENCHMARK_NAME,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'environment': environment(),
+        'results': results
+    }
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(BASELINE_PATH), exist_ok=True)
+    for path in filter(None, (args.output, args.save_baseline and BASELINE_PATH)):
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote {path}")
+
+    if args.compare:
+        from compare import compare_reports, load_report, print_comparison
+        comparison = compare_reports(load_report(args.compare), report, args.threshold)
+        print_comparison(comparison, args.threshold)
+        if comparison['regressions']:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Serialization benchmark for /api/entries
+
+Compares the current path (ORM objects -> to_dict() -> JSON) with the
+columnar JSON and Arrow IPC formats built from query result tuples.
+
+Usage: python benchmarks/bench_serialization.py [--rows 1000 10000 100000] [--repeat 3]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from database_models import db, DiseaseEntry
+from entry_serializers import (ARROW_AVAILABLE, columns_to_arrow, columns_to_json,
+                               query_local_entry_columns)
+
+DISEASES = list(DiseaseEntry.DISEASE_RISK_INDEX)
+
+def create_bench_app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    return app
+
+def load_rows(count):
+    """Replace the table contents with count synthetic entries"""
+    db.session.query(DiseaseEntry).delete()
+    now = datetime.utcnow()
+    rows = [{
+        'disease_name': random.choice(DISEASES),
+        'patient_age': float(random.randint(0, 90)),
+        'address': f'{random.randint(1, 999)} Example Street, Chennai, Tamil Nadu',
+        'latitude': 13.0 + random.random() / 10,
+        'longitude': 80.2 + random.random() / 10,
+        'additional_info': '',
+        'occurrence_date': now - timedelta(days=random.randint(0, 730)),
+        'created_at': now,
+    } for _ in range(count)]
+    db.session.execute(DiseaseEntry.__table__.insert(), rows)
+    db.session.commit()
+    db.session.expunge_all()
+
+def bench_to_dict_json():
+    entries = DiseaseEntry.query.all()
+    payload = json.dumps([entry.to_dict() for entry in entries])
+    db.session.expunge_all()
+    return len(payload)
+
+def bench_columnar_json():
+    return len(columns_to_json(query_local_entry_columns()))
+
+def bench_arrow():
+    return len(columns_to_arrow(query_local_entry_columns()))
+
+def best_of(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        size = function()
+        timings.append(time.perf_counter() - start)
+    return min(timings), size
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    benchmarks = [('to_dict + json', bench_to_dict_json), ('columnar json', bench_columnar_json)]
+    if ARROW_AVAILABLE:
+        benchmarks.append(('arrow ipc', bench_arrow))
+
+    app = create_bench_app()
+    with app.app_context():
+        db.create_all()
+        print(f"{'rows':>8}  {'format':<16} {'seconds':>9} {'rows/s':>12} {'bytes':>12} {'speedup':>8}")
+        for count in args.rows:
+            load_rows(count)
+            baseline = None
+            for name, function in benchmarks:
+                seconds, size = best_of(function, args.repeat)
+                baseline = baseline or seconds
+                print(f"{count:>8}  {name:<16} {seconds:>9.4f} {count / seconds:>12,.0f} "
+                      f"{size:>12,} {baseline / seconds:>7.1f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Compare two benchmark result files and flag regressions
+
+Matches results by (name, rows) and compares median times. A result whose
+median grew by more than the threshold (default 20%) is a regression and
+makes the command exit with status 1, so it can gate CI. Baselines are only
+meaningful on the machine they were recorded on; the environments of both
+files are printed when they differ.
+
+Usage: python benchmarks/compare.py BASELINE.json CURRENT.json [--threshold 0.2]
+"""
+import argparse
+import json
+import sys
+
+def load_report(path):
+    with open(path) as f:
+        return json.load(f)
+
+def compare_reports(baseline, current, threshold=0.2):
+    """Per-result median ratios (current / baseline) and the ones beyond the threshold"""
+    baseline_results = {(r['name'], r['rows']): r for r in baseline.get('results', [])}
+    rows = []
+    for result in current.get('results', []):
+        key = (result['name'], result['rows'])
+        previous = baseline_results.get(key)
+        if previous is None or not previous.get('median_s'):
+            rows.append({'name': key[0], 'rows': key[1], 'baseline_s': None,
+                         'current_s': result['median_s'], 'ratio': None, 'status': 'new'})
+            continue
+        ratio = result['median_s'] / previous['median_s']
+        if ratio > 1 + threshold:
+            status = 'REGRESSION'
+        elif ratio < 1 - threshold:
+            status = 'faster'
+        else:
+            status = 'ok'
+        rows.append({'name': key[0], 'rows': key[1], 'baseline_s': previous['median_s'],
+                     'current_s': result['median_s'], 'ratio': round(ratio, 3), 'status': status})
+    return {
+        'rows': rows,
+        'regressions': [row for row in rows if row['status'] == 'REGRESSION'],
+        'environment_changed': baseline.get('environment') != current.get('environment'),
+        'environments': (baseline.get('environment'), current.get('environment'))
+    }
+
+def print_comparison(comparison, threshold):
+    print(f"\n{'benchmark':<22}{'rows':>10}{'baseline ms':>14}{'current ms':>13}{'ratio':>8}  status")
+    for row in comparison['rows']:
+        baseline = f"{row['baseline_s'] * 1000:.1f}" if row['baseline_s'] is not None else '-'
+        ratio = f"{row['ratio']:.2f}x" if row['ratio'] is not None else '-'
+        print(f"{row['name']:<22}{row['rows']:>10,}{baseline:>14}{row['current_s'] * 1000:>13.1f}{ratio:>8}  {row['status']}")
+    if comparison['environment_changed']:
+        baseline_env, current_env = comparison['environments']
+        print(f"\nNote: environments differ\n  baseline: {baseline_env}\n  current:  {current_env}")
+    regressions = comparison['regressions']
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {threshold:.0%}")
+    else:
+        print(f"\nNo regressions beyond {threshold:.0%}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('baseline')
+    parser.add_argument('current')
+    parser.add_argument('--threshold', type=float, default=0.2)
+    args = parser.parse_args()
+
+    comparison = compare_reports(load_report(args.baseline), load_report(args.current), args.threshold)
+    print_comparison(comparison, args.threshold)
+    sys.exit(1 if comparison['regressions'] else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Accuracy of training on a StratifiedReservoir sample versus the full history
+
+Generates a synthetic history with sample_data.generate_entries (seasonal,
+clustered), holds out its most recent cases as the test set, and fits the
+risk model's forest on the full history and on reservoir samples of several
+sizes. Entries are offered to each reservoir in arrival order and batches,
+as train_model's incremental refreshes would. The report gives the training
+set size, the time to sample, build features and fit, and the MSE and R2 on
+the held-out cases next to the full-history fit's.
+
+Usage: python benchmarks/eval_sampling.py [--rows 100000] [--sizes 500 2000 5000]
+                                          [--half-life 180] [--test-fraction 0.1]
+                                          [--seed 42] [--output report.json]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ml_model import DiseaseRiskPredictor, _fit_forest, entries_to_dataframe
+from sample_data import generate_entries
+from training_sample import StratifiedReservoir
+
+def make_history(rows, seed, test_fraction):
+    """Entries in arrival order with ids, and the most recent cases held out"""
+    frame = generate_entries(rows, seed=seed).sort_values('created_at', ignore_index=True)
+    frame['id'] = range(1, len(frame) + 1)
+    cutoff = frame['occurrence_date'].quantile(1 - test_fraction)
+    history = frame[frame['occurrence_date'] < cutoff]
+    holdout = frame[frame['occurrence_date'] >= cutoff]
+    return history.to_dict('records'), entries_to_dataframe(holdout.to_dict('records'))
+
+def evaluate(predictor, training, holdout):
+    """Fit on a normalized training frame; returns (feature seconds, fit seconds, mse, r2)"""
+    started = time.perf_counter()
+    encoding = predictor._fit_encoding(training)
+    X = predictor.prepare_features(training, encoding)
+    y = predictor.calculate_risk_score(training)
+    prepared = time.perf_counter()
+    X_holdout = predictor.prepare_features(holdout, encoding)
+    y_holdout = predictor.calculate_risk_score(holdout)
+
+    fit_started = time.perf_counter()
+    _, _, mse, r2 = _fit_forest(X.to_numpy(dtype=float), y.to_numpy(dtype=float),
+                                X_holdout.to_numpy(dtype=float), y_holdout.to_numpy(dtype=float))
+    return prepared - started, time.perf_counter() - fit_started, mse, r2
+
+def sample(records, size, half_life, seed, batch_size=1000):
+    """Offer records to a reservoir in arrival batches; returns (normalized sample, seconds)"""
+    reservoir = StratifiedReservoir(size, half_life, seed=seed)
+    started = time.perf_counter()
+    for begin in range(0, len(records), batch_size):
+        reservoir.add(records[begin:begin + batch_size])
+    elapsed = time.perf_counter() - started
+    return entries_to_dataframe(reservoir.sample()), elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[500, 2000, 5000],
+                        help='reservoir sizes (entries per disease) to evaluate')
+    parser.add_argument('--half-life', type=float, default=180.0, help='recency half-life in days')
+    parser.add_argument('--test-fraction', type=float, default=0.1)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='also write the report as JSON')
+    args = parser.parse_args()
+
+    records, holdout = make_history(args.rows, args.seed, args.test_fraction)
+    predictor = DiseaseRiskPredictor(load=False)
+    print(f"{len(records):,} training entries, {len(holdout):,} held-out recent cases")
+
+    variants = [('full', entries_to_dataframe(records), 0.0)]
+    variants += [(f'reservoir {size}/disease', *sample(records, size, args.half_life, args.seed))
+                 for size in args.sizes]
+
+    results = []
+    full = None
+    for name, training, sample_seconds in variants:
+        with contextlib.redirect_stdout(io.StringIO()):
+            feature_seconds, fit_seconds, mse, r2 = evaluate(predictor, training, holdout)
+        result = {
+            'variant': name,
+            'training_rows': len(training),
+            'sample_seconds': round(sample_seconds, 3),
+            'feature_seconds': round(feature_seconds, 3),
+            'fit_seconds': round(fit_seconds, 3),
+            'mse': mse,
+            'r2': r2
+        }
+        full = full or result
+        result['r2_change'] = r2 - full['r2']
+        results.append(result)
+
+    print(f"{'variant':<24}{'rows':>9}{'sample s':>10}{'features s':>12}{'fit s':>8}"
+          f"{'MSE':>10}{'R2':>8}{'ΔR2':>8}")
+    for result in results:
+        print(f"{result['variant']:<24}{result['training_rows']:>9,}{result['sample_seconds']:>10.2f}"
+              f"{result['feature_seconds']:>12.2f}{result['fit_seconds']:>8.2f}"
+              f"{result['mse']:>10.5f}{result['r2']:>8.3f}{result['r2_change']:>+8.3f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'rows': args.rows, 'half_life_days': args.half_life,
+                       'test_fraction': args.test_fraction, 'seed': args.seed,
+                       'results': results}, f, indent=2)
+
+if __name__ == '__main__':
+    main()
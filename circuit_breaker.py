@@ -0,0 +1,194 @@
+"""
+Circuit breaker with per-call deadlines for remote dependencies
+"""
+import contextvars
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+STATE_CLOSED = 'closed'
+STATE_HALF_OPEN = 'half_open'
+STATE_OPEN = 'open'
+
+STATE_VALUES = {STATE_CLOSED: 0, STATE_HALF_OPEN: 1, STATE_OPEN: 2}
+
+BREAKER_STATE = REGISTRY.gauge(
+    'circuit_breaker_state', 'Circuit breaker state (0 closed, 1 half-open, 2 open)', ('name',)
+)
+BREAKER_CALLS = REGISTRY.counter(
+    'circuit_breaker_calls_total', 'Calls through a circuit breaker by outcome', ('name', 'outcome')
+)
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the dependency while the circuit is open"""
+
+class CallDeadlineExceeded(Exception):
+    """Raised when a call does not finish within its deadline"""
+
+class CallQueueTimeout(CallDeadlineExceeded):
+    """Raised when a call cannot get an executor thread within its queue timeout"""
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive failures, rejects calls
+    immediately while open, and after reset_timeout lets a limited number of
+    half-open probe calls through; a successful probe closes it again
+
+    Calls with a deadline run on an executor sized max_concurrent_calls, which
+    should cover every thread that may call at once (the web server's threads
+    and the HTTP pool). The deadline starts when the call starts running;
+    waiting for an executor thread is bounded by queue_timeout instead and
+    does not count as a failure of the dependency.
+    """
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0, deadline=None,
+                 half_open_max_calls=1, max_concurrent_calls=32, queue_timeout=None):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.deadline = deadline
+        self.half_open_max_calls = half_open_max_calls
+        self.max_concurrent_calls = max_concurrent_calls
+        self.queue_timeout = queue_timeout
+        self._state = STATE_CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+        self._lock = threading.Lock()
+        self._executor = None
+        self._executor_pid = None
+        BREAKER_STATE.set(0, name=name)
+
+    @property
+    def state(self):
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    @property
+    def is_open(self):
+        return self.state == STATE_OPEN
+
+    @property
+    def accepting_calls(self):
+        """Whether a call made now would be let through (closed, or a half-open probe slot is free)"""
+        with self._lock:
+            self._maybe_half_open()
+            return self._state == STATE_CLOSED or (
+                self._state == STATE_HALF_OPEN and self._half_open_calls < self.half_open_max_calls
+            )
+
+    def _set_state(self, state):
+        if state != self._state:
+            logger.warning(f"Circuit breaker '{self.name}' {self._state} -> {state}")
+            self._state = state
+            BREAKER_STATE.set(STATE_VALUES[state], name=self.name)
+
+    def _maybe_half_open(self):
+        if self._state == STATE_OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._set_state(STATE_HALF_OPEN)
+            self._half_open_calls = 0
+
+    def allow_request(self):
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == STATE_CLOSED:
+                return True
+            if self._state == STATE_HALF_OPEN and self._half_open_calls < self.half_open_max_calls:
+                self._half_open_calls += 1
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._set_state(STATE_CLOSED)
+
+    def _release_probe(self):
+        """Give back a half-open probe slot that was taken by a call that never ran"""
+        with self._lock:
+            if self._state == STATE_HALF_OPEN and self._half_open_calls > 0:
+                self._half_open_calls -= 1
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == STATE_HALF_OPEN or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                self._set_state(STATE_OPEN)
+
+    def _get_executor(self):
+        with self._lock:
+            # Worker threads do not survive a fork, so a forked process builds its own pool
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor_pid = os.getpid()
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_concurrent_calls,
+                    thread_name_prefix=f'{self.name}-call'
+                )
+            return self._executor
+
+    def _run_with_deadline(self, function, args, kwargs, deadline):
+        # Run in the caller's context so tracing spans nest under the request
+        context = contextvars.copy_context()
+        started = threading.Event()
+
+        def run():
+            started.set()
+            return context.run(function, *args, **kwargs)
+
+        future = self._get_executor().submit(run)
+        queue_timeout = self.queue_timeout if self.queue_timeout is not None else deadline
+        if not started.wait(queue_timeout) and future.cancel():
+            raise CallQueueTimeout(f"'{self.name}' call waited {queue_timeout}s for a free thread")
+        try:
+            return future.result(timeout=deadline)
+        except FutureTimeoutError:
+            raise CallDeadlineExceeded(f"'{self.name}' call exceeded {deadline}s deadline")
+
+    def probe(self, function, *args, deadline=None, **kwargs):
+        """
+        Call function under the deadline without consulting or updating the
+        breaker, so a health check can see whether the dependency is back
+        while the circuit is still open
+        """
+        deadline = self.deadline if deadline is None else deadline
+        if deadline:
+            return self._run_with_deadline(function, args, kwargs, deadline)
+        return function(*args, **kwargs)
+
+    def call(self, function, *args, deadline=None, **kwargs):
+        """
+        Call function through the breaker. Raises CircuitOpenError without
+        calling it while open, and CallDeadlineExceeded if it runs past the
+        deadline (the call is abandoned, not interrupted)
+        """
+        if not self.allow_request():
+            BREAKER_CALLS.inc(name=self.name, outcome='rejected')
+            raise CircuitOpenError(f"Circuit '{self.name}' is open")
+
+        deadline = self.deadline if deadline is None else deadline
+        try:
+            if deadline:
+                result = self._run_with_deadline(function, args, kwargs, deadline)
+            else:
+                result = function(*args, **kwargs)
+        except CallQueueTimeout:
+            # This process is saturated, which says nothing about the dependency
+            self._release_probe()
+            BREAKER_CALLS.inc(name=self.name, outcome='queue_timeout')
+            raise
+        except Exception as e:
+            self.record_failure()
+            outcome = 'timeout' if isinstance(e, CallDeadlineExceeded) else 'failure'
+            BREAKER_CALLS.inc(name=self.name, outcome=outcome)
+            raise
+
+        self.record_success()
+        BREAKER_CALLS.inc(name=self.name, outcome='success')
+        return result
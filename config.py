@@ -1,9 +1,34 @@
+import logging
+import math
 import os
 from dotenv import load_dotenv
 
+logger = logging.getLogger(__name__)
+
 # Load environment variables
 load_dotenv()
 
+def parse_bandwidths(value):
+    """
+    Parse "disease=km,..." into {disease: km}; a malformed value is ignored
+    with a warning, leaving the built-in bandwidths
+    """
+    try:
+        bandwidths = {}
+        for item in value.split(','):
+            if not item.strip():
+                continue
+            disease, km = item.split('=')
+            km = float(km)
+            if not disease.strip() or not math.isfinite(km) or km <= 0:
+                raise ValueError(item)
+            bandwidths[disease.strip()] = km
+        return bandwidths
+    except ValueError:
+        logger.warning(f"Ignoring malformed KDE_BANDWIDTHS_KM={value!r}; expected e.g. "
+                       f"'dengue=0.3,tuberculosis=3' with positive widths in km")
+        return {}
+
 class Config:
     """Application configuration"""
     
@@ -31,6 +56,91 @@ class Config:
     
     # Geocoding Configuration
     NOMINATIM_USER_AGENT = os.environ.get('NOMINATIM_USER_AGENT', 'disease_monitoring_portal')
+    # Point these at a local stand-in (e.g. loadtest/stubs.py) for offline load tests
+    NOMINATIM_DOMAIN = os.environ.get('NOMINATIM_DOMAIN', 'nominatim.openstreetmap.org')
+    NOMINATIM_SCHEME = os.environ.get('NOMINATIM_SCHEME', 'https')
+    
+    # When the saved model is unpickled: 'background' (after the worker starts; /ready
+    # turns 200 when done), 'eager' (in create_app) or 'lazy' (on first prediction)
+    MODEL_LOADING = os.environ.get('MODEL_LOADING', 'background').lower()
+    # Risk model: 'forest' (random forest, refit by retrains), 'online' (SGD model
+    # that also learns from each registered entry between retrains) or 'kde'
+    # (kernel density of recent cases)
+    ML_BACKEND = os.environ.get('ML_BACKEND', 'forest').lower()
+    # kde: cases older than KDE_WINDOW_DAYS are ignored and the rest weigh half as much
+    # every KDE_HALF_LIFE_DAYS; KDE_BANDWIDTHS_KM overrides the per-disease kernel
+    # widths, e.g. "dengue=0.3,tuberculosis=3"
+    KDE_WINDOW_DAYS = float(os.environ.get('KDE_WINDOW_DAYS', 90))
+    KDE_HALF_LIFE_DAYS = float(os.environ.get('KDE_HALF_LIFE_DAYS', 14))
+    KDE_BANDWIDTHS_KM = parse_bandwidths(os.environ.get('KDE_BANDWIDTHS_KM', ''))
+    # Seconds between checks for a newly published model file (0 disables hot-loading)
+    MODEL_RELOAD_INTERVAL = float(os.environ.get('MODEL_RELOAD_INTERVAL', 5))
+    # Also train one model per disease with at least PER_DISEASE_MIN_ROWS entries, in
+    # parallel across MODEL_TRAINING_PROCESSES processes (default: one per CPU)
+    PER_DISEASE_MODELS = os.environ.get('PER_DISEASE_MODELS', 'false').lower() in ['true', 'on', '1']
+    MODEL_TRAINING_PROCESSES = int(os.environ.get('MODEL_TRAINING_PROCESSES', 0)) or None
+    PER_DISEASE_MIN_ROWS = int(os.environ.get('PER_DISEASE_MIN_ROWS', 30))
+    # Train on a recency-weighted sample of at most this many entries per disease,
+    # kept up to date incrementally (0 trains on every entry). An entry's sampling
+    # weight halves with every TRAINING_SAMPLE_HALF_LIFE_DAYS of age
+    TRAINING_SAMPLE_PER_DISEASE = int(os.environ.get('TRAINING_SAMPLE_PER_DISEASE', 0))
+    TRAINING_SAMPLE_HALF_LIFE_DAYS = float(os.environ.get('TRAINING_SAMPLE_HALF_LIFE_DAYS', 180))
+    
+    # Background report jobs (database path defaults to the instance folder)
+    REPORT_JOBS_DB = os.environ.get('REPORT_JOBS_DB')
+    REPORT_WORKERS = int(os.environ.get('REPORT_WORKERS', 2))
+    
+    # Single-flight coalescing of identical predictions (lock directory defaults to the instance folder)
+    SINGLE_FLIGHT_CROSS_WORKER = os.environ.get('SINGLE_FLIGHT_CROSS_WORKER', 'True').lower() == 'true'
+    SINGLE_FLIGHT_DIR = os.environ.get('SINGLE_FLIGHT_DIR')
+    SINGLE_FLIGHT_LOCK_TIMEOUT = float(os.environ.get('SINGLE_FLIGHT_LOCK_TIMEOUT', 60))
+    
+    # Admission control for CPU-heavy routes (per worker); LIGHT_RESERVED is the share of
+    # WORKER_THREADS heavy requests may never occupy, running or queued
+    WORKER_THREADS = int(os.environ.get('GUNICORN_THREADS', 32))
+    HEAVY_CONCURRENCY = int(os.environ.get('HEAVY_CONCURRENCY', 2))
+    HEAVY_QUEUE_BUDGET = float(os.environ.get('HEAVY_QUEUE_BUDGET', 5))
+    LIGHT_RESERVED = float(os.environ.get('LIGHT_RESERVED', 0.25))
+    
+    # Seconds between background health probes
+    HEALTH_PROBE_INTERVAL = float(os.environ.get('HEALTH_PROBE_INTERVAL', 30))
+    
+    # Seconds a data watermark is trusted before it is re-read (conditional GETs, caches)
+    WATERMARK_TTL = float(os.environ.get('WATERMARK_TTL', 2))
+    
+    # Server-Sent Events stream. Each open stream holds a worker thread, so at most
+    # SSE_MAX_STREAMS are served per worker (default: a quarter of WORKER_THREADS);
+    # further clients get a 503 with Retry-After
+    SSE_MAX_STREAMS = int(os.environ.get('SSE_MAX_STREAMS', max(1, WORKER_THREADS // 4)))
+    SSE_POLL_INTERVAL = float(os.environ.get('SSE_POLL_INTERVAL', 5))
+    SSE_HEARTBEAT = float(os.environ.get('SSE_HEARTBEAT', 15))
+    SSE_MAX_DURATION = float(os.environ.get('SSE_MAX_DURATION', 300))
+    
+    # Outbreak clusters: DBSCAN over the last OUTBREAK_WINDOW_DAYS of cases, where a case
+    # with OUTBREAK_MIN_CASES cases within OUTBREAK_EPS_KM is a core. Growth compares the
+    # last OUTBREAK_GROWTH_DAYS with the ones before. Checked every OUTBREAK_INTERVAL
+    # seconds and after each registration (0: only when /api/clusters/outbreaks is called)
+    OUTBREAK_EPS_KM = float(os.environ.get('OUTBREAK_EPS_KM', 1.0))
+    OUTBREAK_MIN_CASES = int(os.environ.get('OUTBREAK_MIN_CASES', 5))
+    OUTBREAK_WINDOW_DAYS = float(os.environ.get('OUTBREAK_WINDOW_DAYS', 14))
+    OUTBREAK_GROWTH_DAYS = float(os.environ.get('OUTBREAK_GROWTH_DAYS', 7))
+    OUTBREAK_INTERVAL = float(os.environ.get('OUTBREAK_INTERVAL', 60))
+    
+    # Metrics shared by the worker processes: each writes its values to this directory
+    # every METRICS_PUBLISH_INTERVAL seconds and /metrics on any of them renders all
+    METRICS_DIR = os.environ.get('METRICS_DIR')
+    METRICS_PUBLISH_INTERVAL = float(os.environ.get('METRICS_PUBLISH_INTERVAL', 5))
+    
+    # Opt-in profiling (requests also need ?profile=cpu|sample and an X-Profile-Token header)
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'False').lower() == 'true'
+    PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN')
+    PROFILE_DIR = os.environ.get('PROFILE_DIR')
+    PROFILE_TRAIN_MODEL = os.environ.get('PROFILE_TRAIN_MODEL', 'False').lower() == 'true'
+    
+    # Request tracing (exporter is 'file' for JSON lines or 'log')
+    TRACING_ENABLED = os.environ.get('TRACING_ENABLED', 'False').lower() == 'true'
+    TRACE_EXPORTER = os.environ.get('TRACE_EXPORTER', 'file')
+    TRACE_FILE = os.environ.get('TRACE_FILE')
     
     # Pagination
     POSTS_PER_PAGE = 25
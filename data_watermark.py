@@ -0,0 +1,151 @@
+"""
+Data watermark helpers used to tell when the disease data has changed
+"""
+import hashlib
+import inspect
+import logging
+import threading
+import time
+from functools import wraps
+from flask import make_response, request, session
+from sqlalchemy import func
+from database_models import db, DiseaseEntry
+from metrics import record_cache
+
+logger = logging.getLogger(__name__)
+
+def get_data_watermark(supabase_manager=None):
+    """
+    Return a cheap fingerprint (row count, newest id, newest created_at) of the
+    disease data, taken from Supabase when configured and the local DB otherwise
+    """
+    if supabase_manager:
+        marker = supabase_manager.get_latest_entry_marker()
+        if marker is not None:
+            return dict(marker, source='supabase')
+
+    try:
+        count, max_id, max_created_at = db.session.query(
+            func.count(DiseaseEntry.id),
+            func.max(DiseaseEntry.id),
+            func.max(DiseaseEntry.created_at)
+        ).one()
+        return {
+            'source': 'local',
+            'count': count or 0,
+            'max_id': max_id,
+            'max_created_at': max_created_at.isoformat() if max_created_at else None
+        }
+    except Exception as e:
+        logger.warning(f"Failed to compute local data watermark: {e}")
+        return {'source': 'none', 'count': 0, 'max_id': None, 'max_created_at': None}
+
+def watermark_key(watermark):
+    """Serialize a watermark into a stable string for cache keys"""
+    return f"{watermark.get('source')}:{watermark.get('count')}:{watermark.get('max_id')}:{watermark.get('max_created_at')}"
+
+class DataWatermark:
+    """
+    Cached data watermark plus model version
+
+    The watermark is refreshed at most once per ttl seconds by a single
+    caller (others keep using the previous value meanwhile) and is invalidated
+    immediately when this worker writes an entry, so revalidating clients can
+    be answered without touching the database or the model.
+    """
+
+    def __init__(self, loader, model_version=None, ttl=2.0):
+        self.loader = loader
+        self.model_version = model_version or (lambda: None)
+        self.ttl = ttl
+        self._value = None
+        self._loaded_at = 0.0
+        self._refreshing = threading.Lock()
+
+    def invalidate(self):
+        self._loaded_at = 0.0
+
+    def refresh(self):
+        """Reload the watermark now"""
+        with self._refreshing:
+            self._value = self.loader()
+            self._loaded_at = time.monotonic()
+        return self._value
+
+    def current(self):
+        """Return the watermark, refreshing it when it is older than the ttl"""
+        if self._value is None:
+            return self.refresh()
+        if time.monotonic() - self._loaded_at >= self.ttl and self._refreshing.acquire(blocking=False):
+            try:
+                self._value = self.loader()
+                self._loaded_at = time.monotonic()
+            finally:
+                self._refreshing.release()
+        return self._value
+
+    def key(self, include_model=False):
+        key = watermark_key(self.current())
+        if include_model:
+            key = f"{key}:{self.model_version()}"
+        return key
+
+    def etag(self, *parts, include_model=False):
+        payload = '|'.join([self.key(include_model)] + [str(part) for part in parts])
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+def conditional_get(watermark, include_model=False):
+    """
+    Decorator for GET views whose output only depends on the data (and
+    optionally the model): answers 304 Not Modified from the cached watermark
+    before the view runs, and tags fresh responses with an ETag
+
+    There is no Last-Modified: Supabase entries carry the occurrence date the
+    reporter picked as created_at, so a back-dated new entry would not move it
+    and If-Modified-Since clients would be told nothing changed.
+    """
+    def check_not_modified():
+        """Return (304 response or None, etag) for the current request"""
+        etag = watermark.etag(request.path, request.query_string.decode('utf-8'),
+                              include_model=include_model)
+        # Pages with pending flash messages must be rendered to show them
+        if session.get('_flashes'):
+            return None, etag
+
+        not_modified = bool(request.if_none_match) and request.if_none_match.contains(etag)
+        record_cache('conditional_get', not_modified)
+        if not not_modified:
+            return None, etag
+        response = make_response('', 304)
+        response.set_etag(etag)
+        return response, etag
+
+    def tag_response(rv, etag):
+        response = make_response(rv)
+        if response.status_code == 200:
+            # The view may have retrained the model, so tag what was actually served
+            if include_model:
+                etag = watermark.etag(request.path, request.query_string.decode('utf-8'),
+                                      include_model=True)
+            response.set_etag(etag)
+            response.cache_control.no_cache = True
+        return response
+
+    def decorator(view):
+        if inspect.iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(*args, **kwargs):
+                response, etag = check_not_modified()
+                if response is not None:
+                    return response
+                return tag_response(await view(*args, **kwargs), etag)
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            response, etag = check_not_modified()
+            if response is not None:
+                return response
+            return tag_response(view(*args, **kwargs), etag)
+        return wrapper
+    return decorator
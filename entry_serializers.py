@@ -0,0 +1,81 @@
+"""
+Bulk serialization of disease entries for /api/entries
+
+The columnar and Arrow formats are built straight from query result tuples,
+without creating a model object or a dict per row.
+"""
+import importlib.util
+import io
+import json
+import logging
+from database_models import db, DiseaseEntry
+
+logger = logging.getLogger(__name__)
+
+# pyarrow is slow to import, so it is only looked up here and imported on first use
+ARROW_AVAILABLE = importlib.util.find_spec('pyarrow') is not None
+
+ENTRY_FORMATS = ('json', 'columnar', 'arrow')
+
+ARROW_MIMETYPE = 'application/vnd.apache.arrow.stream'
+
+# Columns selected from the local table, in output order
+LOCAL_ENTRY_COLUMNS = [
+    DiseaseEntry.id,
+    DiseaseEntry.disease_name,
+    DiseaseEntry.patient_age,
+    DiseaseEntry.address,
+    DiseaseEntry.latitude,
+    DiseaseEntry.longitude,
+    DiseaseEntry.additional_info,
+    DiseaseEntry.occurrence_date,
+    DiseaseEntry.created_at,
+]
+
+DATETIME_COLUMNS = ('occurrence_date', 'created_at')
+
+def query_local_entry_columns():
+    """Read local entries as tuples and transpose them into columns"""
+    names = [column.key for column in LOCAL_ENTRY_COLUMNS]
+    rows = db.session.query(*LOCAL_ENTRY_COLUMNS).order_by(DiseaseEntry.id).all()
+    columns = dict(zip(names, map(list, zip(*rows)))) if rows else {name: [] for name in names}
+
+    # Same fields, in the same order, as to_dict(): disease_type is the Supabase
+    # name for disease_name, and the risk index is looked up once per row
+    risk_index = DiseaseEntry.DISEASE_RISK_INDEX
+    columns = {
+        'id': columns['id'],
+        'disease_name': columns['disease_name'],
+        'disease_type': columns['disease_name'],
+        **{name: columns[name] for name in names[2:]},
+        'risk_index': [risk_index.get(name, 0.50) for name in columns['disease_name']]
+    }
+    return columns
+
+def dict_rows_to_columns(rows):
+    """Transpose Supabase result dicts into columns keyed by field name"""
+    if not rows:
+        return {}
+    names = list(rows[0].keys())
+    return {name: [row.get(name) for row in rows] for name in names}
+
+def columns_to_json(columns):
+    """Serialize columns as a JSON object of arrays"""
+    encoded = {}
+    for name, values in columns.items():
+        if name in DATETIME_COLUMNS:
+            values = [value.isoformat() if hasattr(value, 'isoformat') else value for value in values]
+        encoded[name] = values
+    return json.dumps({'count': len(next(iter(columns.values()), [])), 'columns': encoded})
+
+def columns_to_arrow(columns):
+    """Serialize columns as an Arrow IPC stream"""
+    if not ARROW_AVAILABLE:
+        raise RuntimeError("pyarrow is not installed")
+    import pyarrow as pa
+
+    table = pa.Table.from_pydict(columns)
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
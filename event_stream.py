@@ -0,0 +1,185 @@
+"""
+In-process pub/sub fanout for the dashboard's Server-Sent Events stream
+
+A single poller thread per worker process watches for new entries and model
+version changes and publishes them once; every connected client only waits
+on its own in-memory queue, so open dashboards do not add database load.
+
+They do hold threads, though: under gunicorn's gthread worker each open
+stream occupies one of the worker's threads until it ends. The broker
+therefore admits at most max_subscribers streams per worker and answers the
+rest with Overloaded, which the app turns into a 503 with Retry-After.
+"""
+import json
+import logging
+import math
+import queue
+import threading
+import time
+from admission import Overloaded
+
+logger = logging.getLogger(__name__)
+
+def format_sse(event, data):
+    """Format a Server-Sent Events message"""
+    payload = json.dumps(data, default=str)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+class EventBroker:
+    """Fan published events out to every subscriber queue"""
+
+    def __init__(self, max_queue=100, max_subscribers=None, max_duration=300):
+        self.max_queue = max_queue
+        self.max_subscribers = max_subscribers
+        self.max_duration = max_duration
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def _retry_after(self):
+        """Seconds until a stream slot is likely free: streams end every max_duration / max_subscribers"""
+        return max(1, math.ceil(self.max_duration / self.max_subscribers))
+
+    def subscribe(self):
+        """New subscriber queue; raises Overloaded when max_subscribers streams are already open"""
+        subscription = queue.Queue(maxsize=self.max_queue)
+        with self._lock:
+            if self.max_subscribers is not None and len(self._subscribers) >= self.max_subscribers:
+                raise Overloaded(f"{len(self._subscribers)} event streams already open",
+                                 self._retry_after())
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, event, data):
+        """Serialize once and hand the message to every subscriber without blocking"""
+        message = format_sse(event, data)
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            try:
+                subscription.put_nowait(message)
+            except queue.Full:
+                # A client that stopped reading is cut off rather than slowing everyone down
+                self.unsubscribe(subscription)
+                self._close(subscription)
+
+    def close_all(self):
+        with self._lock:
+            subscribers = list(self._subscribers)
+            self._subscribers.clear()
+        for subscription in subscribers:
+            self._close(subscription)
+
+    @staticmethod
+    def _close(subscription):
+        try:
+            subscription.put_nowait(None)
+        except queue.Full:
+            pass
+
+    def stream(self, subscription, initial=(), heartbeat=15, max_duration=None):
+        """
+        Yield SSE messages for one subscriber; the stream ends after max_duration
+        so the browser's EventSource reconnects and worker threads get recycled
+        """
+        deadline = time.monotonic() + (self.max_duration if max_duration is None else max_duration)
+        try:
+            yield 'retry: 3000\n\n'
+            for message in initial:
+                yield message
+            while time.monotonic() < deadline:
+                try:
+                    message = subscription.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+                    continue
+                if message is None:
+                    break
+                yield message
+        finally:
+            self.unsubscribe(subscription)
+
+class ChangePoller:
+    """
+    Background thread that polls the data watermark once per interval (only
+    while someone is subscribed) and publishes new entries, disease counts and
+    model version changes to the broker
+    """
+
+    def __init__(self, broker, get_watermark, get_entries_since, get_disease_counts,
+                 get_model_version, interval=5.0):
+        self.broker = broker
+        self.get_watermark = get_watermark
+        self.get_entries_since = get_entries_since
+        self.get_disease_counts = get_disease_counts
+        self.get_model_version = get_model_version
+        self.interval = interval
+        self.last_watermark = None
+        self.last_id = None
+        self.model_version = None
+        self.disease_counts = {}
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='sse-change-poller', daemon=True)
+                self._thread.start()
+
+    def notify(self):
+        """Poll right away, e.g. after this worker inserted an entry"""
+        self._wakeup.set()
+
+    def snapshot_messages(self):
+        """Last known state, sent to new subscribers without querying anything"""
+        messages = []
+        if self.last_watermark is not None:
+            messages.append(format_sse('counts', {
+                'disease_counts': self.disease_counts,
+                'total_entries': sum(self.disease_counts.values())
+            }))
+        if self.model_version is not None:
+            messages.append(format_sse('model', {'model_version': self.model_version}))
+        return messages
+
+    def _run(self):
+        while True:
+            if self.broker.subscriber_count:
+                try:
+                    self.poll_once()
+                except Exception as e:
+                    logger.warning(f"Change poller failed: {e}")
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+
+    def poll_once(self):
+        model_version = self.get_model_version()
+        if model_version != self.model_version:
+            self.model_version = model_version
+            self.broker.publish('model', {'model_version': model_version})
+
+        watermark = self.get_watermark()
+        if watermark == self.last_watermark:
+            return
+
+        max_id = watermark.get('max_id')
+        if self.last_id is not None and max_id is not None and max_id > self.last_id:
+            for entry in self.get_entries_since(self.last_id):
+                self.broker.publish('entry', entry)
+        self.last_id = max_id
+        self.last_watermark = watermark
+
+        self.disease_counts = self.get_disease_counts()
+        self.broker.publish('counts', {
+            'disease_counts': self.disease_counts,
+            'total_entries': sum(self.disease_counts.values())
+        })
@@ -0,0 +1,69 @@
+"""
+Gunicorn settings, picked up automatically from the working directory
+
+With preload_app (the default here) the master imports the app once: the
+model is unpickled and the heavy modules imported before any worker is
+forked, then gc.freeze() moves those objects out of the collector's reach so
+workers do not dirty their pages while scanning them. Workers therefore share
+one copy of the model copy-on-write instead of each loading its own. Each
+worker's ModelWatcher hot-loads newly published model files (see
+MODEL_RELOAD_INTERVAL) into private memory. No background thread runs in the
+master, so nothing holds a lock at fork time: post_fork starts each worker's
+own threads (model watcher, outbreak detector, metrics publisher) after
+disposing of the database connections inherited from the master, and a
+worker forked later picks up newer model versions within one reload interval.
+
+Metrics are kept per worker, so with more than one worker they are shared
+through METRICS_DIR (a fresh temporary directory unless set): any worker's
+/metrics then reports the sum over all workers instead of its own numbers.
+
+Set GUNICORN_PRELOAD=false to load the app (and model) in each worker instead.
+"""
+import gc
+import glob
+import os
+import tempfile
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 32))
+timeout = 120
+
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() in ['true', 'on', '1']
+
+if workers > 1:
+    os.environ.setdefault('METRICS_DIR', os.path.join(tempfile.gettempdir(), f'portal-metrics-{os.getpid()}'))
+
+if preload_app:
+    # Load the model while the master imports the app, not on a background
+    # thread that would not survive the fork
+    os.environ.setdefault('MODEL_LOADING', 'eager')
+
+def on_starting(server):
+    directory = os.environ.get('METRICS_DIR')
+    if directory:
+        # Counts left by the workers of an earlier run would be added to this one's
+        for path in glob.glob(os.path.join(directory, '*.json')):
+            os.remove(path)
+
+def when_ready(server):
+    if preload_app:
+        # Everything allocated so far (app, model, imported modules) is shared with
+        # the workers; keep the GC from touching it after the fork
+        gc.collect()
+        gc.freeze()
+        server.log.info(f"Preloaded app; froze {gc.get_freeze_count()} objects for copy-on-write sharing")
+
+def post_fork(server, worker):
+    if preload_app:
+        from app import app
+        from database_models import db
+
+        # Sockets opened in the master must not be shared: drop the inherited
+        # pool without closing them, so the master's connections stay usable
+        with app.app_context():
+            db.engine.dispose(close=False)
+        # Threads do not survive the fork; start this worker's own
+        for start in app.extensions.get('worker_tasks', ()):
+            start()
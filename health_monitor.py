@@ -0,0 +1,98 @@
+"""
+Background health probing
+
+Component checks (Supabase, local DB) run on a background thread at a fixed
+interval, so /health can answer instantly from the last results and a slow
+dependency never makes the health check itself time out. A deep probe may
+run other checks for some components (e.g. querying Supabase past its
+circuit breaker).
+"""
+import logging
+import threading
+import time
+from datetime import datetime
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+COMPONENT_UP = REGISTRY.gauge(
+    'health_component_up', 'Whether the last health probe of a component succeeded', ('component',)
+)
+COMPONENT_LATENCY = REGISTRY.gauge(
+    'health_component_latency_seconds', 'Latency of the last health probe of a component', ('component',)
+)
+
+class HealthProber:
+    """Runs named health checks periodically and caches their results"""
+
+    def __init__(self, checks, interval=30.0, deep_checks=None):
+        self.checks = checks
+        self.deep_checks = deep_checks or {}
+        self.interval = interval
+        self._results = {}
+        self._lock = threading.Lock()
+        self._probe_lock = threading.Lock()
+        self._deep_probe_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='health-prober', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self.probe_all()
+            except Exception as e:
+                logger.warning(f"Health probe failed: {e}")
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+
+    def probe(self, name, deep=False):
+        """Run one check (its deep variant if asked and there is one) now and cache its result"""
+        check = self.deep_checks.get(name, self.checks[name]) if deep else self.checks[name]
+        started = time.perf_counter()
+        error = None
+        try:
+            healthy = bool(check())
+        except Exception as e:
+            healthy, error = False, str(e)
+        latency = time.perf_counter() - started
+
+        result = {
+            'healthy': healthy,
+            'latency_ms': round(latency * 1000, 2),
+            'checked_at': datetime.utcnow().isoformat(),
+            'error': error
+        }
+        with self._lock:
+            self._results[name] = result
+        COMPONENT_UP.set(1 if healthy else 0, component=name)
+        COMPONENT_LATENCY.set(latency, component=name)
+        return result
+
+    def probe_all(self, deep=False):
+        """Run every check now; concurrent callers wait for the same probe instead of repeating it"""
+        lock = self._deep_probe_lock if deep else self._probe_lock
+        if not lock.acquire(blocking=False):
+            with lock:
+                return self.snapshot()
+        try:
+            for name in self.checks:
+                self.probe(name, deep=deep)
+        finally:
+            lock.release()
+        return self.snapshot()
+
+    def snapshot(self):
+        """Last known result of every check; unprobed checks report healthy=None"""
+        with self._lock:
+            return {
+                name: dict(self._results.get(name) or {
+                    'healthy': None, 'latency_ms': None, 'checked_at': None, 'error': None
+                })
+                for name in self.checks
+            }
@@ -0,0 +1,131 @@
+"""
+Shared, pooled HTTP transport for outbound API clients
+
+One httpx.Client per worker process is shared by the anon and admin Supabase
+clients, so keep-alive connections (and their TLS sessions) are reused across
+requests and gunicorn threads instead of each client holding its own pool.
+Connection-level events from httpcore's trace extension feed metrics for new
+versus reused connections, connect/TLS time and time spent waiting for a
+pooled connection.
+"""
+import importlib.util
+import logging
+import os
+import threading
+import time
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# httpx (and h2) are only imported when the first client is built
+HTTP2_AVAILABLE = importlib.util.find_spec('h2') is not None
+
+CONNECT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+CONNECTIONS_OPENED = REGISTRY.counter(
+    'http_pool_connections_opened_total', 'New connections opened by a pooled HTTP client', ('pool',)
+)
+CONNECTIONS_REUSED = REGISTRY.counter(
+    'http_pool_connections_reused_total', 'Requests sent on an already open pooled connection', ('pool',)
+)
+CONNECTIONS_OPEN = REGISTRY.gauge(
+    'http_pool_connections_open', 'Connections currently held by a pooled HTTP client', ('pool',)
+)
+CONNECT_TIME = REGISTRY.histogram(
+    'http_pool_connect_seconds', 'TCP connect plus TLS handshake time of new connections',
+    ('pool',), buckets=CONNECT_BUCKETS
+)
+POOL_WAIT_TIME = REGISTRY.histogram(
+    'http_pool_wait_seconds', 'Time from issuing a request until it had a connection to send on',
+    ('pool',), buckets=WAIT_BUCKETS
+)
+
+class ConnectionTracer:
+    """Per-request httpcore trace callback recording connection metrics"""
+
+    __slots__ = ('pool', 'started', 'connect_started')
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.started = time.perf_counter()
+        self.connect_started = None
+
+    def __call__(self, event_name, info):
+        if event_name == 'connection.connect_tcp.started':
+            self.connect_started = time.perf_counter()
+            POOL_WAIT_TIME.observe(self.connect_started - self.started, pool=self.pool)
+            CONNECTIONS_OPENED.inc(pool=self.pool)
+        elif event_name.endswith('.send_request_headers.started'):
+            now = time.perf_counter()
+            if self.connect_started is not None:
+                CONNECT_TIME.observe(now - self.connect_started, pool=self.pool)
+            else:
+                POOL_WAIT_TIME.observe(now - self.started, pool=self.pool)
+                CONNECTIONS_REUSED.inc(pool=self.pool)
+
+class PooledHttpClient:
+    """
+    Lazily built, process-local httpx.Client; a forked worker gets a fresh
+    client instead of sharing the parent's sockets
+    """
+
+    def __init__(self, pool, max_connections=32, max_keepalive=16, keepalive_expiry=30.0,
+                 connect_timeout=3.0, read_timeout=10.0, write_timeout=10.0, pool_timeout=2.0,
+                 http2=False):
+        self.pool = pool
+        self.limits = dict(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.timeout = dict(
+            connect=connect_timeout, read=read_timeout, write=write_timeout, pool=pool_timeout
+        )
+        self.http2 = bool(http2) and HTTP2_AVAILABLE
+        if http2 and not HTTP2_AVAILABLE:
+            logger.warning("HTTP/2 requested but the h2 package is not installed; using HTTP/1.1")
+        self._client = None
+        self._pid = None
+        self._lock = threading.Lock()
+        REGISTRY.add_collector(self._collect)
+
+    def get(self):
+        """The httpx.Client for this process"""
+        pid = os.getpid()
+        if self._client is not None and self._pid == pid:
+            return self._client
+        with self._lock:
+            if self._client is None or self._pid != pid:
+                import httpx
+
+                # The parent's client is left alone: closing it would shut sockets it still uses
+                self._client = httpx.Client(
+                    limits=httpx.Limits(**self.limits),
+                    timeout=httpx.Timeout(**self.timeout),
+                    http2=self.http2,
+                    follow_redirects=True,
+                    event_hooks={'request': [self._attach_tracer]}
+                )
+                self._pid = pid
+            return self._client
+
+    def _attach_tracer(self, request):
+        request.extensions['trace'] = ConnectionTracer(self.pool)
+
+    def open_connections(self):
+        client = self._client
+        if client is None or self._pid != os.getpid():
+            return 0
+        # httpx keeps its httpcore pool on a private attribute; degrade to 0 if that changes
+        pool = getattr(getattr(client, '_transport', None), '_pool', None)
+        return len(getattr(pool, 'connections', ()))
+
+    def _collect(self):
+        CONNECTIONS_OPEN.set(self.open_connections(), pool=self.pool)
+
+    def close(self):
+        with self._lock:
+            if self._client is not None and self._pid == os.getpid():
+                self._client.close()
+            self._client = None
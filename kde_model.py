@@ -0,0 +1,201 @@
+"""
+Case-density risk engine (ML_BACKEND=kde)
+
+Instead of regressing a hand-coded risk score, this backend estimates how
+densely recent cases of a disease cluster around a point: a Gaussian kernel
+density over great-circle distance, with each case's weight halving every
+half_life_days and a bandwidth per disease.
+
+Cases are first summed, with their weights, into cells a quarter of the
+bandwidth wide, and the cell centroids indexed by a haversine BallTree. A
+query visits only the cells within CUTOFF bandwidths of the point, and there
+is a bounded number of those however many cases there are, so answering a
+predict_risk_areas query costs a tree descent: O(log n).
+
+Density is turned into a 0-1 risk as density / (density + scale), where
+scale is the density at a typical case: half of the (weighted) cases lie
+where risk is at least 0.5.
+"""
+import logging
+import time
+from datetime import datetime
+
+import numpy as np
+
+from metrics import stage_timer
+from ml_model import DiseaseRiskPredictor, ModelSnapshot, entries_to_dataframe
+from tracing import span
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 111.195
+
+# How far one case's risk spreads: short for Aedes-borne diseases (the mosquito
+# rarely flies beyond a few hundred metres), wider for person-to-person and
+# water-borne spread
+DISEASE_BANDWIDTH_KM = {
+    'dengue': 0.5,
+    'chikungunya': 0.5,
+    'malaria': 1.0,
+    'covid19': 1.0,
+    'influenza': 1.0,
+    'typhoid': 1.5,
+    'hepatitis_a': 1.5,
+    'tuberculosis': 2.0
+}
+DEFAULT_BANDWIDTH_KM = 1.0
+
+# The kernel is cut off at this many bandwidths (where it is below 1.2% of its peak)
+CUTOFF = 3.0
+# Cell width as a fraction of the bandwidth
+CELL_FRACTION = 0.25
+# Cases sampled to estimate the density at a typical case
+SCALE_SAMPLE = 2000
+
+class DensityGrid:
+    """Weighted case counts of one disease in small cells, indexed by a haversine BallTree"""
+
+    def __init__(self, lats, lngs, weights, bandwidth_km):
+        import pandas as pd
+        from sklearn.neighbors import BallTree
+
+        self.bandwidth = bandwidth_km / EARTH_RADIUS_KM  # radians
+        cell = bandwidth_km * CELL_FRACTION / KM_PER_DEGREE
+        lat_cells = np.floor(lats / cell)
+        # Longitude cells narrow with latitude so cells stay roughly square
+        lng_cells = np.floor(lngs * np.cos(np.radians((lat_cells + 0.5) * cell)) / cell)
+        cells = pd.DataFrame({
+            'lat_cell': lat_cells, 'lng_cell': lng_cells, 'weight': weights,
+            'weighted_lat': weights * lats, 'weighted_lng': weights * lngs
+        }).groupby(['lat_cell', 'lng_cell'], sort=False).sum()
+
+        self.weights = cells['weight'].to_numpy()
+        self.centroids = np.column_stack([cells['weighted_lat'].to_numpy() / self.weights,
+                                          cells['weighted_lng'].to_numpy() / self.weights])
+        self.tree = BallTree(np.radians(self.centroids), metric='haversine')
+
+        # Median density over cases, from cells sampled in proportion to their weight
+        rng = np.random.default_rng(0)
+        sample = rng.choice(len(self.weights), size=min(len(self.weights), SCALE_SAMPLE),
+                            p=self.weights / self.weights.sum())
+        self.scale = float(np.median(self.density(*self.centroids[sample].T))) or 1.0
+
+    def __len__(self):
+        return len(self.weights)
+
+    def density(self, lats, lngs):
+        """Kernel-weighted sum of case weights around each point"""
+        points = np.radians(np.column_stack([lats, lngs]))
+        indices, distances = self.tree.query_radius(points, r=CUTOFF * self.bandwidth, return_distance=True)
+        return np.array([
+            np.dot(self.weights[cells], np.exp(-0.5 * (cell_distances / self.bandwidth) ** 2))
+            for cells, cell_distances in zip(indices, distances)
+        ])
+
+class CaseDensityIndex:
+    """Per-disease density grids over the cases of the last window_days; the model of a KDE snapshot"""
+
+    def __init__(self, data, bandwidths_km=None, half_life_days=14.0, window_days=90, built_at=None):
+        import pandas as pd
+
+        self.half_life_days = half_life_days
+        self.built_at = built_at or pd.Timestamp.now(tz='UTC')
+        bandwidths_km = dict(DISEASE_BANDWIDTH_KM, **(bandwidths_km or {}))
+
+        data = data.dropna(subset=['latitude', 'longitude'])
+        dates = pd.to_datetime(data['occurrence_date'], format='mixed', errors='coerce', utc=True)
+        # Undated cases count as reported now; future-dated ones as now
+        age_days = ((self.built_at - dates).dt.total_seconds() / 86400).fillna(0).clip(lower=0).to_numpy()
+        recent = age_days <= window_days if window_days else np.ones(len(data), dtype=bool)
+        weights = 0.5 ** (age_days / half_life_days) if half_life_days else np.ones(len(data))
+
+        lats = data['latitude'].to_numpy(dtype=float)
+        lngs = data['longitude'].to_numpy(dtype=float)
+        diseases = data['disease_name'].to_numpy()
+        self.grids = {}
+        for disease in pd.unique(diseases[recent]):
+            rows = recent & (diseases == disease)
+            self.grids[disease] = DensityGrid(lats[rows], lngs[rows], weights[rows],
+                                              bandwidths_km.get(disease, DEFAULT_BANDWIDTH_KM))
+        self.cases = int(recent.sum())
+
+    @property
+    def cells(self):
+        return sum(len(grid) for grid in self.grids.values())
+
+    def risk(self, disease_name, lats, lngs, at=None):
+        """0-1 risk of disease_name at each point; 0 where it has no recent cases"""
+        import pandas as pd
+
+        grid = self.grids.get(disease_name)
+        if grid is None:
+            return np.zeros(len(lats))
+        density = grid.density(lats, lngs)
+        if self.half_life_days:
+            # Weights were computed at build time; the cases have aged since
+            elapsed = ((at or pd.Timestamp.now(tz='UTC')) - self.built_at).total_seconds() / 86400
+            density = density * 0.5 ** (max(elapsed, 0) / self.half_life_days)
+        return density / (density + grid.scale)
+
+class KDERiskPredictor(DiseaseRiskPredictor):
+    """DiseaseRiskPredictor scoring points by the density of recent cases around them"""
+
+    disease_models_dir = 'kde_disease_models'
+
+    def __init__(self, load=True, bandwidths_km=None, half_life_days=14.0, window_days=90, **kwargs):
+        super().__init__(load=False, **kwargs)
+        # Its own artifact, so switching backends does not load the other ones' models
+        self.model_path = 'kde_risk_model.pkl'
+        self.bandwidths_km = dict(bandwidths_km or {})
+        self.half_life_days = half_life_days
+        self.window_days = window_days
+        if load:
+            self.ensure_loaded()
+
+    def _train_model(self, supabase_manager=None):
+        try:
+            with stage_timer('train_model', 'fetch'), span('train_model.fetch'):
+                entries, sampled_from = self._fetch_entries(supabase_manager)
+
+            with stage_timer('train_model', 'fit'), span('train_model.fit'):
+                started = time.perf_counter()
+                index = CaseDensityIndex(entries_to_dataframe(entries), self.bandwidths_km,
+                                         self.half_life_days, self.window_days)
+                build_seconds = time.perf_counter() - started
+            if not entries and self.is_trained:
+                # More likely a failed fetch than a table emptied since the last build
+                print("No entries fetched; keeping the current density index")
+                return False
+            # No recent cases is a valid state: an empty index that scores every point 0
+            print(f"Density index built over {index.cases} cases in {index.cells} cells ({build_seconds:.2f}s)")
+
+            trained_at = datetime.now()
+            snapshot = ModelSnapshot(
+                model=index,
+                version=trained_at.strftime('%Y%m%d%H%M%S%f'),
+                metrics={
+                    'training_rows': len(entries),
+                    'sampled_from': int(sampled_from or len(entries)),
+                    'cases': index.cases,
+                    'cells': index.cells,
+                    'build_seconds': round(build_seconds, 3),
+                    'trained_at': trained_at.isoformat()
+                },
+                is_trained=True
+            )
+            with stage_timer('train_model', 'save'), span('train_model.save'):
+                self.save_model(snapshot)
+            self._swap_snapshot(snapshot)
+            return True
+
+        except Exception as e:
+            print(f"Error training model: {str(e)}")
+            return False
+
+    def _score_points(self, snapshot, lats, lngs, disease_name):
+        return snapshot.model.risk(disease_name, lats, lngs)
+
+    def _default_risk_areas(self, center_lat, center_lng):
+        """Without a density index there is no evidence of risk: the usual zones, scored 0"""
+        return [dict(area, risk_score=0.0) for area in super()._default_risk_areas(center_lat, center_lng)]
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Load test the portal offline
+
+Starts the PostgREST and Nominatim stand-ins from loadtest/stubs.py, runs the
+app under gunicorn (same worker class as production) pointed at them, then
+drives a weighted request mix from concurrent virtual users and reports
+throughput and p50/p95/p99 latency per route. Pass --target to load an app
+you started yourself instead.
+
+Usage: python loadtest/run_load.py [--users 20] [--duration 30] [--workers 2] [--threads 32]
+                                   [--mix "home=20,dashboard=15,entries=20,risk_prediction=10,risk_map=10,register=5"]
+                                   [--latency 0.02] [--failure-rate 0.0] [--geocoder-latency 0.2]
+                                   [--json results.json]
+"""
+import argparse
+import json
+import math
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stubs import DISEASES, start_stubs
+
+DEFAULT_MIX = 'home=20,dashboard=15,entries=20,risk_prediction=10,risk_map=10,register=5'
+# A handful of map centers so repeated requests exercise caching and coalescing
+MAP_POINTS = [(13.0827, 80.2707), (13.0674, 80.2376), (13.0418, 80.2341), (13.1143, 80.2329)]
+CSRF_PATTERN = re.compile(r'name="csrf_token"[^>]*value="([^"]+)"')
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        if name.strip() not in SCENARIOS:
+            raise SystemExit(f"Unknown route '{name}'; choose from {', '.join(SCENARIOS)}")
+        mix[name.strip()] = float(weight)
+    return mix
+
+# Each scenario issues its requests through call(route, method, path, **kwargs),
+# which times and records them and returns the response
+
+def scenario_home(call, options):
+    call('GET /', 'GET', '/')
+
+def scenario_dashboard(call, options):
+    call('GET /dashboard', 'GET', '/dashboard')
+
+def scenario_entries(call, options):
+    call('GET /api/entries', 'GET', '/api/entries')
+
+def scenario_risk_prediction(call, options):
+    call('GET /risk-prediction/<id>', 'GET', f'/risk-prediction/{random.randint(1, options.max_id)}')
+
+def scenario_risk_map(call, options):
+    lat, lng = random.choice(MAP_POINTS)
+    call('GET /api/risk-map', 'GET', f'/api/risk-map/{lat}/{lng}/{random.choice(DISEASES)}')
+
+def scenario_register(call, options):
+    form = call('GET /register', 'GET', '/register')
+    match = CSRF_PATTERN.search(form.text) if form is not None else None
+    data = {
+        'disease_name': random.choice(DISEASES),
+        'patient_age': random.randint(1, 90),
+        'address': f'{random.randint(1, 999)} Load Test Road, Chennai, Tamil Nadu',
+        'additional_info': 'load test',
+        'occurrence_date': time.strftime('%Y-%m-%dT%H:%M')
+    }
+    if match:
+        data['csrf_token'] = match.group(1)
+    call('POST /register', 'POST', '/register', data=data)
+
+SCENARIOS = {
+    'home': scenario_home,
+    'dashboard': scenario_dashboard,
+    'entries': scenario_entries,
+    'risk_prediction': scenario_risk_prediction,
+    'risk_map': scenario_risk_map,
+    'register': scenario_register,
+}
+
+class Results:
+    """Latencies and status counts per route, shared by all virtual users"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.lock = threading.Lock()
+
+    def record(self, route, latency, status):
+        with self.lock:
+            self.latencies[route].append(latency)
+            self.statuses[route][status] += 1
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def virtual_user(base, mix, options, results, stop_at):
+    session = requests.Session()
+    names, weights = list(mix), list(mix.values())
+
+    def call(route, method, path, **kwargs):
+        started = time.perf_counter()
+        try:
+            # Redirects (e.g. after a registration) are not followed so each route is timed alone
+            response = session.request(method, f'{base}{path}', timeout=options.timeout,
+                                       allow_redirects=False, **kwargs)
+            # Reading .content makes the timing include the full body
+            response.content
+            results.record(route, time.perf_counter() - started, response.status_code)
+            return response
+        except requests.RequestException as e:
+            results.record(route, time.perf_counter() - started, type(e).__name__)
+            return None
+
+    while time.monotonic() < stop_at:
+        SCENARIOS[random.choices(names, weights)[0]](call, options)
+        if options.think_time:
+            time.sleep(random.uniform(0, 2 * options.think_time))
+
+def summarize(results, elapsed):
+    rows = []
+    for route in sorted(results.latencies):
+        latencies = sorted(results.latencies[route])
+        statuses = dict(results.statuses[route])
+        errors = sum(count for status, count in statuses.items()
+                     if not isinstance(status, int) or status >= 500)
+        rows.append({
+            'route': route,
+            'requests': len(latencies),
+            'throughput_rps': round(len(latencies) / elapsed, 2),
+            'errors': errors,
+            'shed_503': statuses.get(503, 0),
+            'p50_ms': round(percentile(latencies, 0.50) * 1000, 1),
+            'p95_ms': round(percentile(latencies, 0.95) * 1000, 1),
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 1),
+            'max_ms': round(latencies[-1] * 1000, 1),
+            'statuses': {str(status): count for status, count in statuses.items()}
+        })
+    total = sum(row['requests'] for row in rows)
+    return {
+        'duration_s': round(elapsed, 2),
+        'requests': total,
+        'throughput_rps': round(total / elapsed, 2) if elapsed else 0,
+        'routes': rows
+    }
+
+def print_report(summary):
+    print(f"\n{summary['requests']} requests in {summary['duration_s']}s "
+          f"({summary['throughput_rps']} req/s)\n")
+    header = f"{'route':<28}{'reqs':>7}{'req/s':>8}{'errors':>8}{'503':>6}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}"
+    print(header)
+    print('-' * len(header))
+    for row in summary['routes']:
+        print(f"{row['route']:<28}{row['requests']:>7}{row['throughput_rps']:>8}{row['errors']:>8}"
+              f"{row['shed_503']:>6}{row['p50_ms']:>9}{row['p95_ms']:>9}{row['p99_ms']:>9}{row['max_ms']:>9}")
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def start_app(options, stub_env, workdir):
+    """Run the app under gunicorn in a scratch directory so model and DB files stay out of the repo"""
+    port = free_port()
+    env = dict(os.environ, **stub_env)
+    env.update({
+        'FLASK_ENV': 'production',
+        'DATABASE_URL': f"sqlite:///{os.path.join(workdir, 'load.db')}",
+        'GUNICORN_THREADS': str(options.threads),
+        'PYTHONPATH': ROOT
+    })
+    command = [
+        sys.executable, '-m', 'gunicorn', 'app:app',
+        '--config', os.path.join(ROOT, 'gunicorn.conf.py'),
+        '--bind', f'127.0.0.1:{port}',
+        '--workers', str(options.workers),
+        '--worker-class', 'gthread', '--threads', str(options.threads),
+        '--timeout', '120', '--chdir', workdir, '--log-level', 'warning'
+    ]
+    log = open(os.path.join(workdir, 'gunicorn.log'), 'w')
+    process = subprocess.Popen(command, env=env, stdout=log, stderr=subprocess.STDOUT)
+    base = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"gunicorn exited early; see {log.name}")
+        try:
+            if requests.get(f'{base}/health', timeout=2).status_code == 200:
+                return process, base
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    process.terminate()
+    raise SystemExit(f"App did not become healthy; see {log.name}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--target', help='base URL of an already running app (skips stubs and gunicorn)')
+    parser.add_argument('--users', type=int, default=20, help='concurrent virtual users')
+    parser.add_argument('--duration', type=float, default=30, help='seconds of load after warmup')
+    parser.add_argument('--warmup', type=float, default=5, help='seconds of unrecorded load first')
+    parser.add_argument('--think-time', type=float, default=0.0, help='mean pause between a user\'s requests (s)')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='route=weight pairs')
+    parser.add_argument('--timeout', type=float, default=60)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--rows', type=int, default=2000, help='entries seeded into the Supabase stub')
+    parser.add_argument('--max-id', type=int, help='highest entry id for /risk-prediction (default --rows)')
+    parser.add_argument('--latency', type=float, default=0.02, help='Supabase stub latency (s)')
+    parser.add_argument('--jitter', type=float, default=0.01)
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='share of Supabase stub calls failing')
+    parser.add_argument('--geocoder-latency', type=float, default=0.2)
+    parser.add_argument('--geocoder-failure-rate', type=float, default=0.0)
+    parser.add_argument('--json', help='also write the summary to this file')
+    options = parser.parse_args()
+    options.max_id = options.max_id or options.rows
+    mix = parse_mix(options.mix)
+
+    process = None
+    with tempfile.TemporaryDirectory(prefix='loadtest-') as workdir:
+        try:
+            if options.target:
+                base = options.target.rstrip('/')
+            else:
+                _, _, stub_env = start_stubs(options.rows, options.latency, options.jitter, options.failure_rate,
+                                             options.geocoder_latency, options.geocoder_failure_rate)
+                process, base = start_app(options, stub_env, workdir)
+            print(f"Loading {base} with {options.users} users for {options.duration}s "
+                  f"(+{options.warmup}s warmup), mix: {options.mix}")
+
+            for phase, seconds in (('warmup', options.warmup), ('measure', options.duration)):
+                if seconds <= 0:
+                    continue
+                results = Results()
+                stop_at = time.monotonic() + seconds
+                users = [threading.Thread(target=virtual_user, args=(base, mix, options, results, stop_at), daemon=True)
+                         for _ in range(options.users)]
+                started = time.monotonic()
+                for user in users:
+                    user.start()
+                for user in users:
+                    user.join()
+                elapsed = time.monotonic() - started
+
+            summary = summarize(results, elapsed)
+            summary['config'] = {key: value for key, value in vars(options).items()}
+            print_report(summary)
+            if options.json:
+                with open(options.json, 'w') as f:
+                    json.dump(summary, f, indent=2)
+                print(f"\nWrote {options.json}")
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait(timeout=30)
+
+if __name__ == '__main__':
+    main()
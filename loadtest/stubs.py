@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Local stand-ins for Supabase and Nominatim
+
+A PostgREST-compatible stub for the disease_entries table (select, eq/neq/
+gt/gte/lt/lte filters, order, limit/offset, Prefer: count=exact and inserts
+with return=representation) and a fake Nominatim /search endpoint. Both add
+configurable latency and fail a configurable share of requests with a 503,
+so load tests can run offline against realistic slow or flaky dependencies.
+
+Usage: python loadtest/stubs.py [--rows 2000] [--latency 0.02] [--failure-rate 0.0]
+                                [--geocoder-latency 0.2] [--geocoder-failure-rate 0.0]
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+DISEASES = ['dengue', 'malaria', 'chikungunya', 'typhoid', 'hepatitis_a',
+            'tuberculosis', 'covid19', 'influenza', 'other']
+CENTER = (13.0827, 80.2707)  # Chennai
+FILTER_OPS = {
+    'eq': lambda a, b: a == b,
+    'neq': lambda a, b: a != b,
+    'gt': lambda a, b: a is not None and a > b,
+    'gte': lambda a, b: a is not None and a >= b,
+    'lt': lambda a, b: a is not None and a < b,
+    'lte': lambda a, b: a is not None and a <= b,
+}
+RESERVED_PARAMS = {'select', 'order', 'limit', 'offset', 'columns', 'on_conflict'}
+
+def generate_rows(count, seed=42):
+    """Synthetic disease_entries rows shaped like the Supabase schema"""
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    rows = []
+    for entry_id in range(1, count + 1):
+        created_at = now - timedelta(days=rng.randint(0, 365), minutes=rng.randint(0, 1440))
+        rows.append({
+            'id': entry_id,
+            'patient_name': 'Anonymous',
+            'age': rng.randint(1, 90),
+            'disease_type': rng.choice(DISEASES),
+            'severity': rng.randint(1, 5),
+            'address': f'{rng.randint(1, 999)} Example Street, Chennai, Tamil Nadu',
+            'latitude': round(CENTER[0] + rng.gauss(0, 0.05), 6),
+            'longitude': round(CENTER[1] + rng.gauss(0, 0.05), 6),
+            'created_at': created_at.isoformat(),
+            'updated_at': created_at.isoformat()
+        })
+    return rows
+
+class FaultInjection:
+    """Latency (base plus uniform jitter) and failure rate applied to every request"""
+
+    def __init__(self, latency=0.0, jitter=0.0, failure_rate=0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+
+    def apply(self):
+        """Sleep for the simulated latency; returns True if this request should fail"""
+        delay = self.latency + random.uniform(0, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+        return random.random() < self.failure_rate
+
+class EntryTable:
+    """Thread-safe in-memory disease_entries table"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.next_id = max((row['id'] for row in rows), default=0) + 1
+        self.lock = threading.Lock()
+
+    def query(self, params):
+        """Apply PostgREST filters, ordering and paging; returns (rows, total before paging)"""
+        with self.lock:
+            rows = list(self.rows)
+
+        for column, expression in params:
+            if column in RESERVED_PARAMS or '.' not in expression:
+                continue
+            op, _, raw = expression.partition('.')
+            if op not in FILTER_OPS:
+                continue
+            rows = [row for row in rows if FILTER_OPS[op](row.get(column), _coerce(raw, row.get(column)))]
+
+        query = dict(params)
+        for clause in reversed((query.get('order') or '').split(',')):
+            if not clause:
+                continue
+            column, _, direction = clause.partition('.')
+            descending = direction.startswith('desc')
+            rows.sort(key=lambda row: (row.get(column) is None, row.get(column)), reverse=descending)
+
+        total = len(rows)
+        offset = int(query.get('offset', 0))
+        limit = int(query['limit']) if 'limit' in query else None
+        rows = rows[offset:offset + limit if limit is not None else None]
+
+        select = query.get('select', '*')
+        if select != '*':
+            columns = [column.strip() for column in select.split(',')]
+            rows = [{column: row.get(column) for column in columns} for row in rows]
+        return rows, total
+
+    def insert(self, records):
+        now = datetime.utcnow().isoformat()
+        inserted = []
+        with self.lock:
+            for record in records:
+                row = dict(record, id=self.next_id)
+                row.setdefault('created_at', now)
+                row.setdefault('updated_at', now)
+                self.next_id += 1
+                self.rows.append(row)
+                inserted.append(row)
+        return inserted
+
+def _coerce(raw, sample):
+    """Convert a filter value to the type of the column it is compared with"""
+    if isinstance(sample, bool):
+        return raw == 'true'
+    if isinstance(sample, int):
+        try:
+            return int(raw)
+        except ValueError:
+            return raw
+    if isinstance(sample, float):
+        try:
+            return float(raw)
+        except ValueError:
+            return raw
+    return raw
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+class PostgrestHandler(_StubHandler):
+    """Serves /rest/v1/disease_entries from server.table"""
+
+    def _table(self):
+        path = urlsplit(self.path).path
+        if path.rstrip('/') != '/rest/v1/disease_entries':
+            self.send_json(404, {'message': f'relation "{path}" does not exist'})
+            return False
+        if self.server.faults.apply():
+            self.send_json(503, {'message': 'stub: injected failure'})
+            return False
+        return True
+
+    def do_GET(self):
+        if not self._table():
+            return
+        params = parse_qsl(urlsplit(self.path).query)
+        rows, total = self.server.table.query(params)
+        headers = {}
+        if 'count=exact' in self.headers.get('Prefer', ''):
+            offset = int(dict(params).get('offset', 0))
+            headers['Content-Range'] = f"{offset}-{offset + len(rows) - 1}/{total}" if rows else f"*/{total}"
+        self.send_json(200, rows, headers)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = json.loads(self.rfile.read(length) or b'[]')
+        if not self._table():
+            return
+        inserted = self.server.table.insert(body if isinstance(body, list) else [body])
+        if 'return=representation' in self.headers.get('Prefer', ''):
+            self.send_json(201, inserted)
+        else:
+            self.send_json(201, [])
+
+class GeocoderHandler(_StubHandler):
+    """Nominatim-style /search returning a stable point near Chennai for each query"""
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path.rstrip('/') != '/search':
+            self.send_json(404, {'error': 'not found'})
+            return
+        if self.server.faults.apply():
+            self.send_json(503, {'error': 'stub: injected failure'})
+            return
+        query = dict(parse_qsl(url.query)).get('q', '')
+        digest = hashlib.md5(query.encode('utf-8')).digest()
+        lat = CENTER[0] + (digest[0] - 128) / 2560
+        lon = CENTER[1] + (digest[1] - 128) / 2560
+        self.send_json(200, [{
+            'place_id': int.from_bytes(digest[:4], 'big'),
+            'lat': f'{lat:.6f}',
+            'lon': f'{lon:.6f}',
+            'display_name': query,
+            'class': 'place',
+            'type': 'house',
+            'importance': 0.5
+        }])
+
+def start_server(handler, port=0, faults=None, table=None):
+    """Start a stub server on a daemon thread; returns the server (server.server_port has the port)"""
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    server.daemon_threads = True
+    server.faults = faults or FaultInjection()
+    server.table = table
+    threading.Thread(target=server.serve_forever, name=f'{handler.__name__}-stub', daemon=True).start()
+    return server
+
+def start_stubs(rows=2000, latency=0.02, jitter=0.01, failure_rate=0.0,
+                geocoder_latency=0.2, geocoder_failure_rate=0.0, postgrest_port=0, geocoder_port=0):
+    """Start both stubs; returns (postgrest_server, geocoder_server, env for the app)"""
+    postgrest = start_server(PostgrestHandler, postgrest_port,
+                             FaultInjection(latency, jitter, failure_rate),
+                             EntryTable(generate_rows(rows)))
+    geocoder = start_server(GeocoderHandler, geocoder_port,
+                            FaultInjection(geocoder_latency, geocoder_latency / 2, geocoder_failure_rate))
+    env = {
+        'SUPABASE_URL': f'http://127.0.0.1:{postgrest.server_port}',
+        # Any JWT-shaped string passes the client's key check; the stub ignores auth
+        'SUPABASE_ANON_KEY': 'eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoiYW5vbiJ9.stub',
+        'NOMINATIM_DOMAIN': f'127.0.0.1:{geocoder.server_port}',
+        'NOMINATIM_SCHEME': 'http'
+    }
+    return postgrest, geocoder, env
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=2000, help='seeded disease entries')
+    parser.add_argument('--latency', type=float, default=0.02, help='PostgREST base latency (s)')
+    parser.add_argument('--jitter', type=float, default=0.01, help='PostgREST extra random latency (s)')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='share of PostgREST requests failing')
+    parser.add_argument('--geocoder-latency', type=float, default=0.2, help='geocoder base latency (s)')
+    parser.add_argument('--geocoder-failure-rate', type=float, default=0.0)
+    parser.add_argument('--port', type=int, default=54321, help='PostgREST stub port')
+    parser.add_argument('--geocoder-port', type=int, default=54322)
+    args = parser.parse_args()
+
+    _, _, env = start_stubs(args.rows, args.latency, args.jitter, args.failure_rate,
+                            args.geocoder_latency, args.geocoder_failure_rate,
+                            args.port, args.geocoder_port)
+    print("Stubs running. Start the app with:")
+    for name, value in env.items():
+        print(f"  export {name}={value}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,363 @@
+"""
+Prometheus-style metrics for the portal
+
+A small, dependency-free registry of counters, gauges and histograms that
+renders the Prometheus text exposition format. Recording is a dict lookup, a
+bisect and an increment under a per-metric lock, so it is cheap enough to
+leave on every request.
+
+Values are per process. With several gunicorn workers, Registry.share(dir)
+makes each worker write its values to its own file in dir every few seconds
+(and on every scrape it answers), and /metrics on any worker then renders
+all of them: counters and histograms summed over every worker that ever
+wrote there, gauges from live workers with a pid label. Counts a worker
+inherits from the preloading master at fork are dropped, so they are not
+counted once per worker.
+"""
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metric:
+    """Base class holding one value per label combination"""
+    type_name = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type_name}']
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_sample(key, value))
+        return lines
+
+    def _render_sample(self, key, value):
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}']
+
+class Counter(Metric):
+    type_name = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+class Gauge(Metric):
+    type_name = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+class Histogram(Metric):
+    type_name = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket (non-cumulative) counts, then sum and count
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels):
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def _render_sample(self, key, state):
+        counts, total, count = state
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += bucket_count
+            labels = _format_labels(self.labelnames, key, [('le', _format_value(float(bound)))])
+            lines.append(f'{self.name}_bucket{labels} {cumulative}')
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+        lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+METRIC_TYPES = {'counter': Counter, 'gauge': Gauge, 'histogram': Histogram}
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+class Registry:
+    """Collection of metrics plus callbacks that refresh gauges at scrape time"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+        self.directory = None
+        self.interval = 5.0
+        self._path = None
+        self._pid = None
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector):
+        """Register a callable run before each scrape, e.g. to set gauges from app state"""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def _collect(self):
+        for collector in list(self._collectors):
+            try:
+                collector()
+            except Exception:
+                pass
+        with self._lock:
+            return [self._metrics[name] for name in sorted(self._metrics)]
+
+    def render(self):
+        if self.directory:
+            return self._render_shared()
+        lines = []
+        for metric in self._collect():
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def share(self, directory, interval=5.0):
+        """Publish this process's values under directory and render those of every process there"""
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.interval = interval
+
+    def ensure_publishing(self):
+        """Write this process's values every interval on a daemon thread, again in a forked child"""
+        if not self.directory or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._path = os.path.join(self.directory, f"{self._pid}-{uuid.uuid4().hex[:8]}.json")
+        atexit.register(self._try_publish)
+        threading.Thread(target=self._publish_loop, name='metrics-publisher', daemon=True).start()
+
+    def publish(self):
+        """Write this process's current values to its file in the shared directory"""
+        if not self._path or self._pid != os.getpid():
+            return
+        state = {}
+        for metric in self._collect():
+            with metric._lock:
+                values = [[list(key), value] for key, value in metric._values.items()]
+            state[metric.name] = {
+                'type': metric.type_name,
+                'documentation': metric.documentation,
+                'labelnames': list(metric.labelnames),
+                'buckets': list(getattr(metric, 'buckets', ())),
+                'values': values
+            }
+        temporary = f"{self._path}.tmp"
+        with open(temporary, 'w') as f:
+            json.dump(state, f)
+        os.replace(temporary, self._path)
+
+    def _try_publish(self):
+        try:
+            self.publish()
+        except Exception:
+            pass
+
+    def _publish_loop(self):
+        while True:
+            time.sleep(self.interval)
+            self._try_publish()
+
+    def _render_shared(self):
+        self.ensure_publishing()
+        self.publish()
+        # Gauges are current state, so only the newest file of each live process counts
+        files = sorted(glob.glob(os.path.join(self.directory, '*.json')), key=os.path.getmtime)
+        newest = {}
+        for path in files:
+            newest[int(os.path.basename(path).split('-', 1)[0])] = path
+
+        merged = {}
+        for metric in self._collect():
+            labelnames = metric.labelnames + ('pid',) if metric.type_name == 'gauge' else metric.labelnames
+            merged[metric.name] = METRIC_TYPES[metric.type_name](
+                metric.name, metric.documentation, labelnames,
+                **({'buckets': metric.buckets} if metric.type_name == 'histogram' else {})
+            )
+        for path in files:
+            pid = int(os.path.basename(path).split('-', 1)[0])
+            try:
+                with open(path) as f:
+                    state = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for name, data in state.items():
+                kind = data['type']
+                target = merged.get(name)
+                if target is None:
+                    labelnames = data['labelnames'] + ['pid'] if kind == 'gauge' else data['labelnames']
+                    target = merged[name] = METRIC_TYPES[kind](
+                        name, data['documentation'], labelnames,
+                        **({'buckets': data['buckets']} if kind == 'histogram' else {})
+                    )
+                if kind == 'gauge' and (newest[pid] != path or not _process_alive(pid)):
+                    continue
+                for key, value in data['values']:
+                    key = tuple(key)
+                    if kind == 'gauge':
+                        target._values[key + (str(pid),)] = value
+                    elif kind == 'counter':
+                        target._values[key] = target._values.get(key, 0) + value
+                    else:
+                        counts, total, count = target._values.get(key, ([0] * (len(target.buckets) + 1), 0.0, 0))
+                        target._values[key] = [[a + b for a, b in zip(counts, value[0])],
+                                               total + value[1], count + value[2]]
+
+        lines = []
+        for name in sorted(merged):
+            lines.extend(merged[name].render())
+        return '\n'.join(lines) + '\n'
+
+    def _after_fork(self):
+        """In a forked child: fresh locks, and no counts inherited from the parent if values are shared"""
+        self._lock = threading.Lock()
+        for metric in self._metrics.values():
+            metric._lock = threading.Lock()
+            if self.directory and metric.type_name != 'gauge':
+                metric._values.clear()
+
+REGISTRY = Registry()
+os.register_at_fork(after_in_child=REGISTRY._after_fork)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+REQUEST_LATENCY = REGISTRY.histogram(
+    'http_request_duration_seconds', 'Request latency per Flask route',
+    ('route', 'method', 'status')
+)
+STAGE_LATENCY = REGISTRY.histogram(
+    'stage_duration_seconds', 'Latency of expensive operations and their stages',
+    ('operation', 'stage')
+)
+CACHE_REQUESTS = REGISTRY.counter(
+    'cache_requests_total', 'Cache lookups by cache and result (hit or miss)',
+    ('cache', 'result')
+)
+CACHE_HIT_RATIO = REGISTRY.gauge(
+    'cache_hit_ratio', 'Share of cache lookups that were hits since start', ('cache',)
+)
+MODEL_INFO = REGISTRY.gauge(
+    'model_info', 'Currently loaded risk model version (always 1)', ('version',)
+)
+
+def stage_timer(operation, stage='total'):
+    """Time a block as one stage of an operation"""
+    return STAGE_LATENCY.time(operation=operation, stage=stage)
+
+def timed(operation, stage='total'):
+    """Decorator recording every call of a function as a stage of an operation"""
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            with STAGE_LATENCY.time(operation=operation, stage=stage):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def record_cache(cache, hit):
+    CACHE_REQUESTS.inc(cache=cache, result='hit' if hit else 'miss')
+
+def _update_cache_hit_ratios():
+    caches = {key[0] for key in list(CACHE_REQUESTS._values)}
+    for cache in caches:
+        hits = CACHE_REQUESTS.value(cache=cache, result='hit')
+        misses = CACHE_REQUESTS.value(cache=cache, result='miss')
+        if hits + misses:
+            CACHE_HIT_RATIO.set(hits / (hits + misses), cache=cache)
+
+REGISTRY.add_collector(_update_cache_hit_ratios)
@@ -1,44 +1,291 @@
-import numpy as np
-import pandas as pd
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler, LabelEncoder
-from sklearn.metrics import mean_squared_error, r2_score
-from geopy.distance import geodesic
+import contextlib
+import hashlib
+import multiprocessing
 import pickle
 import os
+import re
+import tempfile
+import threading
+import time
 from datetime import datetime, timedelta
 import warnings
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from types import MappingProxyType
+from metrics import stage_timer, timed
+from profiling import PROFILER
+from tracing import span, traced
 warnings.filterwarnings('ignore')
 
+def entries_to_dataframe(entries):
+    """
+    Normalize Supabase dicts and SQLAlchemy objects into a single DataFrame
+    """
+    import pandas as pd
+    
+    data = []
+    for entry in entries:
+        # Handle both dictionary and object formats
+        if isinstance(entry, dict):
+            data.append({
+                'latitude': entry.get('latitude'),
+                'longitude': entry.get('longitude'),
+                'disease_name': entry.get('disease_type', entry.get('disease_name', 'unknown')),  # Normalize to disease_name
+                'patient_age': entry.get('patient_age', entry.get('age', 0)),  # Handle age field variations
+                'severity': entry.get('severity', 'medium'),
+                'occurrence_date': entry.get('occurrence_date', entry.get('created_at'))
+            })
+        else:
+            # SQLAlchemy object format
+            data.append({
+                'latitude': entry.latitude,
+                'longitude': entry.longitude,
+                'disease_name': entry.disease_name,  # Keep as disease_name for consistency
+                'patient_age': getattr(entry, 'patient_age', 0),
+                'severity': getattr(entry, 'severity', 'medium'),
+                'occurrence_date': entry.created_at
+            })
+    
+    return pd.DataFrame(data, columns=[
+        'latitude', 'longitude', 'disease_name', 'patient_age', 'severity', 'occurrence_date'
+    ])
+
+FEATURE_COLUMNS = [
+    'latitude', 'longitude', 'patient_age', 'disease_encoded',
+    'month', 'day_of_year', 'population_density_proxy'
+]
+
+_training_pool = None
+_training_pool_pid = None
+_training_pool_lock = threading.Lock()
+
+def _get_training_pool(processes):
+    """
+    Process pool for fitting forests, created on first use. Workers are spawned
+    rather than forked: forking a threaded web worker can copy held locks.
+    """
+    global _training_pool, _training_pool_pid
+    with _training_pool_lock:
+        if _training_pool is None or _training_pool_pid != os.getpid():
+            _training_pool = ProcessPoolExecutor(max_workers=processes,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+            _training_pool_pid = os.getpid()
+        return _training_pool
+
+def _reset_training_pool():
+    global _training_pool
+    with _training_pool_lock:
+        if _training_pool is not None:
+            _training_pool.shutdown(wait=False, cancel_futures=True)
+        _training_pool = None
+
+def _fit_forest(X_train, y_train, X_test, y_test, n_jobs=-1):
+    """Fit a scaler and forest on one training split; runs in the training pool or inline"""
+    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.metrics import mean_squared_error, r2_score
+    from sklearn.preprocessing import StandardScaler
+    
+    model = RandomForestRegressor(
+        n_estimators=100,
+        max_depth=10,
+        random_state=42,
+        n_jobs=n_jobs
+    )
+    scaler = StandardScaler()
+    
+    # Scale features
+    X_train_scaled = scaler.fit_transform(X_train)
+    X_test_scaled = scaler.transform(X_test)
+    
+    # Train model
+    model.fit(X_train_scaled, y_train)
+    
+    # Evaluate model
+    y_pred = model.predict(X_test_scaled)
+    return model, scaler, float(mean_squared_error(y_test, y_pred)), float(r2_score(y_test, y_pred))
+
+class ModelSnapshot:
+    """
+    One trained model version: estimators plus everything needed to build its
+    features. Never modified after creation; a new version is a new snapshot,
+    swapped in by reference, so a prediction that read the old one finishes on it.
+    A global snapshot may carry per-disease snapshots of the same version.
+    """
+    __slots__ = ('model', 'scaler', 'disease_encoder', 'training_center', 'feature_columns',
+                 'version', 'metrics', 'is_trained', 'disease_models')
+    
+    def __init__(self, model=None, scaler=None, disease_encoder=None, training_center=None,
+                 feature_columns=None, version=None, metrics=None, is_trained=False, disease_models=None):
+        for name, value in (('model', model), ('scaler', scaler), ('disease_encoder', disease_encoder),
+                            ('training_center', training_center),
+                            ('feature_columns', tuple(feature_columns or FEATURE_COLUMNS)),
+                            ('version', version), ('metrics', dict(metrics or {})),
+                            ('is_trained', is_trained),
+                            ('disease_models', MappingProxyType(dict(disease_models or {})))):
+            object.__setattr__(self, name, value)
+    
+    def for_disease(self, disease_name):
+        """The disease's own model if one was trained, otherwise this (global) one"""
+        return self.disease_models.get(disease_name, self)
+    
+    def __setattr__(self, name, value):
+        raise AttributeError("ModelSnapshot is immutable; build a new one instead")
+    
+    def to_artifact(self):
+        """The dict written to the model file"""
+        return {
+            'model': self.model,
+            'scaler': self.scaler,
+            'disease_encoder': self.disease_encoder,
+            'training_center': self.training_center,
+            'is_trained': self.is_trained,
+            'feature_columns': list(self.feature_columns),
+            'model_version': self.version,
+            'metrics': self.metrics,
+            # Per-disease models are stored in their own files; this lists them
+            'disease_models': sorted(self.disease_models)
+        }
+    
+    @classmethod
+    def from_artifact(cls, data, version=None, disease_models=None):
+        """Snapshot from a model file's dict; artifacts from before training centers were saved have none"""
+        return cls(
+            disease_models=disease_models,
+            model=data['model'],
+            scaler=data['scaler'],
+            disease_encoder=data['disease_encoder'],
+            training_center=data.get('training_center'),
+            feature_columns=data['feature_columns'],
+            version=data.get('model_version') or version,
+            metrics=data.get('metrics', {}),
+            is_trained=data['is_trained']
+        )
+
 class DiseaseRiskPredictor:
     """
     Machine Learning model for predicting disease risk areas based on historical data
+    
+    All model state lives in an immutable ModelSnapshot; training, loading and
+    reloading build a new snapshot and replace self._snapshot in one assignment.
     """
     
-    def __init__(self):
-        self.model = RandomForestRegressor(
-            n_estimators=100,
-            max_depth=10,
-            random_state=42,
-            n_jobs=-1
-        )
-        self.scaler = StandardScaler()
-        self.disease_encoder = LabelEncoder()
-        self.is_trained = False
+    feature_columns = FEATURE_COLUMNS
+    # Fits one training split; a module-level function so the training pool can pickle it
+    fit_split = staticmethod(_fit_forest)
+    # Folder, next to the model file, holding the per-disease models
+    disease_models_dir = 'disease_models'
+    
+    def __init__(self, load=True, per_disease=False, processes=None, min_disease_rows=30,
+                 sample_per_disease=0, sample_half_life_days=180.0):
+        self._snapshot = ModelSnapshot()
+        # Every swap of _snapshot goes through _swap_snapshot under this lock
+        self._swap_lock = threading.Lock()
         self.model_path = 'disease_risk_model.pkl'
-        self.feature_columns = [
-            'latitude', 'longitude', 'patient_age', 'disease_encoded',
-            'month', 'day_of_year', 'population_density_proxy'
-        ]
+        # Optionally also train one model per disease with at least min_disease_rows
+        # entries, fitted in parallel across a process pool of this size
+        self.per_disease = per_disease
+        self.processes = processes or os.cpu_count() or 1
+        self.min_disease_rows = min_disease_rows
+        # Optionally train on a recency-weighted sample of at most sample_per_disease
+        # entries per disease instead of the whole history
+        self.reservoir = None
+        self._reservoir_lock = threading.Lock()
+        if sample_per_disease:
+            from training_sample import StratifiedReservoir
+            self.reservoir = StratifiedReservoir(sample_per_disease, sample_half_life_days)
         
-        # Load pre-trained model if exists
-        self.load_model()
+        self._loaded = threading.Event()
+        self._load_lock = threading.Lock()
+        # stat() of the artifact this process last loaded or wrote, to spot newer versions
+        self._artifact_stat = None
+        self._last_reload_check = 0.0
+        
+        # Load pre-trained model if exists; with load=False it is loaded by
+        # load_in_background() or on first use
+        if load:
+            self.ensure_loaded()
+    
+    @property
+    def snapshot(self):
+        """The current model version; read it once and use it for the whole prediction"""
+        return self._snapshot
     
-    def prepare_features(self, data):
+    def _swap_snapshot(self, snapshot, expected=None):
         """
-        Prepare features for training or prediction
+        Make snapshot the current version. With expected, only if the current
+        version is still expected (compare-and-swap); returns whether it swapped
         """
+        with self._swap_lock:
+            if expected is not None and self._snapshot is not expected:
+                return False
+            self._snapshot = snapshot
+            return True
+    
+    @property
+    def model(self):
+        return self._snapshot.model
+    
+    @property
+    def scaler(self):
+        return self._snapshot.scaler
+    
+    @property
+    def disease_encoder(self):
+        return self._snapshot.disease_encoder
+    
+    @property
+    def is_trained(self):
+        return self._snapshot.is_trained
+    
+    @property
+    def model_version(self):
+        return self._snapshot.version
+    
+    @property
+    def metrics(self):
+        return self._snapshot.metrics
+    
+    @property
+    def is_loaded(self):
+        """Whether the saved model has been loaded (or found missing)"""
+        return self._loaded.is_set()
+    
+    def ensure_loaded(self):
+        """Load the saved model once; callers arriving during a background load wait for it"""
+        if self._loaded.is_set():
+            return
+        with self._load_lock:
+            if not self._loaded.is_set():
+                self.load_model()
+    
+    def load_in_background(self):
+        """Start loading the saved model on a daemon thread; returns the thread"""
+        thread = threading.Thread(target=self.ensure_loaded, name='model-loader', daemon=True)
+        thread.start()
+        return thread
+    
+    @staticmethod
+    def _fit_encoding(data):
+        """Untrained snapshot carrying the disease encoder and center fit on training data"""
+        from sklearn.preprocessing import LabelEncoder
+        
+        return ModelSnapshot(
+            disease_encoder=LabelEncoder().fit(data['disease_name']),
+            training_center=(float(data['latitude'].mean()), float(data['longitude'].mean()))
+        )
+    
+    def prepare_features(self, data, snapshot=None):
+        """
+        Prepare features for training or prediction. Uses the encoder and center
+        of the given (or current) snapshot; without a trained one they are fit
+        on data, as for training.
+        """
+        import pandas as pd
+        from geopy.distance import geodesic
+        
+        snapshot = snapshot or self._snapshot
+        if snapshot.disease_encoder is None:
+            snapshot = self._fit_encoding(data)
         df = data.copy()
         
         # Extract temporal features
@@ -47,8 +294,9 @@ class DiseaseRiskPredictor:
         df['day_of_year'] = df['occurrence_date'].dt.dayofyear
         
         # Population density proxy (inverse of distance from city center)
-        # This is a simplified proxy - in real implementation, use actual population data
-        city_center_lat, city_center_lng = df['latitude'].mean(), df['longitude'].mean()
+        # This is a simplified proxy - in real implementation, use actual population data.
+        # The center is the training data's, so a single prediction point is not its own center
+        city_center_lat, city_center_lng = snapshot.training_center or (df['latitude'].mean(), df['longitude'].mean())
         df['population_density_proxy'] = df.apply(
             lambda row: 1 / (geodesic(
                 (city_center_lat, city_center_lng),
@@ -56,18 +304,21 @@ class DiseaseRiskPredictor:
             ).kilometers + 1), axis=1
         )
         
-        # Encode disease names
-        if not hasattr(self.disease_encoder, 'classes_') or len(self.disease_encoder.classes_) == 0:
-            self.disease_encoder.fit(df['disease_name'])
+        # Encode disease names; ones the model was not trained on count as 'other'
+        classes = snapshot.disease_encoder.classes_
+        fallback = 'other' if 'other' in classes else classes[0]
+        known = df['disease_name'].where(df['disease_name'].isin(classes), fallback)
+        df['disease_encoded'] = snapshot.disease_encoder.transform(known)
         
-        df['disease_encoded'] = self.disease_encoder.transform(df['disease_name'])
-        
-        return df[self.feature_columns]
+        return df[list(snapshot.feature_columns)]
     
     def calculate_risk_score(self, data):
         """
         Calculate risk scores based on disease type, temporal factors, and spatial clustering
         """
+        import numpy as np
+        import pandas as pd
+        
         df = data.copy()
         
         # Base risk scores for different diseases
@@ -86,19 +337,18 @@ class DiseaseRiskPredictor:
         df['base_risk'] = df['disease_name'].map(disease_risk_map).fillna(0.50)
         
         # Temporal risk factors (higher risk in certain seasons)
-        df['occurrence_date'] = pd.to_datetime(df['occurrence_date'])
+        df['occurrence_date'] = pd.to_datetime(df['occurrence_date'], format='mixed', errors='coerce')
         df['month'] = df['occurrence_date'].dt.month
         
         # Monsoon season (June-September) increases risk for vector-borne diseases
-        seasonal_multiplier = df.apply(lambda row: 
-            1.3 if row['month'] in [6, 7, 8, 9] and row['disease_name'] in ['dengue', 'malaria', 'chikungunya']
-            else 1.0, axis=1
+        seasonal_multiplier = np.where(
+            df['month'].isin([6, 7, 8, 9]) & df['disease_name'].isin(['dengue', 'malaria', 'chikungunya']),
+            1.3, 1.0
         )
         
         # Age-based risk (children and elderly are more vulnerable)
-        age_multiplier = df['patient_age'].apply(lambda age:
-            1.2 if age < 10 or age > 60 else 1.0
-        )
+        age = pd.to_numeric(df['patient_age'], errors='coerce')
+        age_multiplier = np.where((age < 10) | (age > 60), 1.2, 1.0)
         
         # Calculate final risk score
         risk_score = df['base_risk'] * seasonal_multiplier * age_multiplier
@@ -108,30 +358,125 @@ class DiseaseRiskPredictor:
         
         return risk_score
     
+    @traced('ml.train_model')
     def train_model(self, supabase_manager=None):
         """
         Train the risk prediction model using historical disease data
         """
+        # A background load finishing after training would replace the new model
+        self.ensure_loaded()
+        with PROFILER.profile_training_run():
+            return self._train_model(supabase_manager)
+    
+    def _fit_splits(self, splits):
+        """
+        Fit a model per split ({key: (X_train, X_test, y_train, y_test)}). Several
+        splits are fanned out across the training pool, one single-threaded fit per
+        process; a lone split, or a pool that cannot start, is fitted inline.
+        """
+        import numpy as np
+
+        def arguments(split):
+            X_train, X_test, y_train, y_test = split
+            return (np.asarray(X_train, dtype=float), np.asarray(y_train, dtype=float),
+                    np.asarray(X_test, dtype=float), np.asarray(y_test, dtype=float))
+        
+        if len(splits) > 1 and self.processes > 1:
+            try:
+                pool = _get_training_pool(self.processes)
+                futures = {key: pool.submit(self.fit_split, *arguments(split), n_jobs=1)
+                           for key, split in splits.items()}
+                return {key: future.result() for key, future in futures.items()}
+            except (BrokenProcessPool, OSError) as e:
+                print(f"Training pool unavailable, fitting inline: {e}")
+                _reset_training_pool()
+        return {key: self.fit_split(*arguments(split)) for key, split in splits.items()}
+    
+    @property
+    def reservoir_path(self):
+        return os.path.join(os.path.dirname(os.path.abspath(self.model_path)), 'training_reservoir.pkl')
+    
+    def _refresh_reservoir(self, supabase_manager=None, page_size=1000):
+        """
+        Offer the training reservoir the entries recorded since its last refresh,
+        from Supabase or else the local DB, and save it; returns its sample. A
+        reservoir saved further along by another process is picked up first.
+        """
+        from training_sample import StratifiedReservoir
+        
+        source = 'supabase' if supabase_manager else 'local'
+        if self.reservoir.source != source:
+            # Ids from the other source say nothing about what this one has offered
+            self.reservoir = StratifiedReservoir(self.reservoir.size_per_disease, self.reservoir.half_life_days)
+            self.reservoir.source = source
         try:
-            # Get data priority: Supabase first, then local DB
-            entries = []
-            
-            if supabase_manager:
-                try:
-                    entries = supabase_manager.get_entries_for_ml()
-                    print(f"Retrieved {len(entries)} entries from Supabase")
-                except Exception as e:
-                    print(f"Failed to get data from Supabase: {e}")
-            
-            # Fallback to local DB if no Supabase data
-            if not entries:
-                try:
-                    from database_models import DiseaseEntry
-                    local_entries = DiseaseEntry.query.all()
-                    entries = [entry.to_dict() for entry in local_entries]
-                    print(f"Retrieved {len(entries)} entries from local DB")
-                except Exception as e:
-                    print(f"Failed to get data from local DB: {e}")
+            with open(self.reservoir_path, 'rb') as f:
+                saved = pickle.load(f)
+            if self.reservoir.compatible(saved) and saved.last_id > self.reservoir.last_id:
+                self.reservoir = saved
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            pass
+        
+        if supabase_manager:
+            fetch_since = supabase_manager.get_entries_since
+        else:
+            def fetch_since(last_id, limit):
+                from database_models import DiseaseEntry
+                rows = (DiseaseEntry.query.filter(DiseaseEntry.id > last_id)
+                        .order_by(DiseaseEntry.id).limit(limit).all())
+                return [row.to_dict() for row in rows]
+        
+        while True:
+            page = fetch_since(self.reservoir.last_id, page_size)
+            offered_before = self.reservoir.last_id
+            self.reservoir.add(page)
+            if len(page) < page_size or self.reservoir.last_id == offered_before:
+                break
+        self._write_artifact(self.reservoir_path, self.reservoir)
+        return self.reservoir.sample()
+    
+    def _fetch_entries(self, supabase_manager=None):
+        """
+        Training entries: the training sample if enabled, then Supabase, then the
+        local DB. Returns (entries, how many entries they were sampled from or None).
+        """
+        entries = []
+        sampled_from = None
+        
+        if self.reservoir is not None:
+            try:
+                with self._reservoir_lock:
+                    entries = self._refresh_reservoir(supabase_manager)
+                    sampled_from = self.reservoir.seen
+                print(f"Sampled {len(entries)} of {self.reservoir.seen} entries for training")
+            except Exception as e:
+                print(f"Failed to refresh the training sample: {e}")
+        
+        if not entries and supabase_manager:
+            try:
+                entries = supabase_manager.get_entries_for_ml()
+                print(f"Retrieved {len(entries)} entries from Supabase")
+            except Exception as e:
+                print(f"Failed to get data from Supabase: {e}")
+        
+        # Fallback to local DB if no Supabase data
+        if not entries:
+            try:
+                from database_models import DiseaseEntry
+                local_entries = DiseaseEntry.query.all()
+                entries = [entry.to_dict() for entry in local_entries]
+                print(f"Retrieved {len(entries)} entries from local DB")
+            except Exception as e:
+                print(f"Failed to get data from local DB: {e}")
+        
+        return entries, sampled_from
+    
+    def _train_model(self, supabase_manager=None):
+        from sklearn.model_selection import train_test_split
+        
+        try:
+            with stage_timer('train_model', 'fetch'), span('train_model.fetch'):
+                entries, sampled_from = self._fetch_entries(supabase_manager)
             
             if len(entries) < 10:
                 print("Insufficient data for training. Using sample data for demo.")
@@ -139,59 +484,72 @@ class DiseaseRiskPredictor:
                 sample_data = self._generate_sample_data()
                 entries.extend(sample_data)
             
-            # Convert to DataFrame
-            data = []
-            for entry in entries:
-                # Handle both dictionary and object formats
-                if isinstance(entry, dict):
-                    data.append({
-                        'latitude': entry.get('latitude'),
-                        'longitude': entry.get('longitude'),
-                        'disease_name': entry.get('disease_type', entry.get('disease_name', 'unknown')),  # Normalize to disease_name
-                        'patient_age': entry.get('patient_age', entry.get('age', 0)),  # Handle age field variations
-                        'severity': entry.get('severity', 'medium'),
-                        'occurrence_date': entry.get('occurrence_date', entry.get('created_at'))
-                    })
-                else:
-                    # SQLAlchemy object format
-                    data.append({
-                        'latitude': entry.latitude,
-                        'longitude': entry.longitude,
-                        'disease_name': entry.disease_name,  # Keep as disease_name for consistency
-                        'patient_age': getattr(entry, 'patient_age', 0),
-                        'severity': getattr(entry, 'severity', 'medium'),
-                        'occurrence_date': entry.created_at
-                    })
-            
-            df = pd.DataFrame(data)
-            
-            # Prepare features
-            X = self.prepare_features(df)
-            
-            # Calculate target risk scores
-            y = self.calculate_risk_score(df)
-            
-            # Split data
-            X_train, X_test, y_train, y_test = train_test_split(
-                X, y, test_size=0.2, random_state=42
-            )
-            
-            # Scale features
-            X_train_scaled = self.scaler.fit_transform(X_train)
-            X_test_scaled = self.scaler.transform(X_test)
-            
-            # Train model
-            self.model.fit(X_train_scaled, y_train)
+            with stage_timer('train_model', 'feature_prep'), span('train_model.feature_prep'):
+                # Convert to DataFrame
+                df = entries_to_dataframe(entries)
+                
+                # Prepare features with an encoder and center fit on this data, so
+                # diseases that first appear now are encoded too
+                encoding = self._fit_encoding(df)
+                X = self.prepare_features(df, encoding)
+                
+                # Calculate target risk scores
+                y = self.calculate_risk_score(df)
+                
+                # Split data: the global model, plus one per disease with enough rows
+                splits = {None: train_test_split(X, y, test_size=0.2, random_state=42)}
+                if self.per_disease:
+                    counts = df['disease_name'].value_counts()
+                    for disease in counts[counts >= self.min_disease_rows].index:
+                        mask = (df['disease_name'] == disease).to_numpy()
+                        splits[disease] = train_test_split(X[mask], y[mask], test_size=0.2, random_state=42)
             
-            # Evaluate model
-            y_pred = self.model.predict(X_test_scaled)
-            mse = mean_squared_error(y_test, y_pred)
-            r2 = r2_score(y_test, y_pred)
+            with stage_timer('train_model', 'fit'), span('train_model.fit'):
+                # Fresh estimators: the ones in the current snapshot may be in use by predictions
+                fitted = self._fit_splits(splits)
             
+            model, scaler, mse, r2 = fitted.pop(None)
             print(f"Model Training Complete - MSE: {mse:.4f}, R2: {r2:.4f}")
             
-            self.is_trained = True
-            self.save_model()
+            trained_at = datetime.now()
+            version = trained_at.strftime('%Y%m%d%H%M%S%f')
+            disease_models = {
+                disease: ModelSnapshot(
+                    model=disease_model,
+                    scaler=disease_scaler,
+                    disease_encoder=encoding.disease_encoder,
+                    training_center=encoding.training_center,
+                    version=version,
+                    metrics={
+                        'mse': disease_mse,
+                        'r2': disease_r2,
+                        'training_rows': int(len(splits[disease][0]) + len(splits[disease][1])),
+                        'trained_at': trained_at.isoformat()
+                    },
+                    is_trained=True
+                )
+                for disease, (disease_model, disease_scaler, disease_mse, disease_r2) in fitted.items()
+            }
+            snapshot = ModelSnapshot(
+                model=model,
+                scaler=scaler,
+                disease_encoder=encoding.disease_encoder,
+                training_center=encoding.training_center,
+                version=version,
+                metrics={
+                    'mse': float(mse),
+                    'r2': float(r2),
+                    'training_rows': int(len(df)),
+                    'trained_at': trained_at.isoformat(),
+                    'sampled_from': int(sampled_from or len(df)),
+                    'disease_models': {disease: dict(m.metrics) for disease, m in disease_models.items()}
+                },
+                is_trained=True,
+                disease_models=disease_models
+            )
+            with stage_timer('train_model', 'save'), span('train_model.save'):
+                self.save_model(snapshot)
+            self._swap_snapshot(snapshot)
             
             return True
             
@@ -199,19 +557,31 @@ class DiseaseRiskPredictor:
             print(f"Error training model: {str(e)}")
             return False
     
+    def update(self, entries):
+        """
+        Learn from newly registered entries without a full retrain; returns how
+        many were learned. Forests are only refit by train_model, so none here.
+        """
+        return 0
+    
+    @timed('predict_risk_areas')
+    @traced('ml.predict_risk_areas')
     def predict_risk_areas(self, center_lat, center_lng, disease_name, radius_km=5):
         """
         Predict risk areas around a given location
         """
+        import numpy as np
+
+        self.ensure_loaded()
         if not self.is_trained:
             print("Model not trained. Training with available data...")
             if not self.train_model():
                 return self._default_risk_areas(center_lat, center_lng)
         
+        # Every step below uses this one version, even if a newer one is swapped in
+        # meanwhile; the disease's own model when one was trained
+        snapshot = self._snapshot.for_disease(disease_name)
         try:
-            # Generate prediction points in a grid around the center
-            risk_areas = []
-            
             # Define risk zones with different radii
             zones = [
                 {'radius': 500, 'risk_level': 'Very High'},
@@ -220,36 +590,22 @@ class DiseaseRiskPredictor:
                 {'radius': 3000, 'risk_level': 'Low'}
             ]
             
-            for zone in zones:
-                # Calculate coordinates for the zone
-                lat_offset = zone['radius'] / 111000  # Approximate degrees per meter
-                lng_offset = zone['radius'] / (111000 * np.cos(np.radians(center_lat)))
-                
-                zone_lat = center_lat + (np.random.uniform(-1, 1) * lat_offset)
-                zone_lng = center_lng + (np.random.uniform(-1, 1) * lng_offset)
-                
-                # Prepare features for prediction
-                prediction_data = pd.DataFrame({
-                    'latitude': [zone_lat],
-                    'longitude': [zone_lng],
-                    'patient_age': [35],  # Average age
-                    'disease_name': [disease_name],  # ML model expects disease_name
-                    'occurrence_date': [datetime.now()]
-                })
-                
-                X_pred = self.prepare_features(prediction_data)
-                X_pred_scaled = self.scaler.transform(X_pred)
-                
-                # Make prediction
-                risk_score = self.model.predict(X_pred_scaled)[0]
-                
-                risk_areas.append({
-                    'lat': zone_lat,
-                    'lng': zone_lng,
-                    'risk_score': float(risk_score),
-                    'risk_level': zone['risk_level'],
-                    'radius': zone['radius']
-                })
+            # One random point per zone around the center
+            radii = np.array([zone['radius'] for zone in zones], dtype=float)
+            lat_offsets = radii / 111000  # Approximate degrees per meter
+            lng_offsets = radii / (111000 * np.cos(np.radians(center_lat)))
+            zone_lats = center_lat + np.random.uniform(-1, 1, len(zones)) * lat_offsets
+            zone_lngs = center_lng + np.random.uniform(-1, 1, len(zones)) * lng_offsets
+            
+            risk_scores = self._score_points(snapshot, zone_lats, zone_lngs, disease_name)
+            
+            risk_areas = [{
+                'lat': float(lat),
+                'lng': float(lng),
+                'risk_score': float(risk_score),
+                'risk_level': zone['risk_level'],
+                'radius': zone['radius']
+            } for zone, lat, lng, risk_score in zip(zones, zone_lats, zone_lngs, risk_scores)]
             
             # Sort by risk score (highest first)
             risk_areas.sort(key=lambda x: x['risk_score'], reverse=True)
@@ -260,10 +616,28 @@ class DiseaseRiskPredictor:
             print(f"Error predicting risk areas: {str(e)}")
             return self._default_risk_areas(center_lat, center_lng)
     
+    def _score_points(self, snapshot, lats, lngs, disease_name):
+        """Risk scores (0-1) for disease_name at the given points, from one snapshot"""
+        import numpy as np
+        import pandas as pd
+        
+        # Prepare features for all points and predict them in one call
+        prediction_data = pd.DataFrame({
+            'latitude': lats,
+            'longitude': lngs,
+            'patient_age': 35,  # Average age
+            'disease_name': disease_name,  # ML model expects disease_name
+            'occurrence_date': datetime.now()
+        })
+        X_pred = self.prepare_features(prediction_data, snapshot)
+        return np.clip(snapshot.model.predict(snapshot.scaler.transform(X_pred)), 0, 1)
+    
     def _default_risk_areas(self, center_lat, center_lng):
         """
         Generate default risk areas when model prediction fails
         """
+        import numpy as np
+
         zones = [
             {'radius': 500, 'risk_score': 0.8, 'risk_level': 'Very High'},
             {'radius': 1000, 'risk_score': 0.6, 'risk_level': 'High'},
@@ -319,40 +693,140 @@ class DiseaseRiskPredictor:
         
         return sample_data
     
-    def save_model(self):
-        """Save the trained model to disk"""
+    def disease_model_path(self, disease_name):
+        """File for a disease's model, in the disease_models_dir folder next to the global artifact"""
+        safe = re.sub(r'[^a-z0-9_-]+', '_', str(disease_name).lower()).strip('_') or 'disease'
+        if safe != disease_name:
+            # Keep distinct names distinct after sanitizing
+            safe = f"{safe}-{hashlib.sha1(str(disease_name).encode('utf-8')).hexdigest()[:8]}"
+        directory = os.path.join(os.path.dirname(os.path.abspath(self.model_path)), self.disease_models_dir)
+        return os.path.join(directory, f'{safe}.pkl')
+    
+    @classmethod
+    def _write_artifact(cls, path, artifact):
+        """
+        Write to a temporary file and rename it over path, so readers never see a
+        partial file; returns the published file's stat key
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.model-', suffix='.tmp')
         try:
-            model_data = {
-                'model': self.model,
-                'scaler': self.scaler,
-                'disease_encoder': self.disease_encoder,
-                'is_trained': self.is_trained,
-                'feature_columns': self.feature_columns
-            }
-            
-            with open(self.model_path, 'wb') as f:
-                pickle.dump(model_data, f)
-            
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(artifact, f)
+                f.flush()
+                os.fsync(f.fileno())
+                # The rename keeps the inode and mtime, so this is also the published file's stat
+                written = cls._stat_key(os.fstat(f.fileno()))
+            os.replace(temp_path, path)
+            return written
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(temp_path)
+            raise
+    
+    def save_model(self, snapshot=None):
+        """
+        Save a snapshot (default: the current one) to disk. Per-disease models
+        are written first and the global artifact last, since watchers reload
+        when the global artifact changes.
+        """
+        snapshot = snapshot or self._snapshot
+        try:
+            for disease, disease_snapshot in snapshot.disease_models.items():
+                self._write_artifact(self.disease_model_path(disease), disease_snapshot.to_artifact())
+            self._artifact_stat = self._write_artifact(self.model_path, snapshot.to_artifact())
             print("Model saved successfully")
             
         except Exception as e:
             print(f"Error saving model: {str(e)}")
     
+    def _load_disease_models(self, names, version):
+        """Per-disease snapshots listed by a global artifact; ones from another version are skipped"""
+        disease_models = {}
+        for disease in names:
+            try:
+                with open(self.disease_model_path(disease), 'rb') as f:
+                    disease_data = pickle.load(f)
+            except (OSError, pickle.UnpicklingError, EOFError) as e:
+                print(f"Skipping {disease} model: {e}")
+                continue
+            if disease_data.get('model_version') != version:
+                # Already replaced by a newer training run; that run's global artifact follows
+                print(f"Skipping {disease} model from version {disease_data.get('model_version')}")
+                continue
+            disease_models[disease] = ModelSnapshot.from_artifact(disease_data)
+        return disease_models
+    
     def load_model(self):
-        """Load a pre-trained model from disk"""
+        """Load the model file into a new snapshot and swap it in; on failure the current one stays"""
         try:
             if os.path.exists(self.model_path):
                 with open(self.model_path, 'rb') as f:
+                    loaded = self._stat_key(os.fstat(f.fileno()))
                     model_data = pickle.load(f)
                 
-                self.model = model_data['model']
-                self.scaler = model_data['scaler']
-                self.disease_encoder = model_data['disease_encoder']
-                self.is_trained = model_data['is_trained']
-                self.feature_columns = model_data['feature_columns']
-                
+                disease_models = self._load_disease_models(model_data.get('disease_models', []),
+                                                           model_data.get('model_version'))
+                self._swap_snapshot(ModelSnapshot.from_artifact(model_data, version=self._file_version(),
+                                                                disease_models=disease_models))
+                self._artifact_stat = loaded
                 print("Model loaded successfully")
             
         except Exception as e:
             print(f"Error loading model: {str(e)}")
-            self.is_trained = False
+        finally:
+            self._loaded.set()
+    
+    @staticmethod
+    def _stat_key(stat):
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+    
+    def _stat_artifact(self):
+        try:
+            return self._stat_key(os.stat(self.model_path))
+        except OSError:
+            return None
+    
+    def reload_if_changed(self, min_interval=0.0):
+        """
+        Load the artifact again if another process has written a new one since
+        this process last loaded or saved it. At most one stat() per
+        min_interval seconds, so it is cheap enough to call on every request.
+        Returns True if a new version was loaded.
+        """
+        now = time.monotonic()
+        if not self._loaded.is_set() or now - self._last_reload_check < min_interval:
+            return False
+        self._last_reload_check = now
+        current = self._stat_artifact()
+        if current is None or current == self._artifact_stat:
+            return False
+        with self._load_lock:
+            if self._stat_artifact() == self._artifact_stat:
+                return False
+            self.load_model()
+        return True
+    
+    def _file_version(self):
+        """Derive a version for artifacts saved before versions were recorded"""
+        try:
+            return datetime.fromtimestamp(os.path.getmtime(self.model_path)).strftime('%Y%m%d%H%M%S%f')
+        except OSError:
+            return None
+
+def create_predictor(backend='forest', **kwargs):
+    """
+    Predictor for an ML_BACKEND setting: 'forest' (random forest, refit by full
+    retrains), 'online' (linear model also updated by each new entry) or 'kde'
+    (density of recent cases)
+    """
+    if backend == 'forest':
+        return DiseaseRiskPredictor(**kwargs)
+    if backend == 'online':
+        from online_model import OnlineRiskPredictor
+        return OnlineRiskPredictor(**kwargs)
+    if backend == 'kde':
+        from kde_model import KDERiskPredictor
+        return KDERiskPredictor(**kwargs)
+    raise ValueError(f"Unknown ML backend: {backend}")
@@ -0,0 +1,61 @@
+"""
+Hot-loading of newly published model versions
+
+A model version is published by renaming a fully written file over the
+artifact (see DiseaseRiskPredictor.save_model), which gives it a new inode.
+Each process runs a ModelWatcher thread that stat()s the artifact every few
+seconds and, when it changed, unpickles it and swaps the predictor's snapshot.
+Requests keep predicting with the previous snapshot until the swap, so none
+wait for the load or fail during it.
+"""
+import logging
+import os
+import threading
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+MODEL_RELOADS = REGISTRY.counter(
+    'model_reloads_total', 'Model versions hot-loaded by the artifact watcher', ('result',)
+)
+
+class ModelWatcher:
+    """Polls a predictor's artifact on a daemon thread and reloads it when a new version appears"""
+
+    def __init__(self, predictor, interval=5.0):
+        self.predictor = predictor
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._pid = None
+
+    def ensure_started(self):
+        """Start watching, again in a forked child (threads do not survive fork)"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._stop = threading.Event()
+                threading.Thread(target=self._run, name='model-watcher', daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+    def check(self):
+        """Reload now if the artifact changed; returns True if a new version was loaded"""
+        previous = self.predictor.model_version
+        try:
+            reloaded = self.predictor.reload_if_changed()
+        except Exception as e:
+            MODEL_RELOADS.inc(result='error')
+            logger.warning(f"Model reload failed: {e}")
+            return False
+        if reloaded:
+            MODEL_RELOADS.inc(result='loaded')
+            logger.info(f"Hot-loaded model version {self.predictor.model_version} (was {previous})")
+        return reloaded
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
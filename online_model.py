@@ -0,0 +1,114 @@
+"""
+Online-learning risk model (ML_BACKEND=online)
+
+An SGD linear regressor with a streaming StandardScaler in place of the
+random forest. train_model fits it on the full history like the forest;
+update() then folds each newly registered entry into the current model with
+one partial_fit step, whose cost does not depend on how much history there
+is. Updates build a new snapshot from copies of the (small) estimators, so
+predictions in flight keep the version they started with.
+
+Updates live in the memory of the process that received the entry; the next
+full retrain, whose artifact every worker hot-loads, includes them all.
+"""
+import copy
+import logging
+import threading
+
+import numpy as np
+
+from ml_model import DiseaseRiskPredictor, ModelSnapshot, entries_to_dataframe
+
+logger = logging.getLogger(__name__)
+
+# Constant step size, so new entries keep moving the model however long it has trained
+LEARNING_RATE = 0.01
+# Passes over the history when training from scratch
+TRAINING_EPOCHS = 5
+
+def _fit_sgd(X_train, y_train, X_test, y_test, n_jobs=None):
+    """Fit a streaming scaler and SGD regressor on one training split (n_jobs is unused)"""
+    from sklearn.linear_model import SGDRegressor
+    from sklearn.metrics import mean_squared_error, r2_score
+    from sklearn.preprocessing import StandardScaler
+
+    scaler = StandardScaler().partial_fit(X_train)
+    model = SGDRegressor(learning_rate='constant', eta0=LEARNING_RATE, random_state=42)
+
+    X_train_scaled = scaler.transform(X_train)
+    rng = np.random.default_rng(42)
+    for _ in range(TRAINING_EPOCHS):
+        order = rng.permutation(len(X_train_scaled))
+        model.partial_fit(X_train_scaled[order], y_train[order])
+
+    y_pred = model.predict(scaler.transform(X_test))
+    return model, scaler, float(mean_squared_error(y_test, y_pred)), float(r2_score(y_test, y_pred))
+
+def _partial_fit(snapshot, X, y, version, updates, disease_models=None):
+    """A new snapshot with copies of snapshot's scaler and model updated on X, y"""
+    scaler = copy.deepcopy(snapshot.scaler).partial_fit(X)
+    model = copy.deepcopy(snapshot.model)
+    model.partial_fit(scaler.transform(X), y)
+    return ModelSnapshot(
+        model=model,
+        scaler=scaler,
+        disease_encoder=snapshot.disease_encoder,
+        training_center=snapshot.training_center,
+        feature_columns=snapshot.feature_columns,
+        version=version,
+        metrics=dict(snapshot.metrics, online_updates=updates),
+        is_trained=True,
+        disease_models=disease_models
+    )
+
+class OnlineRiskPredictor(DiseaseRiskPredictor):
+    """DiseaseRiskPredictor whose model also learns from each new entry"""
+
+    fit_split = staticmethod(_fit_sgd)
+    disease_models_dir = 'online_disease_models'
+
+    def __init__(self, load=True, **kwargs):
+        self._update_lock = threading.Lock()
+        super().__init__(load=False, **kwargs)
+        # Its own artifact, so switching backends does not load the other one's model
+        self.model_path = 'online_risk_model.pkl'
+        if load:
+            self.ensure_loaded()
+
+    def update(self, entries):
+        """Fold new entries into the current model (and their diseases' models); returns how many"""
+        self.ensure_loaded()
+        data = entries_to_dataframe(entries).dropna(subset=['latitude', 'longitude'])
+        if data.empty:
+            return 0
+
+        with self._update_lock:
+            while True:
+                snapshot = self._snapshot
+                if not snapshot.is_trained or not hasattr(snapshot.model, 'partial_fit'):
+                    # Nothing to update yet; the first retrain learns these entries
+                    return 0
+
+                X = self.prepare_features(data, snapshot)
+                valid = X.notna().all(axis=1).to_numpy()
+                if not valid.any():
+                    return 0
+                X = X[valid].to_numpy(dtype=float)
+                y = np.asarray(self.calculate_risk_score(data[valid]), dtype=float)
+                diseases = data['disease_name'].to_numpy()[valid]
+
+                updates = snapshot.metrics.get('online_updates', 0) + len(y)
+                version = f"{str(snapshot.version).split('+')[0]}+{updates}"
+                disease_models = {
+                    disease: _partial_fit(model, X[diseases == disease], y[diseases == disease],
+                                          version, model.metrics.get('online_updates', 0)
+                                          + int((diseases == disease).sum()))
+                    if (diseases == disease).any() else model
+                    for disease, model in snapshot.disease_models.items()
+                }
+                updated = _partial_fit(snapshot, X, y, version, updates, disease_models)
+
+                # A retrain or reload may have swapped in another version meanwhile;
+                # update that one instead of replacing it
+                if self._swap_snapshot(updated, expected=snapshot):
+                    return len(y)
@@ -0,0 +1,435 @@
+"""
+Incremental outbreak cluster detection over recent cases
+
+An OutbreakDetector keeps each disease's cases from the last window_days in a
+grid of cells eps_km / sqrt(2) wide, projected around one reference latitude
+per grid. Away from that latitude the projection stretches east-west
+distances, so the neighbours of a case are looked up in a block of cells wide
+enough to cover eps_km at its latitude and confirmed by great-circle
+distance. Clusters are DBSCAN's: a case with at least min_cases cases (itself
+included) within eps_km is a core, cores within eps_km of each other share a
+cluster, and other cases within eps_km of a core are its cluster's border.
+
+Inserting a case only looks at the cells around it: it updates the neighbour
+counts there, and each case that became a core merges the clusters of the
+cores around it. Cases ageing out of the window can split a cluster, so the
+clusters that lost cores are re-linked from their remaining cores; every
+other cluster is left as it is. Nothing reruns DBSCAN on the whole table.
+
+A background thread (per worker process) pulls new entries by id every
+interval seconds, or right away after notify(), and reports clusters that
+appeared or grew to on_change.
+"""
+import heapq
+import itertools
+import logging
+import math
+import os
+import threading
+import time
+from collections import defaultdict
+
+from metrics import REGISTRY
+from ml_model import entries_to_dataframe
+
+logger = logging.getLogger(__name__)
+
+KM_PER_DEGREE = 111.195
+EARTH_RADIUS_KM = KM_PER_DEGREE * 180 / math.pi
+
+OUTBREAK_CLUSTERS = REGISTRY.gauge(
+    'outbreak_clusters', 'Outbreak clusters among recent cases', ('disease',)
+)
+
+def distance_km(lat1, lng1, lat2, lng2):
+    """Great-circle (haversine) distance between two points in degrees"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(1.0, a)))
+
+class Case:
+    """One recent case; its grid sets x and y in km on the grid's plane, its cell and how far to look"""
+
+    __slots__ = ('id', 'disease', 'lat', 'lng', 'x', 'y', 'cell', 'reach', 'day', 'neighbors')
+
+    def __init__(self, case_id, disease, lat, lng, day):
+        self.id = case_id
+        self.disease = disease
+        self.lat = lat
+        self.lng = lng
+        self.x = self.y = self.cell = self.reach = None
+        self.day = day
+        self.neighbors = 1
+
+class DiseaseClusters:
+    """Grid index and incrementally maintained DBSCAN clusters of one disease's cases"""
+
+    def __init__(self, eps_km, min_cases):
+        self.eps = eps_km
+        self.side = eps_km / math.sqrt(2)
+        self.min_cases = min_cases
+        self.reference_lat = None
+        self.cases = {}
+        self.cells = defaultdict(dict)
+        self.labels = {}  # core case id -> cluster label
+        self.clusters = {}  # cluster label -> core case ids
+        self._next_label = itertools.count(1)
+
+    def place(self, case):
+        """Project case around the grid's reference latitude (that of its first case)"""
+        if self.reference_lat is None:
+            self.reference_lat = case.lat
+        scale = math.cos(math.radians(self.reference_lat))
+        case.y = case.lat * KM_PER_DEGREE
+        case.x = case.lng * KM_PER_DEGREE * scale
+        case.cell = (math.floor(case.x / self.side), math.floor(case.y / self.side))
+        # A neighbour east or west is at most eps_km * scale / cos(its latitude) away on the plane
+        farthest = min(abs(case.lat) + self.eps / KM_PER_DEGREE, 89.0)
+        span = self.eps * scale / math.cos(math.radians(farthest))
+        case.reach = (math.floor(span / self.side) + 1, math.floor(self.eps / self.side) + 1)
+        return case
+
+    def neighbors(self, case):
+        """Cases within eps_km of case, from the cells around it that can hold any"""
+        cell_x, cell_y = case.cell
+        reach_x, reach_y = case.reach
+        for dx in range(-reach_x, reach_x + 1):
+            for dy in range(-reach_y, reach_y + 1):
+                for other in self.cells.get((cell_x + dx, cell_y + dy), {}).values():
+                    if other is not case and distance_km(case.lat, case.lng, other.lat, other.lng) <= self.eps:
+                        yield other
+
+    def load(self, cases):
+        """
+        Index many cases into an empty grid at once: neighbour counts from one
+        haversine ball-tree radius query and clusters from one DBSCAN pass, as
+        seeding the window would otherwise insert them one at a time
+        """
+        import numpy as np
+        from sklearn.cluster import DBSCAN
+        from sklearn.neighbors import BallTree
+
+        self.reference_lat = sum(case.lat for case in cases) / len(cases)
+        points = np.radians([(case.lat, case.lng) for case in cases])
+        radius = self.eps / EARTH_RADIUS_KM
+        counts = BallTree(points, metric='haversine').query_radius(points, r=radius, count_only=True)
+        dbscan = DBSCAN(eps=radius, min_samples=self.min_cases, metric='haversine',
+                        algorithm='ball_tree').fit(points)
+        labels = {}
+        for case, count in zip(cases, counts):
+            self.place(case)
+            case.neighbors = int(count)
+            self.cases[case.id] = case
+            self.cells[case.cell][case.id] = case
+        for index in dbscan.core_sample_indices_:
+            case = cases[index]
+            label = labels.setdefault(dbscan.labels_[index], next(self._next_label))
+            self.labels[case.id] = label
+            self.clusters.setdefault(label, set()).add(case.id)
+
+    def add(self, case):
+        self.place(case)
+        self.cases[case.id] = case
+        self.cells[case.cell][case.id] = case
+        promoted = []
+        for other in self.neighbors(case):
+            case.neighbors += 1
+            other.neighbors += 1
+            if other.neighbors == self.min_cases:
+                promoted.append(other)
+        if case.neighbors >= self.min_cases:
+            promoted.append(case)
+        for core in promoted:
+            self._link(core)
+
+    def remove(self, case):
+        """Drop a case; returns the labels of clusters that lost cores and need re-linking"""
+        del self.cases[case.id]
+        cell = self.cells[case.cell]
+        del cell[case.id]
+        if not cell:
+            del self.cells[case.cell]
+        if not self.cases:
+            self.reference_lat = None
+        affected = set()
+        if case.id in self.labels:
+            affected.add(self._unlink(case.id))
+        for other in self.neighbors(case):
+            other.neighbors -= 1
+            if other.neighbors == self.min_cases - 1 and other.id in self.labels:
+                affected.add(self._unlink(other.id))
+        return affected
+
+    def relink(self, labels):
+        """Recompute which remaining cores of these clusters are still connected"""
+        remaining = set()
+        for label in labels:
+            remaining |= self.clusters.pop(label, set())
+        # The biggest piece keeps the oldest label, so a cluster that shrank keeps its id
+        reusable = sorted(labels)
+        pieces = []
+        while remaining:
+            start = remaining.pop()
+            piece, frontier = {start}, [start]
+            while frontier:
+                for other in self.neighbors(self.cases[frontier.pop()]):
+                    if other.id in remaining:
+                        remaining.discard(other.id)
+                        piece.add(other.id)
+                        frontier.append(other.id)
+            pieces.append(piece)
+        for piece in sorted(pieces, key=len, reverse=True):
+            label = reusable.pop(0) if reusable else next(self._next_label)
+            self.clusters[label] = piece
+            for core_id in piece:
+                self.labels[core_id] = label
+
+    def members(self):
+        """{label: cases}, cores plus border cases; a border case joins the first core's cluster found"""
+        members = {label: [self.cases[core_id] for core_id in core_ids]
+                   for label, core_ids in self.clusters.items()}
+        for case in self.cases.values():
+            if case.id in self.labels or case.neighbors == 1:
+                continue
+            for other in self.neighbors(case):
+                label = self.labels.get(other.id)
+                if label is not None:
+                    members[label].append(case)
+                    break
+        return members
+
+    def _link(self, core):
+        """Make core part of the cluster of the cores around it, merging theirs"""
+        labels = {self.labels[other.id] for other in self.neighbors(core) if other.id in self.labels}
+        label = min(labels) if labels else next(self._next_label)
+        cluster = self.clusters.setdefault(label, set())
+        for other_label in labels - {label}:
+            merged = self.clusters.pop(other_label)
+            cluster |= merged
+            for core_id in merged:
+                self.labels[core_id] = label
+        cluster.add(core.id)
+        self.labels[core.id] = label
+
+    def _unlink(self, core_id):
+        label = self.labels.pop(core_id)
+        self.clusters[label].discard(core_id)
+        return label
+
+class OutbreakDetector:
+    """
+    DBSCAN clusters of each disease's cases from the last window_days, kept up
+    to date from get_entries_since(last_id) after loading load_recent(cutoff).
+    get_source names the data source; ids from another one mean a reload.
+    """
+
+    def __init__(self, load_recent, get_entries_since, get_source=lambda: None, eps_km=1.0,
+                 min_cases=5, window_days=14, growth_days=7, interval=60.0, on_change=None):
+        self.load_recent = load_recent
+        self.get_entries_since = get_entries_since
+        self.get_source = get_source
+        self.eps_km = eps_km
+        self.min_cases = min_cases
+        self.window_days = window_days
+        self.growth_days = growth_days
+        self.interval = interval
+        self.on_change = on_change
+        self.last_id = None
+        self.source = None
+        self.last_refresh = None
+        self._diseases = {}
+        self._expiry = []  # (day, case id, disease)
+        self._sizes = None  # cluster id -> size at the last check
+        # Described clusters, reused until cases change or the day's counts move on
+        self._version = 0
+        self._described = (None, [])
+        self._lock = threading.RLock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._pid = None
+
+    @staticmethod
+    def _today():
+        return time.time() / 86400
+
+    def add(self, entries):
+        """Insert entries (dicts with an id); each only touches the cells around it. Returns how many"""
+        if not entries:
+            return 0
+        import pandas as pd
+
+        frame = entries_to_dataframe(entries)
+        frame['id'] = [entry.get('id') for entry in entries]
+        dates = pd.to_datetime(frame['occurrence_date'], format='mixed', errors='coerce', utc=True)
+        frame['day'] = (dates - pd.Timestamp(0, tz='UTC')).dt.total_seconds() / 86400
+        cutoff = self._today() - self.window_days
+        frame = frame.dropna(subset=['id', 'latitude', 'longitude', 'day'])
+        frame = frame[frame['day'] >= cutoff]
+
+        added = 0
+        with self._lock:
+            for disease, rows in frame.groupby('disease_name', sort=False):
+                grid = self._diseases.get(disease)
+                if grid is None:
+                    grid = self._diseases[disease] = DiseaseClusters(self.eps_km, self.min_cases)
+                cases = [Case(int(row.id), disease, float(row.latitude), float(row.longitude),
+                              float(row.day))
+                         for row in rows.drop_duplicates('id').itertuples(index=False)
+                         if int(row.id) not in grid.cases]
+                if not grid.cases and len(cases) > 1:
+                    grid.load(cases)
+                else:
+                    for case in cases:
+                        grid.add(case)
+                for case in cases:
+                    heapq.heappush(self._expiry, (case.day, case.id, case.disease))
+                added += len(cases)
+            if added:
+                self._version += 1
+        return added
+
+    def expire(self):
+        """Drop cases older than the window and re-link only the clusters they were part of"""
+        cutoff = self._today() - self.window_days
+        with self._lock:
+            affected = defaultdict(set)
+            while self._expiry and self._expiry[0][0] < cutoff:
+                _, case_id, disease = heapq.heappop(self._expiry)
+                grid = self._diseases[disease]
+                affected[disease] |= grid.remove(grid.cases[case_id])
+            for disease, labels in affected.items():
+                self._diseases[disease].relink(labels)
+            if affected:
+                self._version += 1
+
+    def refresh(self, min_interval=0.0, page_size=100):
+        """Pull entries added since the last refresh (loading the window first if needed) and expire old ones"""
+        with self._lock:
+            if self.last_refresh and time.monotonic() - self.last_refresh < min_interval:
+                return
+            source = self.get_source()
+            if self.last_id is None or source != self.source:
+                self._reset(source)
+                recent = self.load_recent(self._window_start())
+                self.add(recent)
+                self.last_id = max([entry['id'] for entry in recent if entry.get('id') is not None],
+                                   default=0)
+            while True:
+                page = self.get_entries_since(self.last_id)
+                self.add(page)
+                ids = [entry['id'] for entry in page if entry.get('id') is not None]
+                if not ids:
+                    break
+                self.last_id = max(self.last_id, max(ids))
+                if len(page) < page_size:
+                    break
+            self.expire()
+            self.last_refresh = time.monotonic()
+
+    def clusters(self, disease=None, min_size=0):
+        """Current clusters, largest first, with size, centroid and growth rate"""
+        today = self._today()
+        with self._lock:
+            key = (self._version, round(today * 24 * 60))
+            if self._described[0] != key:
+                described = [self._describe(disease_name, label, cases, today)
+                             for disease_name, grid in self._diseases.items()
+                             for label, cases in grid.members().items()]
+                described.sort(key=lambda cluster: cluster['size'], reverse=True)
+                self._described = (key, described)
+            described = self._described[1]
+        return [cluster for cluster in described
+                if cluster['size'] >= min_size and (not disease or cluster['disease'] == disease)]
+
+    def _describe(self, disease, label, cases, today):
+        from datetime import datetime, timezone
+
+        lat = sum(case.lat for case in cases) / len(cases)
+        lng = sum(case.lng for case in cases) / len(cases)
+        recent = sum(case.day >= today - self.growth_days for case in cases)
+        previous = sum(today - 2 * self.growth_days <= case.day < today - self.growth_days for case in cases)
+        days = [case.day for case in cases]
+        return {
+            'id': f"{disease}-{label}",
+            'disease': disease,
+            'size': len(cases),
+            'core_cases': sum(case.id in self._diseases[disease].labels for case in cases),
+            'centroid': {'lat': round(lat, 6), 'lng': round(lng, 6)},
+            'radius_km': round(max(distance_km(lat, lng, case.lat, case.lng) for case in cases), 3),
+            'first_case': datetime.fromtimestamp(min(days) * 86400, timezone.utc).isoformat(),
+            'last_case': datetime.fromtimestamp(max(days) * 86400, timezone.utc).isoformat(),
+            'recent_cases': recent,
+            'previous_cases': previous,
+            # Change in cases between the last growth_days and the ones before; None if it is all new
+            'growth_rate': round((recent - previous) / previous, 3) if previous else None,
+            'cases_per_day': round(recent / self.growth_days, 3)
+        }
+
+    def tracked_cases(self):
+        return sum(len(grid.cases) for grid in self._diseases.values())
+
+    def ensure_started(self):
+        """Start refreshing on a daemon thread, again in a forked child (threads do not survive fork)"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._stop = threading.Event()
+                threading.Thread(target=self._run, name='outbreak-detector', daemon=True).start()
+
+    def notify(self):
+        """Refresh right away, e.g. after this worker inserted an entry"""
+        self._wakeup.set()
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+
+    def check(self):
+        """
+        Refresh, update the metrics and report clusters that are new or bigger
+        than at the last check (the first check only records them)
+        """
+        self.refresh()
+        clusters = self.clusters(min_size=self.min_cases)
+        OUTBREAK_CLUSTERS.clear()
+        sizes = {}
+        for cluster in clusters:
+            sizes[cluster['id']] = cluster['size']
+            OUTBREAK_CLUSTERS.inc(disease=cluster['disease'])
+            if self._sizes is None:
+                continue
+            previous = self._sizes.get(cluster['id'])
+            if previous is None or cluster['size'] > previous:
+                status = 'new' if previous is None else 'growing'
+                logger.info(f"Outbreak cluster {cluster['id']} is {status}: {cluster['size']} cases")
+                if self.on_change:
+                    self.on_change(dict(cluster, status=status))
+        self._sizes = sizes
+        return clusters
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            if self._stop.is_set():
+                return
+            try:
+                self.check()
+            except Exception as e:
+                logger.warning(f"Outbreak detection failed: {e}")
+
+    def _reset(self, source):
+        self.source = source
+        self._sizes = None
+        self.last_id = None
+        self._diseases = {}
+        self._expiry = []
+        self._version += 1
+
+    def _window_start(self):
+        from datetime import datetime, timedelta
+
+        return datetime.utcnow() - timedelta(days=self.window_days)
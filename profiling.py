@@ -0,0 +1,295 @@
+"""
+Opt-in CPU and memory profiling
+
+Nothing here runs unless PROFILING_ENABLED is set. A single request is then
+profiled when it carries ?profile=cpu (cProfile) or ?profile=sample (stack
+sampling) together with an X-Profile-Token header matching PROFILE_TOKEN, and
+every train_model run is profiled when PROFILE_TRAIN_MODEL is set. Each
+capture also takes a tracemalloc snapshot and writes the raw profile plus a
+text summary of the top functions and allocations to PROFILE_DIR.
+
+cProfile and the stack sampler only see the thread they were started on, so
+a request's capture follows it onto other threads: the event loop thread an
+async view's coroutine runs on, and the threads async_data hands blocking
+calls to, each join the capture through attach_thread().
+"""
+import contextvars
+import cProfile
+import functools
+import hmac
+import inspect
+import io
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+PROFILE_MODES = ('cpu', 'sample')
+
+# The capture of the current request, carried into the threads its work moves to
+CURRENT_SESSION = contextvars.ContextVar('profile_session', default=None)
+
+class StackSampler:
+    """Samples some threads' Python stacks at a fixed interval from a helper thread"""
+
+    def __init__(self, thread_id, interval=0.005):
+        self.thread_ids = {thread_id}
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def add_thread(self, thread_id):
+        self.thread_ids = self.thread_ids | {thread_id}
+
+    def remove_thread(self, thread_id):
+        self.thread_ids = self.thread_ids - {thread_id}
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for thread_id in self.thread_ids:
+                frame = frames.get(thread_id)
+                if frame is None:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                self.stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def folded(self):
+        """Collapsed stacks, one per line, as consumed by flamegraph tools"""
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def summary(self, limit=30):
+        leaf_counts = Counter()
+        for stack, count in self.stacks.items():
+            leaf_counts[stack.rsplit(';', 1)[-1]] += count
+        lines = [f"{self.samples} samples every {self.interval * 1000:.1f}ms", '']
+        for leaf, count in leaf_counts.most_common(limit):
+            lines.append(f"{count / max(self.samples, 1):7.1%}  {leaf}")
+        return '\n'.join(lines)
+
+class Profiler:
+    """Captures profiles for single requests or train_model runs; a no-op unless enabled"""
+
+    def __init__(self):
+        self.enabled = False
+        self.token = None
+        self.directory = 'profiles'
+        self.profile_training = False
+        self.top_n = 30
+        # tracemalloc is process-wide, so only one capture runs at a time
+        self._busy = threading.Lock()
+
+    def configure(self, enabled=False, token=None, directory='profiles', profile_training=False, top_n=30):
+        self.enabled = bool(enabled)
+        self.token = token
+        self.directory = directory
+        self.profile_training = bool(profile_training)
+        self.top_n = top_n
+
+    def request_mode(self, args, headers):
+        """Profiling mode requested by a request, or None if it is not allowed"""
+        if not self.enabled or not self.token:
+            return None
+        mode = args.get('profile')
+        if mode not in PROFILE_MODES:
+            return None
+        if not hmac.compare_digest(headers.get('X-Profile-Token', ''), self.token):
+            return None
+        return mode
+
+    def start(self, label, mode='cpu'):
+        """Start a capture; returns a session to pass to finish(), or None if another capture is running"""
+        if not self._busy.acquire(blocking=False):
+            return None
+        started_tracemalloc = not tracemalloc.is_tracing()
+        if started_tracemalloc:
+            tracemalloc.start(10)
+        session = {
+            'label': label,
+            'mode': mode,
+            'started': time.perf_counter(),
+            'started_tracemalloc': started_tracemalloc,
+            'thread_id': threading.get_ident(),
+            'profiler': None,
+            'thread_profilers': [],
+            'sampler': None
+        }
+        if mode == 'sample':
+            session['sampler'] = StackSampler(threading.get_ident())
+            session['sampler'].start()
+        else:
+            session['profiler'] = cProfile.Profile()
+            session['profiler'].enable()
+        return session
+
+    def finish(self, session):
+        """Stop a capture and write its files; returns the base path of the written files"""
+        try:
+            elapsed = time.perf_counter() - session['started']
+            if session['profiler'] is not None:
+                session['profiler'].disable()
+            if session['sampler'] is not None:
+                session['sampler'].stop()
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            if session['started_tracemalloc']:
+                tracemalloc.stop()
+            return self._write(session, elapsed, snapshot, current, peak)
+        except Exception as e:
+            logger.error(f"Failed to write profile for {session['label']}: {e}")
+            return None
+        finally:
+            self._busy.release()
+
+    @contextmanager
+    def attach_thread(self):
+        """Include the current thread in the current request's capture, if there is one"""
+        session = CURRENT_SESSION.get()
+        thread_id = threading.get_ident()
+        if session is None or session['thread_id'] == thread_id:
+            yield
+            return
+        if session['sampler'] is not None:
+            session['sampler'].add_thread(thread_id)
+            try:
+                yield
+            finally:
+                session['sampler'].remove_thread(thread_id)
+            return
+        # One cProfile.Profile per thread; finish() merges their stats
+        profiler = cProfile.Profile()
+        session['thread_profilers'].append(profiler)
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+
+    @contextmanager
+    def profile_training_run(self, label='train_model'):
+        """Profile a block when training profiling is switched on"""
+        session = self.start(label) if self.enabled and self.profile_training else None
+        try:
+            yield
+        finally:
+            if session is not None:
+                path = self.finish(session)
+                if path:
+                    logger.info(f"Profile for {label} written to {path}")
+
+    def _write(self, session, elapsed, snapshot, current, peak):
+        os.makedirs(self.directory, exist_ok=True)
+        safe_label = ''.join(c if c.isalnum() or c in '-_' else '_' for c in session['label']).strip('_')
+        base = os.path.join(self.directory, f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{safe_label}")
+
+        lines = [
+            f"Profile: {session['label']}",
+            f"Mode: {session['mode']}",
+            f"Wall time: {elapsed:.3f}s",
+            f"Traced memory: current {current / 1024:.1f} KiB, peak {peak / 1024:.1f} KiB",
+            '',
+            'Top functions',
+            '-------------'
+        ]
+        if session['profiler'] is not None:
+            stream = io.StringIO()
+            stats = pstats.Stats(session['profiler'], *session['thread_profilers'], stream=stream)
+            stats.dump_stats(base + '.prof')
+            stats.sort_stats('cumulative').print_stats(self.top_n)
+            lines.append(stream.getvalue().strip())
+        else:
+            with open(base + '.folded', 'w') as f:
+                f.write(session['sampler'].folded())
+            lines.append(session['sampler'].summary(self.top_n))
+
+        lines.extend(['', 'Top allocations', '---------------'])
+        for stat in snapshot.statistics('lineno')[:self.top_n]:
+            lines.append(str(stat))
+
+        with open(base + '.txt', 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        return base
+
+    def init_app(self, app):
+        """Configure from app.config and hook request profiling into the app"""
+        from flask import g, request
+
+        self.configure(
+            enabled=app.config.get('PROFILING_ENABLED', False),
+            token=app.config.get('PROFILE_TOKEN'),
+            directory=app.config.get('PROFILE_DIR') or os.path.join(app.instance_path, 'profiles'),
+            profile_training=app.config.get('PROFILE_TRAIN_MODEL', False)
+        )
+        if not self.enabled:
+            return
+
+        # Async views run on asgiref's event loop thread, not the request's
+        ensure_sync = app.ensure_sync
+
+        def profiled_ensure_sync(func):
+            if not inspect.iscoroutinefunction(func):
+                return ensure_sync(func)
+
+            @functools.wraps(func)
+            async def run(*args, **kwargs):
+                with self.attach_thread():
+                    return await func(*args, **kwargs)
+            return ensure_sync(run)
+
+        app.ensure_sync = profiled_ensure_sync
+
+        @app.before_request
+        def start_request_profile():
+            mode = self.request_mode(request.args, request.headers)
+            if mode:
+                g.profile_session = self.start(f"{request.method} {request.path}", mode)
+                if g.profile_session is not None:
+                    g.profile_context = CURRENT_SESSION.set(g.profile_session)
+
+        def end_request_profile():
+            session = g.pop('profile_session', None)
+            if session is not None:
+                CURRENT_SESSION.reset(g.pop('profile_context'))
+            return session
+
+        @app.after_request
+        def finish_request_profile(response):
+            session = end_request_profile()
+            if session is not None:
+                path = self.finish(session)
+                if path:
+                    response.headers['X-Profile-Id'] = os.path.basename(path)
+            elif self.request_mode(request.args, request.headers):
+                response.headers['X-Profile-Id'] = 'busy'
+            return response
+
+        @app.teardown_request
+        def abandon_request_profile(exc):
+            # Unhandled errors skip after_request; never leave the capture lock held
+            session = end_request_profile()
+            if session is not None:
+                self.finish(session)
+
+PROFILER = Profiler()
@@ -0,0 +1,271 @@
+"""
+Background report generation for the dashboard
+
+Reports are built by worker threads from a SQLite-backed job table so that a
+slow report never blocks a request thread. Finished reports are cached by
+their parameters and the data watermark they were computed against.
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from ml_model import entries_to_dataframe
+
+logger = logging.getLogger(__name__)
+
+JOB_PENDING = 'pending'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+
+def normalize_report_params(raw):
+    """Validate and normalize report parameters, raising ValueError on bad input"""
+    raw = raw or {}
+    disease = (raw.get('disease') or '').strip().lower() or None
+    try:
+        weeks = int(raw.get('weeks', 12))
+        top_n = int(raw.get('top_n', 5))
+    except (TypeError, ValueError):
+        raise ValueError("weeks and top_n must be integers")
+    if not 1 <= weeks <= 520:
+        raise ValueError("weeks must be between 1 and 520")
+    if not 1 <= top_n <= 50:
+        raise ValueError("top_n must be between 1 and 50")
+    return {'disease': disease, 'weeks': weeks, 'top_n': top_n}
+
+def build_disease_report(entries, risk_predictor=None, disease=None, weeks=12, top_n=5):
+    """
+    Build a dashboard report: per-disease counts, weekly trends, top hotspots
+    and the metrics of the current risk model
+    """
+    import pandas as pd
+    
+    df = entries_to_dataframe(entries)
+    df['occurrence_date'] = pd.to_datetime(df['occurrence_date'], format='mixed', errors='coerce', utc=True)
+    df = df.dropna(subset=['latitude', 'longitude'])
+    if disease:
+        df = df[df['disease_name'] == disease]
+
+    disease_counts = df['disease_name'].value_counts()
+
+    # Weekly case counts per disease over the requested window
+    dated = df.dropna(subset=['occurrence_date'])
+    weekly_trends = []
+    if not dated.empty:
+        week_start = dated['occurrence_date'].dt.tz_localize(None).dt.to_period('W').dt.start_time
+        cutoff = week_start.max() - pd.Timedelta(weeks=weeks - 1)
+        recent = dated.assign(week=week_start)[week_start >= cutoff]
+        weekly = recent.groupby(['week', 'disease_name']).size().unstack(fill_value=0).sort_index()
+        weekly_trends = [
+            {
+                'week': week.date().isoformat(),
+                'total': int(row.sum()),
+                'by_disease': {name: int(count) for name, count in row.items() if count}
+            }
+            for week, row in weekly.iterrows()
+        ]
+
+    # Hotspots are ~1km grid cells ranked by case count
+    hotspots = []
+    if not df.empty:
+        cells = df.assign(
+            cell_lat=df['latitude'].astype(float).round(2),
+            cell_lng=df['longitude'].astype(float).round(2)
+        )
+        grouped = cells.groupby(['cell_lat', 'cell_lng'])
+        top_cells = grouped.size().nlargest(top_n)
+        dominant = grouped['disease_name'].agg(lambda names: names.value_counts().index[0])
+        hotspots = [
+            {
+                'lat': float(lat),
+                'lng': float(lng),
+                'cases': int(count),
+                'dominant_disease': dominant.loc[(lat, lng)]
+            }
+            for (lat, lng), count in top_cells.items()
+        ]
+
+    model_info = {'is_trained': False, 'version': None, 'metrics': {}}
+    if risk_predictor is not None:
+        model_info = {
+            'is_trained': risk_predictor.is_trained,
+            'version': risk_predictor.model_version,
+            'metrics': dict(risk_predictor.metrics)
+        }
+
+    return {
+        'generated_at': datetime.utcnow().isoformat(),
+        'total_cases': int(len(df)),
+        'disease_counts': {name: int(count) for name, count in disease_counts.items()},
+        'weekly_trends': weekly_trends,
+        'top_hotspots': hotspots,
+        'model': model_info
+    }
+
+class ReportJobQueue:
+    """SQLite-backed job queue that builds reports on background worker threads"""
+
+    def __init__(self, db_path, builder, num_workers=2, poll_interval=2.0, stale_after=600):
+        self.db_path = db_path
+        self.builder = builder
+        self.num_workers = max(1, int(num_workers))
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self._wakeup = threading.Event()
+        self._workers = []
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS report_jobs (
+                    id TEXT PRIMARY KEY,
+                    cache_key TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    watermark TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                )
+            """)
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_report_jobs_cache_key ON report_jobs (cache_key)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_report_jobs_status ON report_jobs (status, created_at)')
+
+    @contextmanager
+    def _connect(self):
+        """Open a short-lived connection that commits on success and always closes"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def cache_key(params, watermark):
+        """Cache key for a report: its normalized parameters plus the data watermark"""
+        payload = json.dumps({'params': params, 'watermark': watermark}, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def submit(self, params, watermark):
+        """
+        Queue a report, reusing a finished or in-flight job with the same
+        parameters and watermark instead of building it again
+        """
+        key = self.cache_key(params, watermark)
+        with self._connect() as conn:
+            existing = conn.execute(
+                "SELECT * FROM report_jobs WHERE cache_key = ? AND status != ? "
+                "ORDER BY created_at DESC LIMIT 1",
+                (key, JOB_FAILED)
+            ).fetchone()
+            if existing is not None:
+                job = self._row_to_job(existing)
+                job['cached'] = True
+                return job
+
+            job_id = uuid.uuid4().hex
+            conn.execute(
+                "INSERT INTO report_jobs (id, cache_key, params, watermark, status, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, key, json.dumps(params), watermark, JOB_PENDING, time.time())
+            )
+            row = conn.execute("SELECT * FROM report_jobs WHERE id = ?", (job_id,)).fetchone()
+
+        self._ensure_workers()
+        self._wakeup.set()
+        job = self._row_to_job(row)
+        job['cached'] = False
+        return job
+
+    def get_job(self, job_id):
+        """Return the job as a dict, or None if it does not exist"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM report_jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row is not None else None
+
+    def _row_to_job(self, row):
+        def _iso(timestamp):
+            return datetime.utcfromtimestamp(timestamp).isoformat() if timestamp else None
+
+        job = {
+            'id': row['id'],
+            'status': row['status'],
+            'params': json.loads(row['params']),
+            'created_at': _iso(row['created_at']),
+            'finished_at': _iso(row['finished_at']),
+            'error': row['error']
+        }
+        if row['status'] == JOB_DONE and row['result']:
+            job['result'] = json.loads(row['result'])
+        return job
+
+    def _ensure_workers(self):
+        """Start worker threads lazily so importing the app never spawns threads"""
+        with self._lock:
+            self._workers = [worker for worker in self._workers if worker.is_alive()]
+            while len(self._workers) < self.num_workers:
+                worker = threading.Thread(
+                    target=self._worker_loop,
+                    name=f'report-worker-{len(self._workers)}',
+                    daemon=True
+                )
+                worker.start()
+                self._workers.append(worker)
+
+    def _claim_next_job(self):
+        """Atomically move the oldest pending (or stale running) job to running"""
+        now = time.time()
+        with self._connect() as conn:
+            candidates = conn.execute(
+                "SELECT id, status FROM report_jobs WHERE status = ? "
+                "OR (status = ? AND started_at < ?) ORDER BY created_at LIMIT 5",
+                (JOB_PENDING, JOB_RUNNING, now - self.stale_after)
+            ).fetchall()
+            for candidate in candidates:
+                claimed = conn.execute(
+                    "UPDATE report_jobs SET status = ?, started_at = ? WHERE id = ? AND status = ? "
+                    "AND (status = ? OR started_at < ?)",
+                    (JOB_RUNNING, now, candidate['id'], candidate['status'],
+                     JOB_PENDING, now - self.stale_after)
+                ).rowcount
+                if claimed:
+                    row = conn.execute(
+                        "SELECT id, params FROM report_jobs WHERE id = ?", (candidate['id'],)
+                    ).fetchone()
+                    return row['id'], json.loads(row['params'])
+        return None
+
+    def _worker_loop(self):
+        while True:
+            claimed = self._claim_next_job()
+            if claimed is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+
+            job_id, params = claimed
+            try:
+                result = self.builder(params)
+                status, payload, error = JOB_DONE, json.dumps(result, default=str), None
+            except Exception as e:
+                logger.error(f"Report job {job_id} failed: {e}")
+                status, payload, error = JOB_FAILED, None, str(e)
+
+            with self._connect() as conn:
+                conn.execute(
+                    "UPDATE report_jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+                    (status, payload, error, time.time(), job_id)
+                )
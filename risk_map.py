@@ -0,0 +1,71 @@
+"""
+Folium rendering of predicted risk areas
+"""
+import logging
+from metrics import timed
+from tracing import traced
+
+logger = logging.getLogger(__name__)
+
+@timed('create_risk_map')
+@traced('create_risk_map')
+def create_risk_map(center_lat, center_lng, risk_areas):
+    """Create a folium map with risk areas"""
+    import folium
+    
+    try:
+        # Create base map
+        m = folium.Map(
+            location=[center_lat, center_lng],
+            zoom_start=12,
+            tiles='OpenStreetMap'
+        )
+
+        # Add center marker
+        folium.Marker(
+            [center_lat, center_lng],
+            popup='Disease Entry Location',
+            icon=folium.Icon(color='red', icon='info-sign')
+        ).add_to(m)
+
+        # Add risk area circles
+        for area in risk_areas:
+            # Use risk_score (float) instead of risk_level (string)
+            risk_score = area.get('risk_score', area.get('risk_level', 0))
+
+            # Ensure risk_score is a float
+            if isinstance(risk_score, str):
+                # Convert string risk levels to numeric values
+                risk_level_map = {
+                    'Very High': 0.9,
+                    'High': 0.7,
+                    'Medium': 0.5,
+                    'Low': 0.3
+                }
+                risk_score = risk_level_map.get(risk_score, 0.5)
+
+            # Color based on risk score
+            if risk_score > 0.7:
+                color = 'red'
+                fillColor = 'red'
+            elif risk_score > 0.4:
+                color = 'orange'
+                fillColor = 'orange'
+            else:
+                color = 'yellow'
+                fillColor = 'yellow'
+
+            folium.Circle(
+                location=[area['lat'], area['lng']],
+                radius=area.get('radius', 1000),
+                popup=f"Risk Level: {float(risk_score):.2f}",
+                color=color,
+                fillColor=fillColor,
+                fillOpacity=0.3,
+                weight=2
+            ).add_to(m)
+
+        return m._repr_html_()
+    except Exception as e:
+        logger.error(f"Error creating risk map: {e}")
+        return "<div class='alert alert-warning'>Map could not be loaded</div>"
@@ -0,0 +1,92 @@
+"""
+Risk trend series for the dashboard chart
+"""
+import threading
+from ml_model import entries_to_dataframe
+from metrics import record_cache
+
+TREND_BUCKETS = ('week', 'month')
+
+def build_trend_frame(entries, risk_predictor):
+    """
+    Build the scored snapshot trends are computed from: the same normalized
+    frame the model trains on, plus each row's calculate_risk_score
+    """
+    import numpy as np
+    import pandas as pd
+    
+    df = entries_to_dataframe(entries)
+    dates = pd.to_datetime(df['occurrence_date'], format='mixed', errors='coerce', utc=True)
+    frame = pd.DataFrame({
+        'disease_name': df['disease_name'].astype('category'),
+        'occurrence_date': dates.dt.tz_localize(None),
+        'risk_score': np.asarray(risk_predictor.calculate_risk_score(df), dtype=float)
+    })
+    return frame.dropna(subset=['occurrence_date'])
+
+def compute_risk_trends(frame, bucket='month', disease=None):
+    """
+    Average risk score and case count per time bucket, computed with a single
+    vectorized groupby so it stays fast on years of data
+    """
+    import numpy as np
+    import pandas as pd
+    
+    if bucket not in TREND_BUCKETS:
+        raise ValueError(f"bucket must be one of {', '.join(TREND_BUCKETS)}")
+
+    if disease:
+        frame = frame[frame['disease_name'] == disease]
+
+    if frame.empty:
+        return {'bucket': bucket, 'disease': disease, 'labels': [], 'avg_risk': [], 'cases': []}
+
+    dates = frame['occurrence_date'].to_numpy(dtype='datetime64[ns]')
+    if bucket == 'month':
+        keys = dates.astype('datetime64[M]')
+    else:
+        # Weeks start on Monday; 1970-01-01 was a Thursday
+        days = dates.astype('datetime64[D]').astype(np.int64)
+        keys = (days - (days + 3) % 7).astype('datetime64[D]')
+
+    grouped = frame['risk_score'].groupby(keys).agg(['mean', 'size']).sort_index()
+    label_format = '%Y-%m' if bucket == 'month' else '%Y-%m-%d'
+    return {
+        'bucket': bucket,
+        'disease': disease,
+        'labels': pd.DatetimeIndex(grouped.index).strftime(label_format).tolist(),
+        'avg_risk': grouped['mean'].round(4).tolist(),
+        'cases': grouped['size'].astype(int).tolist()
+    }
+
+class RiskTrendCache:
+    """
+    Per-watermark cache of the scored snapshot and the series computed from it,
+    dropped as soon as a newer watermark is seen
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._watermark = None
+        self._frame = None
+        self._series = {}
+
+    def get(self, watermark, bucket, disease, load_frame):
+        with self._lock:
+            if watermark != self._watermark:
+                self._watermark, self._frame, self._series = watermark, None, {}
+            cached = self._series.get((bucket, disease))
+            record_cache('risk_trends', cached is not None)
+            if cached is not None:
+                return cached
+            frame = self._frame
+
+        if frame is None:
+            frame = load_frame()
+        series = compute_risk_trends(frame, bucket, disease)
+
+        with self._lock:
+            if watermark == self._watermark:
+                self._frame = frame
+                self._series[(bucket, disease)] = series
+        return series
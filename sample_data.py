@@ -1,150 +1,273 @@
-from database_models import db, DiseaseEntry
+"""
+Synthetic disease entries for testing, model training and capacity tests
+
+generate_entries() samples whole columns at once with NumPy: diseases by
+prevalence, ages by age group, occurrence dates with each disease's seasonal
+peak, and coordinates clustered around the sample locations. bulk_load()
+writes them through SQLAlchemy Core in batches, or COPY on PostgreSQL, so
+multi-million-row datasets load in seconds rather than hours.
+
+Usage: python sample_data.py [--rows 1000000] [--seed 42] [--batch-size 20000]
+                             [--database-url postgresql://...] [--defer-indexes]
+"""
+import argparse
+import csv
+import io
+import time
+from collections import Counter
 from datetime import datetime, timedelta
-import random
 
-def create_sample_data():
-    """Create sample disease entries for testing and initial model training"""
-    
-    # Sample locations (latitude, longitude) with addresses
-    sample_locations = [
-        (13.0827, 80.2707, "Anna Nagar, Chennai, Tamil Nadu"),
-        (13.0650, 80.2849, "T. Nagar, Chennai, Tamil Nadu"),
-        (13.0878, 80.2785, "Kodambakkam, Chennai, Tamil Nadu"),
-        (13.0569, 80.2378, "Adyar, Chennai, Tamil Nadu"),
-        (13.1185, 80.2574, "Kilpauk, Chennai, Tamil Nadu"),
-        (13.0475, 80.2540, "Mylapore, Chennai, Tamil Nadu"),
-        (13.1067, 80.2206, "Velachery, Chennai, Tamil Nadu"),
-        (13.0338, 80.2465, "Besant Nagar, Chennai, Tamil Nadu"),
-        (13.1143, 80.2329, "Tambaram, Chennai, Tamil Nadu"),
-        (13.0475, 80.1982, "Porur, Chennai, Tamil Nadu"),
-        (13.0732, 80.2609, "Nungambakkam, Chennai, Tamil Nadu"),
-        (13.0418, 80.2341, "Guindy, Chennai, Tamil Nadu"),
-        (13.1305, 80.2155, "Ambattur, Chennai, Tamil Nadu"),
-        (13.0902, 80.2093, "Koyambedu, Chennai, Tamil Nadu"),
-        (13.0524, 80.2102, "Ashok Nagar, Chennai, Tamil Nadu"),
-        
-        # Mumbai locations
-        (19.0760, 72.8777, "Mumbai Central, Mumbai, Maharashtra"),
-        (19.0330, 72.8697, "Colaba, Mumbai, Maharashtra"),
-        (19.0596, 72.8295, "Andheri, Mumbai, Maharashtra"),
-        (19.1136, 72.8697, "Bandra, Mumbai, Maharashtra"),
-        (19.0176, 72.8562, "Churchgate, Mumbai, Maharashtra"),
-        
-        # Delhi locations
-        (28.6139, 77.2090, "Connaught Place, New Delhi, Delhi"),
-        (28.5355, 77.3910, "Noida, Uttar Pradesh"),
-        (28.4595, 77.0266, "Gurgaon, Haryana"),
-        (28.7041, 77.1025, "Rohini, New Delhi, Delhi"),
-        (28.5494, 77.2500, "Lajpat Nagar, New Delhi, Delhi"),
-        
-        # Bangalore locations
-        (12.9716, 77.5946, "Koramangala, Bangalore, Karnataka"),
-        (12.9698, 77.7499, "Whitefield, Bangalore, Karnataka"),
-        (12.9279, 77.6271, "Jayanagar, Bangalore, Karnataka"),
-        (12.9141, 77.6101, "JP Nagar, Bangalore, Karnataka"),
-        (13.0067, 77.5636, "Malleswaram, Bangalore, Karnataka")
-    ]
-    
-    # Disease types with different prevalence
-    diseases = [
-        ('dengue', 25),
-        ('malaria', 20),
-        ('chikungunya', 15),
-        ('typhoid', 12),
-        ('covid19', 18),
-        ('tuberculosis', 8),
-        ('hepatitis_a', 7),
-        ('influenza', 10),
-        ('other', 5)
-    ]
-    
-    # Create weighted disease list for random selection
-    disease_list = []
-    for disease, weight in diseases:
-        disease_list.extend([disease] * weight)
-    
-    # Generate sample entries
-    sample_entries = []
-    
-    # Generate entries for the past 2 years
-    start_date = datetime.now() - timedelta(days=730)
-    
-    for i in range(200):  # Create 200 sample entries
-        # Random date in the past 2 years
-        random_days = random.randint(0, 730)
-        occurrence_date = start_date + timedelta(days=random_days)
-        
-        # Random location
-        lat, lng, address = random.choice(sample_locations)
-        
-        # Add some random variation to coordinates (within ~1km)
-        lat += random.uniform(-0.01, 0.01)
-        lng += random.uniform(-0.01, 0.01)
-        
-        # Random disease
-        disease = random.choice(disease_list)
-        
-        # Random age (weighted towards common age groups)
-        age_groups = [
-            (random.randint(0, 10), 15),    # Children
-            (random.randint(11, 25), 20),   # Young adults
-            (random.randint(26, 45), 30),   # Adults
-            (random.randint(46, 65), 25),   # Middle-aged
-            (random.randint(66, 90), 10)    # Elderly
-        ]
-        
-        age_list = []
-        for age_range, weight in age_groups:
-            age_list.extend([age_range] * weight)
-        
-        age = random.choice(age_list)
-        
-        # Additional info (some entries have it, some don't)
-        additional_info = ""
-        if random.random() < 0.3:  # 30% chance of having additional info
-            info_options = [
-                "Patient had fever and body aches",
-                "Severe symptoms reported",
-                "Mild case, recovered quickly",
-                "Hospital admission required",
-                "Outpatient treatment",
-                "Contact tracing initiated",
-                "Travel history present",
-                "No travel history"
-            ]
-            additional_info = random.choice(info_options)
-        
-        entry = DiseaseEntry(
-            disease_name=disease,
-            patient_age=age,
-            address=address,
-            latitude=lat,
-            longitude=lng,
-            additional_info=additional_info,
-            occurrence_date=occurrence_date
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+
+from database_models import db, DiseaseEntry
+
+# Sample locations (latitude, longitude) with addresses
+SAMPLE_LOCATIONS = [
+    (13.0827, 80.2707, "Anna Nagar, Chennai, Tamil Nadu"),
+    (13.0650, 80.2849, "T. Nagar, Chennai, Tamil Nadu"),
+    (13.0878, 80.2785, "Kodambakkam, Chennai, Tamil Nadu"),
+    (13.0569, 80.2378, "Adyar, Chennai, Tamil Nadu"),
+    (13.1185, 80.2574, "Kilpauk, Chennai, Tamil Nadu"),
+    (13.0475, 80.2540, "Mylapore, Chennai, Tamil Nadu"),
+    (13.1067, 80.2206, "Velachery, Chennai, Tamil Nadu"),
+    (13.0338, 80.2465, "Besant Nagar, Chennai, Tamil Nadu"),
+    (13.1143, 80.2329, "Tambaram, Chennai, Tamil Nadu"),
+    (13.0475, 80.1982, "Porur, Chennai, Tamil Nadu"),
+    (13.0732, 80.2609, "Nungambakkam, Chennai, Tamil Nadu"),
+    (13.0418, 80.2341, "Guindy, Chennai, Tamil Nadu"),
+    (13.1305, 80.2155, "Ambattur, Chennai, Tamil Nadu"),
+    (13.0902, 80.2093, "Koyambedu, Chennai, Tamil Nadu"),
+    (13.0524, 80.2102, "Ashok Nagar, Chennai, Tamil Nadu"),
+
+    # Mumbai locations
+    (19.0760, 72.8777, "Mumbai Central, Mumbai, Maharashtra"),
+    (19.0330, 72.8697, "Colaba, Mumbai, Maharashtra"),
+    (19.0596, 72.8295, "Andheri, Mumbai, Maharashtra"),
+    (19.1136, 72.8697, "Bandra, Mumbai, Maharashtra"),
+    (19.0176, 72.8562, "Churchgate, Mumbai, Maharashtra"),
+
+    # Delhi locations
+    (28.6139, 77.2090, "Connaught Place, New Delhi, Delhi"),
+    (28.5355, 77.3910, "Noida, Uttar Pradesh"),
+    (28.4595, 77.0266, "Gurgaon, Haryana"),
+    (28.7041, 77.1025, "Rohini, New Delhi, Delhi"),
+    (28.5494, 77.2500, "Lajpat Nagar, New Delhi, Delhi"),
+
+    # Bangalore locations
+    (12.9716, 77.5946, "Koramangala, Bangalore, Karnataka"),
+    (12.9698, 77.7499, "Whitefield, Bangalore, Karnataka"),
+    (12.9279, 77.6271, "Jayanagar, Bangalore, Karnataka"),
+    (12.9141, 77.6101, "JP Nagar, Bangalore, Karnataka"),
+    (13.0067, 77.5636, "Malleswaram, Bangalore, Karnataka")
+]
+
+# Disease types with relative prevalence
+DISEASE_WEIGHTS = {
+    'dengue': 25,
+    'malaria': 20,
+    'chikungunya': 15,
+    'typhoid': 12,
+    'covid19': 18,
+    'tuberculosis': 8,
+    'hepatitis_a': 7,
+    'influenza': 10,
+    'other': 5
+}
+
+# (youngest, oldest, weight) per age group
+AGE_GROUPS = [
+    (0, 10, 15),     # Children
+    (11, 25, 20),    # Young adults
+    (26, 45, 30),    # Adults
+    (46, 65, 25),    # Middle-aged
+    (66, 90, 10)     # Elderly
+]
+
+# (peak day of year, amplitude) for diseases with a season; others are flat.
+# Vector-borne diseases peak after the monsoon, influenza in winter.
+SEASONALITY = {
+    'dengue': (265, 0.8),
+    'malaria': (235, 0.6),
+    'chikungunya': (265, 0.7),
+    'typhoid': (190, 0.4),
+    'influenza': (15, 0.6)
+}
+
+INFO_OPTIONS = [
+    "Patient had fever and body aches",
+    "Severe symptoms reported",
+    "Mild case, recovered quickly",
+    "Hospital admission required",
+    "Outpatient treatment",
+    "Contact tracing initiated",
+    "Travel history present",
+    "No travel history"
+]
+
+COLUMNS = ['disease_name', 'patient_age', 'address', 'latitude', 'longitude',
+           'additional_info', 'occurrence_date', 'created_at']
+
+def _seasonal_offsets(rng, count, days, start, peak, amplitude):
+    """Day offsets into the window, weighted by a yearly cosine around the peak"""
+    day_of_year = (pd.date_range(start, periods=days, freq='D').dayofyear.to_numpy())
+    weights = 1 + amplitude * np.cos(2 * np.pi * (day_of_year - peak) / 365.25)
+    return rng.choice(days, size=count, p=weights / weights.sum())
+
+def generate_entries(count, seed=None, days=730, spread=0.006, info_rate=0.3, end=None):
+    """
+    Generate count disease entries as a DataFrame with the disease_entries columns
+    """
+    rng = np.random.default_rng(seed)
+    end = end or datetime.now()
+    start = (end - timedelta(days=days)).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    names = np.array(list(DISEASE_WEIGHTS))
+    weights = np.array(list(DISEASE_WEIGHTS.values()), dtype=float)
+    disease_codes = rng.choice(len(names), size=count, p=weights / weights.sum())
+
+    group_weights = np.array([weight for _, _, weight in AGE_GROUPS], dtype=float)
+    groups = rng.choice(len(AGE_GROUPS), size=count, p=group_weights / group_weights.sum())
+    youngest = np.array([low for low, _, _ in AGE_GROUPS])[groups]
+    oldest = np.array([high for _, high, _ in AGE_GROUPS])[groups]
+    ages = rng.integers(youngest, oldest + 1)
+
+    offsets = rng.integers(0, days, size=count)
+    for code, name in enumerate(names):
+        if name not in SEASONALITY:
+            continue
+        mask = disease_codes == code
+        offsets[mask] = _seasonal_offsets(rng, int(mask.sum()), days, start, *SEASONALITY[name])
+    seconds = offsets * 86400 + rng.integers(0, 86400, size=count)
+    occurrence = np.datetime64(start, 's') + seconds.astype('timedelta64[s]')
+    # Reported between an hour and three days later, never in the future
+    reported = occurrence + rng.integers(3600, 3 * 86400, size=count).astype('timedelta64[s]')
+    reported = np.minimum(reported, np.datetime64(end, 's'))
+
+    # Gaussian clusters around the sample locations
+    location_codes = rng.integers(0, len(SAMPLE_LOCATIONS), size=count)
+    centers = np.array([(lat, lng) for lat, lng, _ in SAMPLE_LOCATIONS])[location_codes]
+    addresses = np.array([address for _, _, address in SAMPLE_LOCATIONS], dtype=object)
+
+    info = np.array([''] + INFO_OPTIONS, dtype=object)
+    info_codes = np.where(rng.random(count) < info_rate,
+                          rng.integers(1, len(info), size=count), 0)
+
+    return pd.DataFrame({
+        'disease_name': names[disease_codes],
+        'patient_age': ages.astype(float),
+        'address': addresses[location_codes],
+        'latitude': centers[:, 0] + rng.normal(0, spread, count),
+        'longitude': centers[:, 1] + rng.normal(0, spread, count),
+        'additional_info': info[info_codes],
+        'occurrence_date': occurrence,
+        'created_at': reported
+    }, columns=COLUMNS)
+
+def _copy_frame(connection, table, frame):
+    """Stream a frame into PostgreSQL with COPY ... FROM STDIN (psycopg2)"""
+    buffer = io.StringIO()
+    frame.to_csv(buffer, index=False, header=False, quoting=csv.QUOTE_MINIMAL,
+                 date_format='%Y-%m-%d %H:%M:%S')
+    buffer.seek(0)
+    cursor = connection.connection.dbapi_connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {table.name} ({', '.join(frame.columns)}) FROM STDIN WITH (FORMAT csv)", buffer
         )
-        
-        sample_entries.append(entry)
-    
-    # Add all entries to database
+    finally:
+        cursor.close()
+
+def _bound_rows(dialect, table, frame):
+    """
+    Compile the Core insert once and convert values column by column with each
+    column type's bind processor, so executemany skips per-row parameter handling
+    """
+    statement = table.insert().compile(dialect=dialect, column_keys=list(frame.columns))
+    columns = {}
+    for name in frame.columns:
+        series = frame[name]
+        values = list(series.dt.to_pydatetime()) if series.dtype.kind == 'M' else series.tolist()
+        processor = table.c[name].type.bind_processor(dialect)
+        columns[name] = list(map(processor, values)) if processor else values
+    order = statement.positiontup if dialect.positional else list(frame.columns)
+    rows = list(zip(*(columns[name] for name in order)))
+    if not dialect.positional:
+        rows = [dict(zip(order, row)) for row in rows]
+    return statement.string, rows
+
+def bulk_load(engine, frame, batch_size=20000, defer_indexes=False):
+    """
+    Insert a generate_entries() frame; returns rows inserted.
+    Uses COPY on PostgreSQL with psycopg2 and batched Core inserts elsewhere.
+    defer_indexes drops the table's secondary indexes for the load and rebuilds
+    them afterwards, which is much faster for large loads into a new table. It
+    runs in the load's transaction, so on PostgreSQL the table stays locked
+    against every reader until the load commits: never use it on a live table.
+    """
+    table = DiseaseEntry.__table__
+    use_copy = engine.dialect.name == 'postgresql' and engine.dialect.driver == 'psycopg2'
+    with engine.begin() as connection:
+        if defer_indexes:
+            for index in table.indexes:
+                index.drop(connection, checkfirst=True)
+        if use_copy:
+            for begin in range(0, len(frame), batch_size):
+                _copy_frame(connection, table, frame.iloc[begin:begin + batch_size])
+        else:
+            sql, rows = _bound_rows(engine.dialect, table, frame)
+            for begin in range(0, len(rows), batch_size):
+                connection.exec_driver_sql(sql, rows[begin:begin + batch_size])
+        if defer_indexes:
+            for index in table.indexes:
+                index.create(connection, checkfirst=True)
+    return len(frame)
+
+def create_sample_data(count=200, seed=None):
+    """Create sample disease entries for testing and initial model training"""
+    frame = generate_entries(count, seed=seed)
     try:
-        db.session.add_all(sample_entries)
-        db.session.commit()
-        print(f"Successfully created {len(sample_entries)} sample disease entries")
-        
+        bulk_load(db.engine, frame)
+        print(f"Successfully created {len(frame)} sample disease entries")
+
         # Print some statistics
-        from collections import Counter
-        disease_counts = Counter([entry.disease_name for entry in sample_entries])
         print("\nDisease distribution:")
-        for disease, count in disease_counts.items():
-            print(f"  {disease.title()}: {count}")
-            
+        for disease, disease_count in Counter(frame['disease_name']).items():
+            print(f"  {disease.title()}: {disease_count}")
+
     except Exception as e:
         db.session.rollback()
         print(f"Error creating sample data: {str(e)}")
 
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=200)
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--days', type=int, default=730, help='history covered by occurrence dates')
+    parser.add_argument('--batch-size', type=int, default=20000)
+    parser.add_argument('--database-url', help='load here instead of the app database')
+    parser.add_argument('--defer-indexes', action='store_true',
+                        help='drop indexes for the load and rebuild them after; faster, but locks '
+                             'the table for the whole load, so only for tables nothing else is reading')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    frame = generate_entries(args.rows, seed=args.seed, days=args.days)
+    generated = time.perf_counter() - started
+
+    if args.database_url:
+        engine = create_engine(args.database_url)
+        DiseaseEntry.__table__.create(engine, checkfirst=True)
+        bulk_load(engine, frame, args.batch_size, defer_indexes=args.defer_indexes)
+    else:
+        from app import app
+        with app.app_context():
+            db.create_all()
+            bulk_load(db.engine, frame, args.batch_size, defer_indexes=args.defer_indexes)
+    elapsed = time.perf_counter() - started
+    print(f"Generated {len(frame):,} entries in {generated:.2f}s, "
+          f"loaded in {elapsed - generated:.2f}s ({len(frame) / elapsed:,.0f} rows/s overall)")
+
 if __name__ == "__main__":
-    from app import app
-    with app.app_context():
-        db.create_all()
-        create_sample_data()
+    main()
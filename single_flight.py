@@ -0,0 +1,181 @@
+"""
+Single-flight coalescing of identical expensive computations
+
+Concurrent calls with the same key wait for one in-progress execution and
+share its result (or its exception) instead of each repeating the work. With
+a lock directory the same holds across gunicorn workers: the first worker to
+take the key's file lock computes and publishes the pickled result next to
+it, and workers that were blocked on the lock read that result instead of
+recomputing. Keys must capture everything the result depends on, e.g. the
+data watermark.
+
+Waiting is bounded: a hold callable (e.g. AdmissionController.hold) can wrap
+every wait, on an in-process leader or on another worker's lock, so those
+threads count against a budget like any other queued request.
+"""
+import hashlib
+import logging
+import os
+import pickle
+import threading
+import time
+from metrics import REGISTRY
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+LOCK_STRIPES = 256
+PRUNE_INTERVAL = 60.0
+RESULT_MAX_AGE = 600.0
+
+FLIGHT_CALLS = REGISTRY.counter(
+    'single_flight_calls_total',
+    'Coalesced calls by role: leader computed, follower shared an in-process result, '
+    'remote shared another worker\'s result',
+    ('name', 'role')
+)
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """Coalesces concurrent calls per key within a process and optionally across processes"""
+
+    def __init__(self, name, lock_dir=None, lock_timeout=60.0, hold=None):
+        self.name = name
+        self.lock_dir = lock_dir if (lock_dir and FCNTL_AVAILABLE) else None
+        self.lock_timeout = lock_timeout
+        # hold(wait) runs wait(timeout) under the caller's budget and raises when it
+        # returns False; without one, followers wait indefinitely and lock waiters
+        # up to lock_timeout
+        self.hold = hold
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._last_prune = 0.0
+        if self.lock_dir:
+            os.makedirs(self.lock_dir, exist_ok=True)
+
+    def do(self, key, function, *args, **kwargs):
+        """Return function(*args, **kwargs), sharing one execution between concurrent callers of key"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            FLIGHT_CALLS.inc(name=self.name, role='follower')
+            if self.hold:
+                self.hold(call.done.wait)
+            else:
+                call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            if self.lock_dir:
+                call.result = self._do_cross_process(key, function, args, kwargs)
+            else:
+                FLIGHT_CALLS.inc(name=self.name, role='leader')
+                call.result = function(*args, **kwargs)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def _paths(self, key):
+        digest = hashlib.sha256(repr(key).encode('utf-8')).hexdigest()
+        # Lock files are striped so they stay few and never need deleting
+        lock_path = os.path.join(self.lock_dir, f"{self.name}-{int(digest[:8], 16) % LOCK_STRIPES:03d}.lock")
+        result_path = os.path.join(self.lock_dir, f"{self.name}-{digest}.result")
+        return lock_path, result_path
+
+    def _acquire(self, lock_file, timeout=None):
+        """flock with a timeout; returns False if another worker held it for too long"""
+        deadline = time.monotonic() + (self.lock_timeout if timeout is None else timeout)
+        while True:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return True
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    return False
+                time.sleep(0.01)
+
+    def _read_result(self, key, result_path, since):
+        """Result another worker published for key after `since`, or None"""
+        try:
+            if os.path.getmtime(result_path) < since:
+                return None
+            with open(result_path, 'rb') as f:
+                stored_key, result = pickle.load(f)
+            return (result,) if stored_key == repr(key) else None
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+    def _write_result(self, key, result_path, result):
+        temp_path = f"{result_path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, 'wb') as f:
+                pickle.dump((repr(key), result), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, result_path)
+        except Exception as e:
+            logger.warning(f"Failed to publish single-flight result for {self.name}: {e}")
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+    def _do_cross_process(self, key, function, args, kwargs):
+        lock_path, result_path = self._paths(key)
+        waiting_since = time.time()
+        with open(lock_path, 'a+b') as lock_file:
+            if self.hold:
+                # Raises if another worker holds the lock past the budget
+                self.hold(lambda timeout: self._acquire(lock_file, timeout))
+            elif not self._acquire(lock_file):
+                logger.warning(f"Timed out waiting for {self.name} lock; computing without it")
+                FLIGHT_CALLS.inc(name=self.name, role='leader')
+                return function(*args, **kwargs)
+            try:
+                # A worker that held the lock while we waited has just computed this
+                shared = self._read_result(key, result_path, waiting_since)
+                if shared is not None:
+                    FLIGHT_CALLS.inc(name=self.name, role='remote')
+                    return shared[0]
+                FLIGHT_CALLS.inc(name=self.name, role='leader')
+                result = function(*args, **kwargs)
+                self._write_result(key, result_path, result)
+                return result
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+                self._prune()
+
+    def _prune(self):
+        """Delete published results old enough that nobody can still be waiting for them"""
+        now = time.time()
+        if now - self._last_prune < PRUNE_INTERVAL:
+            return
+        self._last_prune = now
+        try:
+            for entry in os.scandir(self.lock_dir):
+                if entry.name.startswith(f"{self.name}-") and '.result' in entry.name:
+                    if now - entry.stat().st_mtime > RESULT_MAX_AGE:
+                        os.remove(entry.path)
+        except OSError as e:
+            logger.debug(f"Failed to prune single-flight results: {e}")
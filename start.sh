@@ -6,5 +6,5 @@ echo "Starting Disease Monitoring Portal..."
 echo "Python version: $(python --version)"
 echo "Gunicorn version: $(gunicorn --version)"
 
-# Start the application
-exec gunicorn app:app --bind 0.0.0.0:$PORT --workers 2 --timeout 120
+# Start the application (settings, including preload, are in gunicorn.conf.py)
+exec gunicorn app:app
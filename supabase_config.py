@@ -2,13 +2,19 @@
 Supabase configuration and integration utilities
 """
 import os
-from typing import Optional, Dict, Any
+import threading
+from typing import TYPE_CHECKING, Optional, Dict, Any
 import logging
-from supabase import create_client, Client
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
-import psycopg2
 from datetime import datetime
+from circuit_breaker import CircuitBreaker
+from http_pool import PooledHttpClient
+from metrics import timed
+from tracing import traced
+
+if TYPE_CHECKING:
+    from supabase import Client
 
 logger = logging.getLogger(__name__)
 
@@ -20,18 +26,50 @@ class SupabaseConfig:
         self.key = os.getenv('SUPABASE_ANON_KEY')
         self.service_role_key = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
         self.database_url = os.getenv('SUPABASE_DATABASE_URL')
+        self.call_deadline = float(os.getenv('SUPABASE_CALL_DEADLINE', '5'))
+        self.breaker_failures = int(os.getenv('SUPABASE_BREAKER_FAILURES', '3'))
+        self.breaker_reset = float(os.getenv('SUPABASE_BREAKER_RESET', '30'))
+        self.http_max_connections = int(os.getenv('SUPABASE_HTTP_MAX_CONNECTIONS', '32'))
+        self.http_max_keepalive = int(os.getenv('SUPABASE_HTTP_MAX_KEEPALIVE', '16'))
+        self.http_keepalive_expiry = float(os.getenv('SUPABASE_HTTP_KEEPALIVE_EXPIRY', '30'))
+        self.http_connect_timeout = float(os.getenv('SUPABASE_HTTP_CONNECT_TIMEOUT', '3'))
+        self.http_read_timeout = float(os.getenv('SUPABASE_HTTP_READ_TIMEOUT', '10'))
+        self.http_pool_timeout = float(os.getenv('SUPABASE_HTTP_POOL_TIMEOUT', '2'))
+        self.http2 = os.getenv('SUPABASE_HTTP2', 'true').lower() in ['true', 'on', '1']
+        # Deadline threads: enough for every request thread (and pooled connection) to call at once
+        self.max_concurrent_calls = int(os.getenv('SUPABASE_MAX_CONCURRENT_CALLS', '0')) or max(
+            self.http_max_connections, int(os.getenv('GUNICORN_THREADS', '32')))
         
         if not self.url or not self.key:
             raise ValueError("SUPABASE_URL and SUPABASE_ANON_KEY must be set")
     
-    def get_client(self) -> Client:
+    def get_http_pool(self) -> PooledHttpClient:
+        """Pooled HTTP transport shared by the anon and admin clients"""
+        return PooledHttpClient(
+            'supabase',
+            max_connections=self.http_max_connections,
+            max_keepalive=self.http_max_keepalive,
+            keepalive_expiry=self.http_keepalive_expiry,
+            connect_timeout=self.http_connect_timeout,
+            read_timeout=self.http_read_timeout,
+            write_timeout=self.http_read_timeout,
+            pool_timeout=self.http_pool_timeout,
+            http2=self.http2
+        )
+    
+    def get_client(self, http_client=None) -> 'Client':
         """Get Supabase client instance"""
-        return create_client(self.url, self.key)
+        # Imported here: the supabase package is slow to import and only needed once a client is built
+        from supabase import create_client
+        from supabase.lib.client_options import SyncClientOptions
+        return create_client(self.url, self.key, options=SyncClientOptions(httpx_client=http_client))
     
-    def get_admin_client(self) -> Optional[Client]:
+    def get_admin_client(self, http_client=None) -> Optional['Client']:
         """Get Supabase admin client with service role key"""
         if self.service_role_key:
-            return create_client(self.url, self.service_role_key)
+            from supabase import create_client
+            from supabase.lib.client_options import SyncClientOptions
+            return create_client(self.url, self.service_role_key, options=SyncClientOptions(httpx_client=http_client))
         return None
 
 class SupabaseManager:
@@ -39,49 +77,99 @@ class SupabaseManager:
     
     def __init__(self):
         self.config = SupabaseConfig()
-        self.client = self.config.get_client()
-        self.admin_client = self.config.get_admin_client()
+        self.http_pool = self.config.get_http_pool()
+        self._clients_lock = threading.Lock()
+        self._clients_pid = None
+        self._client = None
+        self._admin_client = None
+        # Clients are built on first use (see _ensure_clients)
+        self.breaker = CircuitBreaker(
+            'supabase',
+            failure_threshold=self.config.breaker_failures,
+            reset_timeout=self.config.breaker_reset,
+            deadline=self.config.call_deadline,
+            max_concurrent_calls=self.config.max_concurrent_calls
+        )
+    
+    def _ensure_clients(self):
+        """Build the anon and admin clients on the current process's pooled transport"""
+        if self._clients_pid == os.getpid():
+            return
+        with self._clients_lock:
+            if self._clients_pid != os.getpid():
+                http_client = self.http_pool.get()
+                self._client = self.config.get_client(http_client)
+                self._admin_client = self.config.get_admin_client(http_client)
+                self._clients_pid = os.getpid()
+    
+    @property
+    def client(self) -> 'Client':
+        self._ensure_clients()
+        return self._client
+    
+    @property
+    def admin_client(self) -> Optional['Client']:
+        self._ensure_clients()
+        return self._admin_client
+    
+    def is_available(self) -> bool:
+        """
+        False while the circuit breaker would short-circuit a call: when it is
+        open, and when it is half-open with its probe already in flight
+        """
+        return self.breaker.accepting_calls
+    
+    def _execute(self, query):
+        """Run a query builder through the circuit breaker and per-call deadline"""
+        return self.breaker.call(query.execute)
     
-    def test_connection(self) -> bool:
-        """Test Supabase connection"""
+    @timed('supabase', 'test_connection')
+    @traced('supabase.test_connection')
+    def test_connection(self, through_breaker: bool = True) -> bool:
+        """Test Supabase connection; through_breaker=False queries it even while the circuit is open"""
         try:
             # Test with a simple query
-            response = self.client.table('disease_entries').select('id').limit(1).execute()
+            query = self.client.table('disease_entries').select('id').limit(1)
+            response = self._execute(query) if through_breaker else self.breaker.probe(query.execute)
             logger.info("Supabase connection successful")
             return True
         except Exception as e:
             logger.error(f"Supabase connection failed: {e}")
             return False
     
+    @timed('supabase', 'create_disease_entry')
+    @traced('supabase.create_disease_entry')
     def create_disease_entry(self, entry_data: Dict[str, Any]) -> Optional[Dict]:
         """Create a new disease entry in Supabase"""
         try:
-            response = self.client.table('disease_entries').insert(entry_data).execute()
+            response = self._execute(self.client.table('disease_entries').insert(entry_data))
             return response.data[0] if response.data else None
         except Exception as e:
             logger.error(f"Failed to create disease entry: {e}")
             return None
     
+    @timed('supabase', 'get_disease_entries')
+    @traced('supabase.get_disease_entries')
     def get_disease_entries(self, limit: int = 100, offset: int = 0) -> list:
         """Get disease entries from Supabase"""
         try:
-            response = (self.client.table('disease_entries')
+            response = self._execute(self.client.table('disease_entries')
                        .select('*')
                        .range(offset, offset + limit - 1)
-                       .order('created_at', desc=True)
-                       .execute())
+                       .order('created_at', desc=True))
             return response.data
         except Exception as e:
             logger.error(f"Failed to get disease entries: {e}")
             return []
     
+    @timed('supabase', 'get_disease_entry_by_id')
+    @traced('supabase.get_disease_entry_by_id')
     def get_disease_entry_by_id(self, entry_id: int) -> Optional[Dict[str, Any]]:
         """Get a single disease entry by ID"""
         try:
-            response = (self.client.table('disease_entries')
+            response = self._execute(self.client.table('disease_entries')
                        .select('*')
-                       .eq('id', entry_id)
-                       .execute())
+                       .eq('id', entry_id))
             
             if response.data and len(response.data) > 0:
                 return response.data[0]
@@ -90,12 +178,77 @@ class SupabaseManager:
             logger.error(f"Failed to get disease entry by ID {entry_id}: {e}")
             return None
     
+    @timed('supabase', 'get_latest_entry_marker')
+    @traced('supabase.get_latest_entry_marker')
+    def get_latest_entry_marker(self) -> Optional[Dict[str, Any]]:
+        """Get the row count and newest id/created_at without fetching the table"""
+        try:
+            response = self._execute(self.client.table('disease_entries')
+                       .select('id,created_at', count='exact')
+                       .order('id', desc=True)
+                       .limit(1))
+            latest = response.data[0] if response.data else {}
+            return {
+                'count': response.count or 0,
+                'max_id': latest.get('id'),
+                'max_created_at': latest.get('created_at')
+            }
+        except Exception as e:
+            logger.error(f"Failed to get latest entry marker: {e}")
+            return None
+
+    @timed('supabase', 'get_entries_since')
+    @traced('supabase.get_entries_since')
+    def get_entries_since(self, last_id: int, limit: int = 100) -> list:
+        """Get entries with an id greater than last_id, oldest first"""
+        try:
+            response = self._execute(self.client.table('disease_entries')
+                       .select('*')
+                       .gt('id', last_id)
+                       .order('id')
+                       .limit(limit))
+            return response.data
+        except Exception as e:
+            logger.error(f"Failed to get entries since {last_id}: {e}")
+            return []
+
+    @timed('supabase', 'get_entries_occurred_since')
+    @traced('supabase.get_entries_occurred_since')
+    def get_entries_occurred_since(self, since: datetime, limit: int = 10000) -> list:
+        """Get entries that occurred at or after since, oldest id first"""
+        try:
+            response = self._execute(self.client.table('disease_entries')
+                       .select('*')
+                       .gte('created_at', since.isoformat())
+                       .order('id')
+                       .limit(limit))
+            return response.data
+        except Exception as e:
+            logger.error(f"Failed to get entries that occurred since {since}: {e}")
+            return []
+
+    @timed('supabase', 'get_disease_counts')
+    @traced('supabase.get_disease_counts')
+    def get_disease_counts(self) -> Dict[str, int]:
+        """Get the number of entries per disease type"""
+        try:
+            response = self._execute(self.client.table('disease_entries').select('disease_type'))
+            counts = {}
+            for entry in response.data:
+                disease_type = entry.get('disease_type', 'unknown')
+                counts[disease_type] = counts.get(disease_type, 0) + 1
+            return counts
+        except Exception as e:
+            logger.error(f"Failed to get disease counts: {e}")
+            return {}
+
+    @timed('supabase', 'get_entries_for_ml')
+    @traced('supabase.get_entries_for_ml')
     def get_entries_for_ml(self) -> list:
         """Get disease entries formatted for ML model"""
         try:
-            response = (self.client.table('disease_entries')
-                       .select('latitude,longitude,disease_type,severity,created_at,age')
-                       .execute())
+            response = self._execute(self.client.table('disease_entries')
+                       .select('latitude,longitude,disease_type,severity,created_at,age'))
             
             # Transform the data to match ML model expectations
             entries = []
@@ -109,6 +109,1149 @@ def test_form_submission():
         traceback.print_exc()
         return False
 
+def test_report_jobs():
+    """Test background report generation and job polling"""
+    print("\n🧪 Testing Report Jobs")
+    print("=" * 30)
+    
+    import time
+    from app import create_app
+    app = create_app()
+    
+    with app.test_client() as client:
+        print("Testing report submission...")
+        response = client.post('/api/reports', json={'weeks': 4, 'top_n': 3})
+        print(f"Report submission status: {response.status_code}")
+        assert response.status_code in [200, 202]
+        job = response.get_json()
+        
+        deadline = time.time() + 30
+        while job['status'] not in ['done', 'failed'] and time.time() < deadline:
+            time.sleep(0.2)
+            job = client.get(f"/api/reports/{job['id']}").get_json()
+        
+        assert job['status'] == 'done', job
+        assert set(job['result']) >= {'disease_counts', 'weekly_trends', 'top_hotspots', 'model'}
+        print("✅ Report generation works")
+        
+        # Same parameters on unchanged data are served from the cached job
+        response = client.post('/api/reports', json={'weeks': 4, 'top_n': 3})
+        assert response.get_json()['id'] == job['id']
+        print("✅ Report cache works")
+        
+        response = client.post('/api/reports', json={'weeks': 0})
+        assert response.status_code == 400
+        assert client.get('/api/reports/missing').status_code == 404
+        print("✅ Report validation works")
+
+def test_report_builder():
+    """Test report contents on known entries"""
+    from report_jobs import build_disease_report
+    
+    entries = [
+        {'latitude': 13.08, 'longitude': 80.27, 'disease_type': 'dengue', 'age': 30, 'created_at': '2024-07-01T10:00:00'},
+        {'latitude': 13.08, 'longitude': 80.27, 'disease_type': 'dengue', 'age': 8, 'created_at': '2024-07-02T10:00:00'},
+        {'latitude': 19.07, 'longitude': 72.87, 'disease_type': 'malaria', 'age': 45, 'created_at': '2024-07-09T10:00:00'},
+    ]
+    report = build_disease_report(entries, weeks=4, top_n=1)
+    
+    assert report['total_cases'] == 3
+    assert report['disease_counts'] == {'dengue': 2, 'malaria': 1}
+    assert [week['total'] for week in report['weekly_trends']] == [2, 1]
+    assert report['top_hotspots'] == [{'lat': 13.08, 'lng': 80.27, 'cases': 2, 'dominant_disease': 'dengue'}]
+    print("✅ Report builder works")
+
+def test_risk_trends():
+    """Test weekly and monthly risk trend series"""
+    import pandas as pd
+    from risk_trends import compute_risk_trends
+    
+    frame = pd.DataFrame({
+        'disease_name': ['dengue', 'dengue', 'malaria', 'dengue'],
+        'occurrence_date': pd.to_datetime(['2024-06-03', '2024-06-09', '2024-06-10', '2024-07-01']),
+        'risk_score': [0.8, 0.6, 0.5, 1.0]
+    })
+    
+    monthly = compute_risk_trends(frame, 'month')
+    assert monthly['labels'] == ['2024-06', '2024-07']
+    assert monthly['cases'] == [3, 1]
+    assert monthly['avg_risk'] == [0.6333, 1.0]
+    
+    weekly = compute_risk_trends(frame, 'week', disease='dengue')
+    assert weekly['labels'] == ['2024-06-03', '2024-07-01']
+    assert weekly['cases'] == [2, 1]
+    
+    from app import create_app
+    app = create_app()
+    with app.test_client() as client:
+        response = client.get('/api/trends?bucket=week')
+        assert response.status_code == 200
+        assert set(response.get_json()) >= {'labels', 'avg_risk', 'cases'}
+        assert client.get('/api/trends?bucket=day').status_code == 400
+    print("✅ Risk trends work")
+
+def test_event_stream():
+    """Test that one poll fans out to every subscriber"""
+    from event_stream import EventBroker, ChangePoller
+    
+    state = {'watermark': {'max_id': 1}, 'version': 'v1'}
+    polls = []
+    broker = EventBroker()
+    poller = ChangePoller(
+        broker,
+        get_watermark=lambda: polls.append('watermark') or state['watermark'],
+        get_entries_since=lambda last_id: [{'id': last_id + 1, 'disease_type': 'dengue'}],
+        get_disease_counts=lambda: {'dengue': 2},
+        get_model_version=lambda: state['version']
+    )
+    subscribers = [broker.subscribe() for _ in range(50)]
+    
+    poller.poll_once()
+    state['watermark'] = {'max_id': 2}
+    state['version'] = 'v2'
+    poller.poll_once()
+    
+    assert len(polls) == 2
+    for subscriber in subscribers:
+        events = [subscriber.get_nowait().split('\n')[0] for _ in range(subscriber.qsize())]
+        assert events == ['event: model', 'event: counts', 'event: model', 'event: entry', 'event: counts']
+    
+    stream = broker.stream(subscribers[0], initial=poller.snapshot_messages(), heartbeat=0.01, max_duration=0.05)
+    messages = list(stream)
+    assert messages[1].startswith('event: counts')
+    assert messages[-1] == ': keepalive\n\n'
+    assert broker.subscriber_count == 49
+
+    # Streams hold worker threads, so a full broker turns new clients away
+    from admission import Overloaded
+    limited = EventBroker(max_subscribers=2, max_duration=300)
+    first = limited.subscribe()
+    limited.subscribe()
+    try:
+        limited.subscribe()
+        assert False, "third stream should be rejected"
+    except Overloaded as e:
+        assert e.retry_after == 150
+    list(limited.stream(first, heartbeat=0.01, max_duration=0.02))
+    limited.subscribe()
+
+    from app import create_app
+    app = create_app()
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        for _ in range(app.config['SSE_MAX_STREAMS']):
+            response = client.get('/api/stream')
+            assert response.status_code == 200
+            response.close()
+        held = [client.get('/api/stream') for _ in range(app.config['SSE_MAX_STREAMS'])]
+        rejected = client.get('/api/stream')
+        assert rejected.status_code == 503
+        assert int(rejected.headers['Retry-After']) >= 1
+        for response in held:
+            response.close()
+        assert client.get('/api/stream').status_code == 200
+    print("✅ Event stream works")
+
+def test_conditional_get():
+    """Test ETag revalidation on data endpoints"""
+    from app import create_app
+    app = create_app()
+    
+    with app.test_client() as client:
+        for path in ['/api/entries', '/dashboard']:
+            response = client.get(path)
+            assert response.status_code == 200
+            etag = response.headers['ETag']
+            
+            response = client.get(path, headers={'If-None-Match': etag})
+            print(f"Revalidating {path}: {response.status_code}")
+            assert response.status_code == 304
+            assert response.data == b''
+            
+            response = client.get(path, headers={'If-None-Match': '"stale"'})
+            assert response.status_code == 200
+
+            # created_at can be back-dated, so it never answers a revalidation
+            assert 'Last-Modified' not in response.headers
+            response = client.get(path, headers={'If-Modified-Since': 'Fri, 01 Jan 2100 00:00:00 GMT'})
+            assert response.status_code == 200
+    print("✅ Conditional GET works")
+
+def test_entry_formats():
+    """Test columnar and Arrow formats for /api/entries"""
+    from app import create_app
+    from entry_serializers import ARROW_AVAILABLE
+    app = create_app()
+    
+    with app.test_client() as client:
+        response = client.get('/api/entries?format=columnar')
+        assert response.status_code == 200
+        assert set(response.get_json()) == {'count', 'columns'}
+        
+        response = client.get('/api/entries?format=arrow')
+        if ARROW_AVAILABLE:
+            import pyarrow as pa
+            assert response.mimetype == 'application/vnd.apache.arrow.stream'
+            pa.ipc.open_stream(response.data).read_all()
+        else:
+            assert response.status_code == 501
+        
+        assert client.get('/api/entries?format=xml').status_code == 400
+
+    # Local columns carry the same fields as the JSON rows
+    from database_models import DiseaseEntry
+    from entry_serializers import query_local_entry_columns
+    with app.app_context():
+        columns = query_local_entry_columns()
+        entry = DiseaseEntry.query.first()
+        if entry is not None:
+            assert list(columns) == list(entry.to_dict())
+            assert columns['disease_type'][0] == entry.disease_name
+    print("✅ Entry formats work")
+
+def test_metrics():
+    """Test the Prometheus metrics endpoint"""
+    import shutil
+    import tempfile
+    from app import create_app
+    from metrics import Histogram
+    
+    histogram = Histogram('test_seconds', 'Test histogram', ('route',), buckets=(0.1, 1.0))
+    for value in [0.05, 0.5, 5.0]:
+        histogram.observe(value, route='/x')
+    lines = histogram.render()
+    assert 'test_seconds_bucket{route="/x",le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{route="/x",le="1.0"} 2' in lines
+    assert 'test_seconds_bucket{route="/x",le="+Inf"} 3' in lines
+    assert 'test_seconds_count{route="/x"} 3' in lines
+    
+    # Shared across processes: counts and histograms add up, gauges only from live processes
+    import subprocess
+    from metrics import Registry
+    shared = tempfile.mkdtemp()
+    try:
+        other_worker = f"""
+from metrics import Registry
+registry = Registry()
+registry.share({shared!r})
+registry.counter('jobs_total', 'Jobs').inc(3)
+registry.histogram('job_seconds', 'Job time', buckets=(1.0,)).observe(0.5)
+registry.gauge('queue_depth', 'Queue depth').set(7)
+registry.ensure_publishing()
+registry.publish()
+"""
+        subprocess.run([sys.executable, '-c', other_worker], check=True,
+                       cwd=os.path.dirname(os.path.abspath(__file__)))
+        registry = Registry()
+        registry.share(shared)
+        jobs = registry.counter('jobs_total', 'Jobs')
+        jobs.inc(2)
+        registry.histogram('job_seconds', 'Job time', buckets=(1.0,)).observe(2.0)
+        registry.gauge('queue_depth', 'Queue depth').set(1)
+        body = registry.render()
+        assert 'jobs_total 5' in body
+        assert 'job_seconds_bucket{le="1.0"} 1' in body and 'job_seconds_count 2' in body
+        assert f'queue_depth{{pid="{os.getpid()}"}} 1' in body and body.count('queue_depth{') == 1
+        # A forked worker does not publish the counts it inherited
+        registry._after_fork()
+        assert jobs.value() == 0
+    finally:
+        shutil.rmtree(shared, ignore_errors=True)
+    
+    # The risk map retrains the model; keep its files out of the working tree
+    workdir = tempfile.mkdtemp()
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        app = create_app()
+        with app.test_client() as client:
+            client.get('/api/entries')
+            client.get('/api/risk-map/13.0827/80.2707/dengue')
+            response = client.get('/metrics')
+            assert response.status_code == 200
+            body = response.data.decode()
+            assert 'http_request_duration_seconds_count{route="/api/entries",method="GET",status="200"}' in body
+            assert 'stage_duration_seconds_count{operation="predict_risk_areas"' in body
+            if app.config.get('SUPABASE_URL'):
+                assert 'stage_duration_seconds_count{operation="supabase",stage="get_latest_entry_marker"}' in body
+            assert 'model_info{version=' in body
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+    print("✅ Metrics endpoint works")
+
+def test_profiling():
+    """Test that profiling is gated and writes a summary"""
+    import tempfile
+    from profiling import Profiler
+    
+    profiler = Profiler()
+    assert profiler.request_mode({'profile': 'cpu'}, {'X-Profile-Token': 'token'}) is None
+    
+    with tempfile.TemporaryDirectory() as directory:
+        profiler.configure(enabled=True, token='token', directory=directory)
+        assert profiler.request_mode({'profile': 'cpu'}, {'X-Profile-Token': 'wrong'}) is None
+        assert profiler.request_mode({'profile': 'cpu'}, {'X-Profile-Token': 'token'}) == 'cpu'
+        
+        for mode in ['cpu', 'sample']:
+            session = profiler.start('unit test', mode)
+            assert profiler.start('concurrent', mode) is None
+            sum(i * i for i in range(100000))
+            path = profiler.finish(session)
+            with open(path + '.txt') as f:
+                summary = f.read()
+            assert 'Top functions' in summary and 'Top allocations' in summary
+        
+        # An async view runs on asgiref's event loop thread; its work is captured there
+        import asyncio
+        import pstats
+        from flask import Flask
+        from async_data import run_in_app_context
+        
+        def blocking_lookup():
+            return sum(i * i for i in range(10000))
+        
+        app = Flask(__name__)
+        app.config.update(PROFILING_ENABLED=True, PROFILE_TOKEN='token', PROFILE_DIR=directory)
+        profiler.init_app(app)
+        
+        @app.route('/async-view')
+        async def async_view():
+            await asyncio.sleep(0)
+            return str(await run_in_app_context(app, blocking_lookup))
+        
+        with app.test_client() as client:
+            response = client.get('/async-view?profile=cpu', headers={'X-Profile-Token': 'token'})
+        assert response.status_code == 200
+        stats = pstats.Stats(os.path.join(directory, response.headers['X-Profile-Id'] + '.prof'))
+        functions = {name for _, _, name in stats.stats}
+        assert {'async_view', 'blocking_lookup'} <= functions
+    print("✅ Profiling works")
+
+def test_tracing():
+    """Test span nesting and export"""
+    from tracing import Tracer
+    
+    class MemoryExporter:
+        def __init__(self):
+            self.spans = []
+        
+        def export(self, span):
+            self.spans.append(span)
+    
+    exporter = MemoryExporter()
+    tracer = Tracer()
+    tracer.configure(enabled=True, exporter=exporter)
+    
+    with tracer.span('request') as root:
+        with tracer.span('supabase.get_entries_for_ml'):
+            pass
+        try:
+            with tracer.span('ml.train_model'):
+                raise ValueError('boom')
+        except ValueError:
+            pass
+    
+    child, failed, parent = exporter.spans
+    assert parent is root and parent.parent_id is None
+    assert child.trace_id == failed.trace_id == root.trace_id
+    assert child.parent_id == failed.parent_id == root.span_id
+    assert failed.status == 'error' and 'boom' in failed.error
+    print("✅ Tracing works")
+
+def test_health_checks():
+    """Test cached and deep health checks"""
+    from app import create_app
+    from health_monitor import HealthProber
+    
+    # Unprobed components are unknown, and a deep probe runs the deep variant of a check
+    prober = HealthProber({'db': lambda: True}, deep_checks={'db': lambda: False})
+    assert prober.snapshot()['db']['healthy'] is None
+    assert prober.probe_all()['db']['healthy'] is True
+    assert prober.probe_all(deep=True)['db']['healthy'] is False
+    
+    app = create_app()
+    
+    with app.test_client() as client:
+        response = client.get('/health')
+        assert response.status_code == 200
+        data = response.get_json()
+        assert set(data['components']) == {'supabase', 'local_db'}
+        # Passed through as-is, so a component not probed yet is null rather than false
+        assert data['local_db'] is data['components']['local_db']['healthy']
+        assert data['supabase'] is data['components']['supabase']['healthy']
+        
+        response = client.get('/health/deep')
+        assert response.status_code in [200, 503]
+        components = response.get_json()['components']
+        assert components['local_db']['healthy'] is True
+        assert components['local_db']['latency_ms'] is not None
+        
+        assert 'supabase_breaker' in response.get_json()
+        
+        # The cached endpoint now serves the results of the forced probe
+        assert client.get('/health').get_json()['local_db'] is True
+    print("✅ Health checks work")
+
+def test_deferred_model_loading():
+    """Test that the model loads off the startup path and /ready reports it"""
+    import threading
+    from ml_model import DiseaseRiskPredictor
+    from warmup import WarmUp
+    
+    predictor = DiseaseRiskPredictor(load=False)
+    assert not predictor.is_loaded and predictor.model is None
+    predictor.load_in_background().join(30)
+    assert predictor.is_loaded
+    
+    release = threading.Event()
+    warmup = WarmUp({'slow': lambda: release.wait(10), 'broken': lambda: 1 / 0})
+    warmup.ensure_started()
+    assert not warmup.ready and warmup.snapshot()['slow'] is None
+    release.set()
+    warmup._done.wait(10)
+    assert warmup.ready
+    assert warmup.snapshot()['broken']['error'] is not None
+    
+    from app import create_app
+    app = create_app()
+    with app.test_client() as client:
+        response = client.get('/ready')
+        assert response.status_code in [200, 503]
+        assert {'model', 'imports'} <= set(response.get_json()['steps'])
+
+    # Importing the app leaves the heavy modules for later (checked in a fresh interpreter)
+    import subprocess
+    heavy = ['pyarrow', 'numpy', 'pandas', 'httpx', 'sklearn']
+    loaded = subprocess.run(
+        [sys.executable, '-c', f"import sys, app; print([m for m in {heavy!r} if m in sys.modules])"],
+        capture_output=True, text=True, env=dict(os.environ, MODEL_LOADING='lazy'),
+        cwd=os.path.dirname(os.path.abspath(__file__))
+    ).stdout.strip().splitlines()[-1]
+    assert loaded == '[]', loaded
+    print("✅ Deferred model loading works")
+
+def test_model_reload():
+    """Test that a worker picks up a model file written by another worker"""
+    import shutil
+    import tempfile
+    from ml_model import DiseaseRiskPredictor, ModelSnapshot
+    from model_watcher import ModelWatcher
+    
+    workdir = tempfile.mkdtemp()
+    try:
+        writer = DiseaseRiskPredictor(load=False)
+        reader = DiseaseRiskPredictor(load=False)
+        writer.model_path = reader.model_path = os.path.join(workdir, 'model.pkl')
+        reader.ensure_loaded()
+        assert not reader.reload_if_changed()
+        
+        writer.ensure_loaded()
+        writer.save_model(ModelSnapshot(version='v2'))
+        assert not writer.reload_if_changed()  # its own write
+        assert not reader.reload_if_changed(min_interval=60)  # throttled
+        reader._last_reload_check = 0.0
+        assert reader.reload_if_changed(min_interval=60)
+        assert reader.model_version == 'v2'
+        assert not reader.reload_if_changed()
+        
+        writer.save_model(ModelSnapshot(version='v3'))
+        assert ModelWatcher(reader).check() and reader.model_version == 'v3'
+        assert os.listdir(workdir) == ['model.pkl']  # no temporary files left behind
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    # Creating the app (in a preloading master) starts no watcher; each worker starts its own
+    import threading
+    from app import create_app
+
+    def watchers(name='model-watcher'):
+        return sum(thread.name == name for thread in threading.enumerate())
+    before, detectors = watchers(), watchers('outbreak-detector')
+    app = create_app()
+    assert watchers() == before and watchers('outbreak-detector') == detectors
+    assert {'ModelWatcher', 'OutbreakDetector'} <= {type(getattr(task, '__self__', None)).__name__
+                                                    for task in app.extensions['worker_tasks']}
+    with app.test_client() as client:
+        client.get('/health')
+    assert watchers() == before + 1 and watchers('outbreak-detector') == detectors + 1
+    print("✅ Model reload works")
+
+def test_model_snapshots():
+    """Test immutable snapshots, unknown diseases and the training center"""
+    from datetime import datetime
+    import pandas as pd
+    from ml_model import DiseaseRiskPredictor, ModelSnapshot
+    
+    try:
+        ModelSnapshot().version = 'x'
+        assert False, "snapshots must be immutable"
+    except AttributeError:
+        pass
+    
+    predictor = DiseaseRiskPredictor()
+    snapshot = predictor.snapshot
+    if snapshot.is_trained:
+        before = snapshot.disease_encoder.classes_.copy()
+        # A disease the encoder has never seen no longer breaks prediction or refits the encoder
+        point = pd.DataFrame({'latitude': [13.08], 'longitude': [80.27], 'patient_age': [35],
+                              'disease_name': ['zika'], 'occurrence_date': [datetime.now()]})
+        assert len(predictor.prepare_features(point, snapshot)) == 1
+        assert list(snapshot.disease_encoder.classes_) == list(before)
+    
+    training = pd.DataFrame({'latitude': [13.0, 13.2, 13.1], 'longitude': [80.0, 80.4, 80.2],
+                             'patient_age': [30, 40, 50], 'disease_name': ['dengue', 'zika', 'other'],
+                             'occurrence_date': [datetime.now()] * 3})
+    encoding = predictor._fit_encoding(training)
+    assert 'zika' in encoding.disease_encoder.classes_
+    # A single prediction point is measured from the training center, not from itself
+    far_point = training.iloc[[0]].assign(latitude=14.0)
+    proxy = predictor.prepare_features(far_point, encoding)['population_density_proxy'].iloc[0]
+    assert proxy < 0.1
+    print("✅ Model snapshots work")
+
+def test_per_disease_models():
+    """Test per-disease training, routing with global fallback, and reloading from disk"""
+    import shutil
+    import tempfile
+    from ml_model import DiseaseRiskPredictor
+    
+    workdir = tempfile.mkdtemp()
+    try:
+        # No database here, so this trains on the 20 generated sample entries over 5
+        # diseases: at least one disease has 4 of them
+        trainer = DiseaseRiskPredictor(load=False, per_disease=True, processes=1, min_disease_rows=4)
+        trainer.model_path = os.path.join(workdir, 'model.pkl')
+        assert trainer.train_model()
+        snapshot = trainer.snapshot
+        assert snapshot.disease_models, "expected per-disease models"
+        disease = sorted(snapshot.disease_models)[0]
+        assert snapshot.for_disease(disease) is snapshot.disease_models[disease]
+        assert snapshot.for_disease('no-such-disease') is snapshot
+        assert all(m.version == snapshot.version for m in snapshot.disease_models.values())
+        assert len(trainer.predict_risk_areas(13.08, 80.27, disease, radius_km=2)) > 0
+        
+        assert trainer.disease_model_path('Hepatitis A') != trainer.disease_model_path('hepatitis_a')
+        
+        reader = DiseaseRiskPredictor(load=False)
+        reader.model_path = trainer.model_path
+        reader.ensure_loaded()
+        assert sorted(reader.snapshot.disease_models) == sorted(snapshot.disease_models)
+        assert reader.snapshot.for_disease(disease).is_trained
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    print("✅ Per-disease models work")
+
+def test_online_model():
+    """Test the online backend learning from new entries and the backend factory"""
+    import shutil
+    import tempfile
+    from ml_model import DiseaseRiskPredictor, create_predictor
+    import numpy as np
+    from online_model import OnlineRiskPredictor
+    
+    assert type(create_predictor('forest', load=False)) is DiseaseRiskPredictor
+    try:
+        create_predictor('bogus', load=False)
+        assert False, "unknown backends must be rejected"
+    except ValueError:
+        pass
+    
+    workdir = tempfile.mkdtemp()
+    try:
+        predictor = create_predictor('online', load=False, per_disease=True, processes=1, min_disease_rows=4)
+        assert isinstance(predictor, OnlineRiskPredictor)
+        predictor.model_path = os.path.join(workdir, 'online.pkl')
+        entry = {'disease_type': 'dengue', 'age': 8, 'latitude': 13.08, 'longitude': 80.27,
+                 'created_at': '2024-08-01T10:00:00'}
+        assert predictor.update([entry]) == 0  # nothing trained yet
+        assert predictor.train_model()
+        
+        before = predictor.snapshot
+        assert predictor.update([entry, dict(entry, latitude=None)]) == 1
+        after = predictor.snapshot
+        assert after is not before and after.model is not before.model  # old snapshot untouched
+        assert after.version == f"{before.version}+1" and after.metrics['online_updates'] == 1
+        assert not np.allclose(after.model.coef_, before.model.coef_)
+        assert predictor.update([entry]) == 1 and predictor.model_version == f"{before.version}+2"
+
+        # A retrain swapped in while an update is being computed is updated, not overwritten
+        fields = {name: getattr(before, name) for name in before.__slots__}
+        retrained = before.__class__(**dict(fields, version='retrained', metrics={}))
+        prepare_features = predictor.prepare_features
+
+        def retrain_meanwhile(data, snapshot):
+            predictor.prepare_features = prepare_features
+            predictor._swap_snapshot(retrained)
+            return prepare_features(data, snapshot)
+        predictor.prepare_features = retrain_meanwhile
+        assert predictor.update([entry]) == 1
+        assert predictor.model_version == 'retrained+1'
+        assert not predictor._swap_snapshot(before, expected=retrained)
+
+        risk_areas = predictor.predict_risk_areas(13.08, 80.27, 'dengue', radius_km=2)
+        assert all(0 <= area['risk_score'] <= 1 for area in risk_areas)
+        assert DiseaseRiskPredictor(load=False).update([entry]) == 0
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    print("✅ Online model works")
+
+def test_training_sample():
+    """Test the stratified reservoir and training on it incrementally"""
+    import shutil
+    import tempfile
+    from datetime import datetime, timedelta
+    from ml_model import DiseaseRiskPredictor
+    from training_sample import StratifiedReservoir
+    
+    now = datetime.now()
+    def entries(first_id, count, disease, days_ago):
+        return [{'id': first_id + i, 'disease_type': disease, 'age': 30, 'latitude': 13.0 + i * 1e-4,
+                 'longitude': 80.2, 'created_at': (now - timedelta(days=days_ago)).isoformat()}
+                for i in range(count)]
+    
+    reservoir = StratifiedReservoir(size_per_disease=50, half_life_days=30, seed=1)
+    reservoir.add(entries(1, 500, 'dengue', 365) + entries(501, 20, 'malaria', 365))
+    reservoir.add(entries(521, 500, 'dengue', 0))
+    assert reservoir.counts() == {'dengue': 50, 'malaria': 20}  # bounded per disease, rare ones kept
+    assert reservoir.last_id == 1020 and reservoir.seen == 1020
+    recent = sum(entry['occurrence_date'] >= (now - timedelta(days=1)).isoformat()
+                 for entry in reservoir.sample() if entry['disease_name'] == 'dengue')
+    assert recent >= 45, recent  # a year-old entry weighs 2**-12 of a new one
+    
+    class SinceSource:
+        def __init__(self, rows):
+            self.rows, self.calls = rows, []
+        def get_entries_since(self, last_id, limit=100):
+            self.calls.append(last_id)
+            return [row for row in self.rows if row['id'] > last_id][:limit]
+    
+    workdir = tempfile.mkdtemp()
+    try:
+        predictor = DiseaseRiskPredictor(load=False, sample_per_disease=40)
+        predictor.model_path = os.path.join(workdir, 'model.pkl')
+        source = SinceSource(entries(1, 1500, 'dengue', 10) + entries(1501, 30, 'malaria', 5))
+        assert predictor.train_model(source)
+        assert predictor.metrics['training_rows'] == 70 and predictor.metrics['sampled_from'] == 1530
+        
+        # A later run (here in another process) only fetches what was added since
+        source.rows += entries(1531, 10, 'malaria', 0)
+        restarted = DiseaseRiskPredictor(load=False, sample_per_disease=40)
+        restarted.model_path = predictor.model_path
+        source.calls.clear()
+        assert restarted.train_model(source)
+        assert source.calls[0] == 1530 and restarted.reservoir.counts() == {'dengue': 40, 'malaria': 40}
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    print("✅ Training sample works")
+
+def test_kde_model():
+    """Test case-density risk: hotspots, time decay, unknown diseases and reloading"""
+    import shutil
+    import tempfile
+    from datetime import datetime, timedelta
+    import numpy as np
+    import pandas as pd
+    from kde_model import KDERiskPredictor
+    from ml_model import create_predictor
+    
+    rng = np.random.default_rng(3)
+    now = datetime.now()
+    cluster = [{'disease_type': 'dengue', 'latitude': 13.08 + rng.normal(0, 0.002),
+                'longitude': 80.27 + rng.normal(0, 0.002), 'created_at': (now - timedelta(days=2)).isoformat()}
+               for _ in range(300)]
+    stale = [{'disease_type': 'dengue', 'latitude': 13.30, 'longitude': 80.10,
+              'created_at': (now - timedelta(days=400)).isoformat()}] * 50
+    
+    class Source:
+        def get_entries_for_ml(self):
+            return cluster + stale
+    
+    workdir = tempfile.mkdtemp()
+    try:
+        predictor = create_predictor('kde', load=False, half_life_days=7, window_days=90)
+        assert isinstance(predictor, KDERiskPredictor)
+        predictor.model_path = os.path.join(workdir, 'kde.pkl')
+        assert predictor.train_model(Source())
+        assert predictor.metrics['cases'] == 300  # stale cases are outside the window
+        
+        index = predictor.snapshot.model
+        hot, near, far, stale_spot = index.risk('dengue', [13.08, 13.09, 13.2, 13.30], [80.27, 80.27, 80.27, 80.10])
+        assert hot > 0.5 and hot > near > far and far < 0.01 and stale_spot == 0
+        assert not index.risk('malaria', [13.08], [80.27]).any()
+        later = index.risk('dengue', [13.08], [80.27], at=index.built_at + pd.Timedelta(days=14))[0]
+        assert later < hot  # cases age between rebuilds
+        
+        risk_areas = predictor.predict_risk_areas(13.08, 80.27, 'dengue')
+        assert len(risk_areas) == 4 and all(0 <= area['risk_score'] <= 1 for area in risk_areas)
+        
+        reader = KDERiskPredictor(load=False)
+        reader.model_path = predictor.model_path
+        reader.ensure_loaded()
+        assert reader.model_version == predictor.model_version
+        assert abs(reader.snapshot.model.risk('dengue', [13.08], [80.27])[0] - hot) < 1e-6
+
+        # No recent cases means no risk, not the generic fallback zones
+        class StaleSource:
+            def get_entries_for_ml(self):
+                return stale
+        quiet = KDERiskPredictor(load=False)
+        quiet.model_path = os.path.join(workdir, 'quiet.pkl')
+        assert quiet.train_model(StaleSource()) and quiet.metrics['cases'] == 0
+        assert [area['risk_score'] for area in quiet.predict_risk_areas(13.30, 80.10, 'dengue')] == [0.0] * 4
+        untrained = KDERiskPredictor(load=False)
+        untrained.model_path = os.path.join(workdir, 'missing.pkl')
+        untrained.train_model = lambda supabase_manager=None: False
+        assert all(area['risk_score'] == 0 for area in untrained.predict_risk_areas(13.08, 80.27, 'dengue'))
+
+        from config import parse_bandwidths
+        assert parse_bandwidths('dengue=0.3, tuberculosis=3') == {'dengue': 0.3, 'tuberculosis': 3.0}
+        assert parse_bandwidths('dengue=abc') == parse_bandwidths('dengue') == parse_bandwidths('dengue=-1') == {}
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    print("✅ KDE model works")
+
+def test_outbreak_clusters():
+    """Test incremental outbreak clusters against DBSCAN on the full set, expiry and the API"""
+    import time as clock
+    from datetime import datetime, timedelta
+    import numpy as np
+    from sklearn.cluster import DBSCAN
+    from app import create_app
+    from outbreaks import EARTH_RADIUS_KM, Case, DiseaseClusters, OutbreakDetector, distance_km
+    
+    rng = np.random.default_rng(7)
+    # Neighbours match great-circle distances, also far from the grid's reference latitude
+    grid = DiseaseClusters(eps_km=1.0, min_cases=3)
+    grid.add(Case(0, 'dengue', 8.5, 77.0, 0.0))
+    points = [(28.7 + rng.uniform(0, 0.02), 77.1 + rng.uniform(0, 0.02)) for _ in range(60)]
+    points.append((28.7, 77.1 + 0.95 / (111.195 * np.cos(np.radians(28.7)))))  # 0.95 km east of (28.7, 77.1)
+    cases = [grid.add(Case(i, 'dengue', lat, lng, 0.0)) or grid.cases[i] for i, (lat, lng) in enumerate(points, 1)]
+    for case in cases:
+        expected = {other.id for other in cases
+                    if other is not case and distance_km(case.lat, case.lng, other.lat, other.lng) <= 1.0}
+        assert {other.id for other in grid.neighbors(case)} == expected
+    assert abs(distance_km(28.7, 77.1, *points[-1]) - 0.95) < 0.001
+    
+    now = datetime.utcnow()
+    rows = []
+    for lat, lng, count, spread in [(13.08, 80.27, 60, 0.004), (13.12, 80.21, 25, 0.003),
+                                    (19.07, 72.87, 40, 0.006), (13.0, 80.0, 40, 0.3)]:
+        for _ in range(count):
+            rows.append({'disease_type': 'dengue', 'latitude': lat + rng.normal(0, spread),
+                         'longitude': lng + rng.normal(0, spread),
+                         'created_at': (now - timedelta(days=float(rng.uniform(0, 20)))).isoformat()})
+    rng.shuffle(rows)
+    for entry_id, entry in enumerate(rows, 1):
+        entry['id'] = entry_id
+    
+    events = []
+    detector = OutbreakDetector(
+        load_recent=lambda since: rows[:100],
+        get_entries_since=lambda last_id: [row for row in rows if row['id'] > last_id][:100],
+        eps_km=0.8, min_cases=5, window_days=14, on_change=events.append
+    )
+    
+    def assert_matches_dbscan():
+        grid = detector._diseases['dengue']
+        cases = list(grid.cases.values())
+        reference = DBSCAN(eps=0.8 / EARTH_RADIUS_KM, min_samples=5, metric='haversine', algorithm='ball_tree').fit(
+            np.radians([(case.lat, case.lng) for case in cases]))
+        expected_cores = {cases[i].id for i in reference.core_sample_indices_}
+        assert set(grid.labels) == expected_cores
+        # Cores share a cluster exactly when DBSCAN puts them in the same one
+        expected = {frozenset(case.id for case, label in zip(cases, reference.labels_)
+                              if label == cluster and case.id in expected_cores)
+                    for cluster in set(reference.labels_) - {-1}}
+        assert {frozenset(core_ids) for core_ids in grid.clusters.values()} == expected
+    
+    detector.refresh()
+    assert detector.last_id == len(rows)
+    assert detector.tracked_cases() == sum(
+        row['created_at'] >= (now - timedelta(days=14)).isoformat() for row in rows)
+    assert_matches_dbscan()
+    
+    clusters = detector.check()
+    assert not events  # the first check only records the clusters
+    assert clusters and clusters[0]['size'] >= clusters[-1]['size']
+    top = clusters[0]
+    assert {'size', 'centroid', 'growth_rate', 'radius_km', 'recent_cases'} <= set(top)
+    assert abs(top['centroid']['lat'] - 13.08) < 0.01 or abs(top['centroid']['lat'] - 19.07) < 0.01
+    
+    # New cases next to a cluster make it grow; far-away noise does not
+    rows.extend({'id': len(rows) + i + 1, 'disease_type': 'dengue', 'latitude': 13.12, 'longitude': 80.21,
+                 'created_at': now.isoformat()} for i in range(5))
+    detector.check()
+    assert [event['status'] for event in events] in (['growing'], ['new'])
+    assert_matches_dbscan()
+    
+    # Five days later older cases have aged out; only the clusters they were in are re-linked
+    later = clock.time() / 86400 + 5
+    detector._today = lambda: later
+    detector.expire()
+    assert all(case.day >= later - 14 for case in detector._diseases['dengue'].cases.values())
+    assert_matches_dbscan()
+    
+    app = create_app()
+    with app.test_client() as client:
+        response = client.get('/api/clusters/outbreaks?disease=dengue')
+        assert response.status_code == 200
+        assert {'clusters', 'tracked_cases', 'eps_km', 'min_cases'} <= set(response.get_json())
+        assert client.get('/api/clusters/outbreaks?min_size=x').status_code == 400
+    print("✅ Outbreak clusters work")
+
+def test_circuit_breaker():
+    """Test breaker opening, deadlines and half-open probing"""
+    import time
+    from circuit_breaker import CircuitBreaker, CircuitOpenError, CallDeadlineExceeded
+    
+    breaker = CircuitBreaker('test', failure_threshold=2, reset_timeout=0.1, deadline=0.05)
+    calls = []
+    
+    def failing():
+        calls.append(1)
+        raise IOError('down')
+    
+    for _ in range(2):
+        try:
+            breaker.call(failing)
+        except IOError:
+            pass
+    assert breaker.state == 'open'
+    
+    # While open, the dependency is not called at all
+    try:
+        breaker.call(failing)
+        assert False, "open breaker should reject calls"
+    except CircuitOpenError:
+        pass
+    assert len(calls) == 2
+    
+    # A health probe still reaches the dependency, under the deadline, and leaves the breaker open
+    assert breaker.probe(lambda: 'up') == 'up'
+    try:
+        breaker.probe(time.sleep, 0.2)
+        assert False, "slow probe should exceed its deadline"
+    except CallDeadlineExceeded:
+        pass
+    assert breaker.state == 'open'
+    
+    # After the reset timeout one slow probe is let through and re-opens it
+    time.sleep(0.15)
+    try:
+        breaker.call(time.sleep, 0.2)
+        assert False, "slow call should exceed its deadline"
+    except CallDeadlineExceeded:
+        pass
+    assert breaker.state == 'open'
+    
+    # A successful probe closes it again
+    time.sleep(0.15)
+    assert breaker.call(lambda: 'ok') == 'ok'
+    assert breaker.state == 'closed'
+
+    # Time queued for an executor thread is not part of the deadline and is no failure
+    import threading
+    from circuit_breaker import CallQueueTimeout
+    busy = CircuitBreaker('busy', failure_threshold=1, deadline=0.2, max_concurrent_calls=1,
+                          queue_timeout=0.5)
+    slow = threading.Thread(target=busy.call, args=(time.sleep, 0.15))
+    slow.start()
+    time.sleep(0.02)
+    assert busy.call(time.sleep, 0.1) is None
+    slow.join()
+    assert busy.state == 'closed'
+
+    stuck = CircuitBreaker('stuck', failure_threshold=1, deadline=0.2, max_concurrent_calls=1,
+                           queue_timeout=0.05)
+    slow = threading.Thread(target=stuck.call, args=(time.sleep, 0.15))
+    slow.start()
+    time.sleep(0.02)
+    try:
+        stuck.call(lambda: 'ok')
+        assert False, "call should time out waiting for a thread"
+    except CallQueueTimeout:
+        pass
+    slow.join()
+    assert stuck.state == 'closed'
+
+    # While a half-open probe is in flight, other callers are told to fall back
+    probing = CircuitBreaker('probing', failure_threshold=1, reset_timeout=0.05)
+    try:
+        probing.call(failing)
+    except IOError:
+        pass
+    assert not probing.accepting_calls
+    time.sleep(0.06)
+    assert probing.accepting_calls
+    assert probing.allow_request()
+    assert probing.state == 'half_open' and not probing.accepting_calls
+    print("✅ Circuit breaker works")
+
+def test_http_pool():
+    """Test the pooled transport's per-process client and connection metrics"""
+    from http_pool import PooledHttpClient, ConnectionTracer, CONNECTIONS_OPENED, CONNECTIONS_REUSED
+    
+    pool = PooledHttpClient('test', max_connections=4)
+    client = pool.get()
+    assert pool.get() is client
+    assert pool.open_connections() == 0
+    
+    # A request on a new connection, then one on a kept-alive connection
+    opened, reused = CONNECTIONS_OPENED.value(pool='test'), CONNECTIONS_REUSED.value(pool='test')
+    tracer = ConnectionTracer('test')
+    tracer('connection.connect_tcp.started', {})
+    tracer('http11.send_request_headers.started', {})
+    ConnectionTracer('test')('http11.send_request_headers.started', {})
+    assert CONNECTIONS_OPENED.value(pool='test') == opened + 1
+    assert CONNECTIONS_REUSED.value(pool='test') == reused + 1
+    
+    # A process that did not build the client (e.g. a forked worker) gets its own
+    pool._pid = -1
+    assert pool.get() is not client
+    pool.close()
+    client.close()
+    print("✅ HTTP pool works")
+
+def test_async_data():
+    """Test that independent Supabase calls overlap when gathered"""
+    import asyncio
+    import time
+    from async_data import AsyncSupabaseManager
+    
+    class SlowManager:
+        def get_disease_counts(self):
+            time.sleep(0.2)
+            return {'dengue': 2}
+        
+        def get_disease_entries(self, limit=100, offset=0):
+            time.sleep(0.2)
+            return [{'id': 1}][:limit]
+    
+    async def load(manager):
+        return await asyncio.gather(manager.get_disease_counts(), manager.get_disease_entries(limit=10))
+    
+    started = time.perf_counter()
+    counts, entries = asyncio.run(load(AsyncSupabaseManager(SlowManager())))
+    elapsed = time.perf_counter() - started
+    assert counts == {'dengue': 2} and entries == [{'id': 1}]
+    assert elapsed < 0.35, f"calls ran sequentially ({elapsed:.2f}s)"
+    print("✅ Async data access works")
+
+def test_single_flight():
+    """Test that concurrent identical calls share one computation, in and across workers"""
+    import tempfile
+    import threading
+    import time
+    from single_flight import SingleFlight
+    
+    calls = []
+    
+    def compute(value):
+        calls.append(value)
+        time.sleep(0.2)
+        return {'value': value}
+    
+    with tempfile.TemporaryDirectory() as lock_dir:
+        # Two instances sharing a lock directory stand in for two gunicorn workers
+        workers = [SingleFlight('test', lock_dir=lock_dir), SingleFlight('test', lock_dir=lock_dir)]
+        results = []
+        threads = [
+            threading.Thread(target=lambda w=worker: results.append(w.do(('key', 1), compute, 1)))
+            for worker in workers for _ in range(3)
+        ]
+        for thread in threads:
+            thread.start()
+            time.sleep(0.01)
+        for thread in threads:
+            thread.join()
+        
+        assert calls == [1], f"expected one computation, got {len(calls)}"
+        assert results == [{'value': 1}] * 6
+        
+        # Once nothing is in flight, the next call computes again
+        workers[0].do(('key', 1), compute, 1)
+        assert len(calls) == 2
+    
+    # Followers see the leader's exception
+    flight = SingleFlight('test-errors')
+    errors = []
+    
+    def fail():
+        time.sleep(0.1)
+        raise ValueError('boom')
+    
+    def call():
+        try:
+            flight.do('key', fail)
+        except ValueError as e:
+            errors.append(str(e))
+    threads = [threading.Thread(target=call) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == ['boom'] * 3
+    print("✅ Single-flight coalescing works")
+
+def test_admission_control():
+    """Test the heavy-work limit, priority queue, queue budget and fast 503s"""
+    import threading
+    import time
+    from admission import AdmissionController, Overloaded, heavy_capacity
+    
+    assert heavy_capacity(32, 0.25, 2) == 22
+    
+    controller = AdmissionController('test', max_concurrent=1, max_waiting=2, queue_budget=1.0)
+    controller.acquire()
+    order = []
+    
+    def wait_for_slot(name, priority):
+        controller.acquire(priority)
+        order.append(name)
+        controller.release()
+    
+    low = threading.Thread(target=wait_for_slot, args=('low', 5))
+    high = threading.Thread(target=wait_for_slot, args=('high', 0))
+    low.start()
+    time.sleep(0.05)
+    high.start()
+    time.sleep(0.05)
+    
+    # The queue is full: a third request is rejected at once with a Retry-After hint
+    started = time.perf_counter()
+    try:
+        controller.acquire()
+        assert False, "full queue should reject"
+    except Overloaded as e:
+        assert e.retry_after >= 1
+    assert time.perf_counter() - started < 0.1
+    
+    # Releasing hands the slot to the higher-priority waiter first
+    controller.release()
+    low.join()
+    high.join()
+    assert order == ['high', 'low']
+    
+    # A waiter that exceeds its budget gives up
+    controller.acquire()
+    try:
+        controller.acquire(budget=0.05)
+        assert False, "budget should expire"
+    except Overloaded:
+        pass
+    controller.release()
+    assert controller.call(lambda: 'done') == 'done'
+
+    # Requests waiting on a shared computation count against the queue and its budget
+    from single_flight import SingleFlight
+    flight = SingleFlight('test-hold', hold=lambda wait: controller.hold(wait, budget=0.3))
+    outcomes = []
+
+    def coalesced():
+        try:
+            outcomes.append(flight.do('key', time.sleep, 0.5))
+        except Overloaded:
+            outcomes.append('overloaded')
+    controller.acquire()
+    threads = [threading.Thread(target=coalesced) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.02)
+    try:
+        controller.acquire()
+        assert False, "holders fill the queue"
+    except Overloaded:
+        pass
+    controller.release()
+    for thread in threads:
+        thread.join()
+    # The leader finishes; two followers fit in the queue and time out, the third is turned away
+    assert sorted(outcomes, key=str) == [None] + ['overloaded'] * 3
+    print("✅ Admission control works")
+
+def test_loadtest_stubs():
+    """Test that the load-test stand-ins speak enough PostgREST and Nominatim for the app"""
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'loadtest'))
+    from stubs import start_stubs
+    from geopy.geocoders import Nominatim
+    from supabase_config import SupabaseManager
+    
+    postgrest, geocoder, env = start_stubs(rows=50, latency=0, jitter=0, geocoder_latency=0)
+    saved = {name: os.environ.get(name) for name in env}
+    os.environ.update(env)
+    try:
+        manager = SupabaseManager()
+        assert manager.get_latest_entry_marker()['count'] == 50
+        assert [entry['id'] for entry in manager.get_entries_since(45)] == [46, 47, 48, 49, 50]
+        assert len(manager.get_disease_entries(limit=10)) == 10
+        assert manager.get_disease_entry_by_id(7)['id'] == 7
+        created = manager.create_disease_entry({'disease_type': 'dengue', 'age': 30, 'address': 'x'})
+        assert created['id'] == 51
+        
+        geolocator = Nominatim(user_agent='test', domain=env['NOMINATIM_DOMAIN'], scheme='http')
+        location = geolocator.geocode('1 Example Street, Chennai')
+        assert location is not None and abs(location.latitude - 13.08) < 0.1
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        postgrest.shutdown()
+        geocoder.shutdown()
+    print("✅ Load-test stubs work")
+
+def test_benchmark_compare():
+    """Test that the benchmark comparison flags slowdowns beyond the threshold"""
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks'))
+    from compare import compare_reports
+    
+    baseline = {'results': [
+        {'name': 'train_model', 'rows': 1000, 'median_s': 1.0},
+        {'name': 'load_model', 'rows': 1000, 'median_s': 0.010}
+    ]}
+    current = {'results': [
+        {'name': 'train_model', 'rows': 1000, 'median_s': 1.1},
+        {'name': 'load_model', 'rows': 1000, 'median_s': 0.015},
+        {'name': 'create_risk_map', 'rows': 1000, 'median_s': 0.02}
+    ]}
+    comparison = compare_reports(baseline, current, threshold=0.2)
+    statuses = {row['name']: row['status'] for row in comparison['rows']}
+    assert statuses == {'train_model': 'ok', 'load_model': 'REGRESSION', 'create_risk_map': 'new'}
+    assert [row['name'] for row in comparison['regressions']] == ['load_model']
+    print("✅ Benchmark comparison works")
+
+def test_sample_data_generator():
+    """Test the vectorized sample data generator and bulk loader"""
+    from datetime import datetime
+    from sqlalchemy import create_engine, func, select
+    from sqlalchemy.orm import Session
+    from database_models import DiseaseEntry
+    from sample_data import AGE_GROUPS, DISEASE_WEIGHTS, bulk_load, generate_entries
+    
+    frame = generate_entries(20000, seed=7)
+    assert len(frame) == 20000
+    assert set(frame['disease_name']) <= set(DISEASE_WEIGHTS)
+    assert frame['patient_age'].between(AGE_GROUPS[0][0], AGE_GROUPS[-1][1]).all()
+    assert (frame['created_at'] >= frame['occurrence_date']).all()
+    # Dengue peaks after the monsoon
+    dengue_months = frame.loc[frame['disease_name'] == 'dengue', 'occurrence_date'].dt.month
+    assert (dengue_months == 9).sum() > 2 * (dengue_months == 3).sum()
+    # Same seed, same data
+    assert generate_entries(100, seed=7, end=datetime(2024, 1, 1)).equals(
+        generate_entries(100, seed=7, end=datetime(2024, 1, 1)))
+    
+    engine = create_engine('sqlite://')
+    DiseaseEntry.__table__.create(engine)
+    assert bulk_load(engine, frame, batch_size=5000, defer_indexes=True) == 20000
+    with Session(engine) as session:
+        assert session.scalar(select(func.count()).select_from(DiseaseEntry)) == 20000
+        entry = session.get(DiseaseEntry, 1)
+        assert entry.disease_name == frame['disease_name'][0]
+        assert entry.occurrence_date == frame['occurrence_date'][0].to_pydatetime()
+    print("✅ Sample data generator works")
+
 def main():
     """Main test function"""
     print("🚀 Disease Monitoring Portal - Comprehensive Test")
@@ -122,6 +1265,34 @@ def main():
     if not test_form_submission():
         return 1
     
+    # Test background reports
+    test_report_builder()
+    test_report_jobs()
+    test_risk_trends()
+    test_event_stream()
+    test_conditional_get()
+    test_entry_formats()
+    test_metrics()
+    test_profiling()
+    test_tracing()
+    test_health_checks()
+    test_deferred_model_loading()
+    test_model_reload()
+    test_model_snapshots()
+    test_per_disease_models()
+    test_online_model()
+    test_training_sample()
+    test_kde_model()
+    test_outbreak_clusters()
+    test_circuit_breaker()
+    test_http_pool()
+    test_async_data()
+    test_single_flight()
+    test_admission_control()
+    test_loadtest_stubs()
+    test_benchmark_compare()
+    test_sample_data_generator()
+    
     print("\n🎉 All tests passed!")
     print("\nYour Disease Monitoring Portal is working correctly!")
     print("\nTo run the app:")
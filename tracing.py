@@ -0,0 +1,245 @@
+"""
+Lightweight request-scoped tracing
+
+Spans nest through a context variable, carry W3C-compatible trace and span
+ids, and are exported as JSON lines to a local file (or the log) when they
+end. Log records get the current trace_id/span_id so log lines can be joined
+with the spans of the request that produced them. When tracing is disabled
+span() only checks a flag.
+"""
+import contextvars
+import json
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+logger = logging.getLogger(__name__)
+
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+class Span:
+    """A timed operation within a trace"""
+
+    __slots__ = ('name', 'trace_id', 'span_id', 'parent_id', 'attributes',
+                 'start_time', '_start', 'duration', 'status', 'error')
+
+    def __init__(self, name, trace_id, parent_id=None, attributes=None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.attributes = attributes or {}
+        self.start_time = time.time()
+        self._start = time.perf_counter()
+        self.duration = None
+        self.status = 'ok'
+        self.error = None
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'start_time': self.start_time,
+            'duration_ms': round(self.duration * 1000, 3) if self.duration is not None else None,
+            'status': self.status,
+            'error': self.error,
+            'attributes': self.attributes
+        }
+
+class JsonLinesExporter:
+    """Append finished spans to a local JSON-lines file"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+    def export(self, span):
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock:
+            with open(self.path, 'a') as f:
+                f.write(line + '\n')
+
+class LogExporter:
+    """Write finished spans to the log"""
+
+    def export(self, span):
+        logger.info(f"span {json.dumps(span.to_dict(), default=str)}")
+
+class Tracer:
+    """Creates spans and hands finished ones to an exporter"""
+
+    def __init__(self):
+        self.enabled = False
+        self.exporter = None
+
+    def configure(self, enabled=False, exporter=None):
+        self.enabled = bool(enabled) and exporter is not None
+        self.exporter = exporter
+
+    def start_span(self, name, trace_id=None, parent_id=None, **attributes):
+        """Start a span as a child of the current one and make it current"""
+        parent = _current_span.get()
+        if trace_id is None:
+            trace_id = parent.trace_id if parent else f"{random.getrandbits(128):032x}"
+            parent_id = parent.span_id if parent else None
+        span = Span(name, trace_id, parent_id, attributes)
+        token = _current_span.set(span)
+        return span, token
+
+    def end_span(self, span, token, error=None):
+        span.duration = time.perf_counter() - span._start
+        if error is not None:
+            span.status = 'error'
+            span.error = f"{type(error).__name__}: {error}"
+        try:
+            _current_span.reset(token)
+        except ValueError:
+            # Ended in a different context than it started (e.g. a streamed response)
+            _current_span.set(None)
+        try:
+            self.exporter.export(span)
+        except Exception as e:
+            logger.debug(f"Failed to export span {span.name}: {e}")
+
+    @contextmanager
+    def span(self, name, **attributes):
+        if not self.enabled:
+            yield None
+            return
+        span, token = self.start_span(name, **attributes)
+        try:
+            yield span
+        except BaseException as e:
+            self.end_span(span, token, error=e)
+            raise
+        else:
+            self.end_span(span, token)
+
+TRACER = Tracer()
+
+def span(name, **attributes):
+    """Context manager tracing a block as a child of the current span"""
+    return TRACER.span(name, **attributes)
+
+def traced(name):
+    """Decorator tracing every call of a function"""
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if not TRACER.enabled:
+                return function(*args, **kwargs)
+            with TRACER.span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def current_trace_ids():
+    current = _current_span.get()
+    if current is None:
+        return None, None
+    return current.trace_id, current.span_id
+
+class TraceContextFilter(logging.Filter):
+    """Add trace_id and span_id to every log record"""
+
+    def filter(self, record):
+        trace_id, span_id = current_trace_ids()
+        record.trace_id = trace_id or '-'
+        record.span_id = span_id or '-'
+        return True
+
+def parse_traceparent(header):
+    """Extract (trace_id, parent_span_id) from a W3C traceparent header"""
+    parts = (header or '').split('-')
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None, None
+    return parts[1], parts[2]
+
+def _instrument_sqlalchemy():
+    """Trace every SQL statement run through SQLAlchemy"""
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    @event.listens_for(Engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if TRACER.enabled:
+            context._trace_span = TRACER.start_span('sqlalchemy.query', statement=statement[:200])
+
+    @event.listens_for(Engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        traced_span = getattr(context, '_trace_span', None)
+        if traced_span is not None:
+            context._trace_span = None
+            TRACER.end_span(*traced_span)
+
+    @event.listens_for(Engine, 'handle_error')
+    def handle_error(exception_context):
+        context = exception_context.execution_context
+        traced_span = getattr(context, '_trace_span', None) if context is not None else None
+        if traced_span is not None:
+            context._trace_span = None
+            TRACER.end_span(*traced_span, error=exception_context.original_exception)
+
+_sqlalchemy_instrumented = False
+
+def init_app(app):
+    """Configure tracing from app.config and trace every request"""
+    global _sqlalchemy_instrumented
+    from flask import g, request
+
+    if not app.config.get('TRACING_ENABLED', False):
+        return
+
+    if app.config.get('TRACE_EXPORTER', 'file') == 'log':
+        exporter = LogExporter()
+    else:
+        exporter = JsonLinesExporter(
+            app.config.get('TRACE_FILE') or os.path.join(app.instance_path, 'traces.jsonl')
+        )
+    TRACER.configure(enabled=True, exporter=exporter)
+
+    if not _sqlalchemy_instrumented:
+        _instrument_sqlalchemy()
+        _sqlalchemy_instrumented = True
+
+    for handler in logging.getLogger().handlers:
+        if not any(isinstance(f, TraceContextFilter) for f in handler.filters):
+            handler.addFilter(TraceContextFilter())
+            handler.setFormatter(logging.Formatter(
+                '%(levelname)s:%(name)s:[trace=%(trace_id)s span=%(span_id)s] %(message)s'
+            ))
+
+    @app.before_request
+    def start_request_span():
+        trace_id, parent_id = parse_traceparent(request.headers.get('traceparent'))
+        route = request.url_rule.rule if request.url_rule else request.path
+        g.trace_span = TRACER.start_span(
+            f"{request.method} {route}", trace_id=trace_id, parent_id=parent_id,
+            path=request.path
+        )
+
+    @app.after_request
+    def tag_request_span(response):
+        traced_span = g.get('trace_span')
+        if traced_span is not None:
+            request_span = traced_span[0]
+            request_span.set_attribute('status', response.status_code)
+            response.headers['traceparent'] = f"00-{request_span.trace_id}-{request_span.span_id}-01"
+        return response
+
+    @app.teardown_request
+    def end_request_span(exc):
+        traced_span = g.pop('trace_span', None)
+        if traced_span is not None:
+            TRACER.end_span(*traced_span, error=exc)
@@ -0,0 +1,89 @@
+"""
+Bounded training sets: a recency-weighted reservoir per disease
+
+train_model used to train on every entry ever recorded, so training time
+grew with the history. A StratifiedReservoir keeps at most size_per_disease
+entries per disease and is maintained incrementally: each refresh offers it
+only the entries recorded since the last one (by id), so neither the fetch
+nor the fit grows with the history.
+
+Sampling is weighted reservoir sampling (Efraimidis-Spirakis A-Res) with
+weights that double every half_life_days of occurrence date. An entry's key
+is log(w) + Gumbel noise, which orders entries the same way as A-Res's
+u ** (1 / w); since log(w) is linear in time, keys computed on different
+days stay comparable and never overflow.
+"""
+import logging
+import math
+
+import numpy as np
+
+from ml_model import entries_to_dataframe
+
+logger = logging.getLogger(__name__)
+
+class StratifiedReservoir:
+    """Fixed-size, recency-weighted random sample of entries, kept per disease"""
+
+    def __init__(self, size_per_disease=5000, half_life_days=180.0, seed=None):
+        self.size_per_disease = size_per_disease
+        self.half_life_days = half_life_days
+        # Highest entry id offered so far, and which data source the ids come from
+        self.last_id = 0
+        self.source = None
+        self.seen = 0
+        self._strata = {}  # disease -> (keys, entries)
+        self._rng = np.random.default_rng(seed)
+
+    def __len__(self):
+        return sum(len(entries) for _, entries in self._strata.values())
+
+    def _keys(self, frame):
+        """A-Res keys: log weight (linear in occurrence day) plus Gumbel noise"""
+        import pandas as pd
+
+        dates = pd.to_datetime(frame['occurrence_date'], format='mixed', errors='coerce', utc=True)
+        # Undated entries count as recorded now
+        dates = dates.fillna(pd.Timestamp.now(tz='UTC'))
+        days = (dates - pd.Timestamp(0, tz='UTC')).dt.total_seconds().to_numpy() / 86400
+        rate = math.log(2) / self.half_life_days if self.half_life_days else 0.0
+        return rate * days - np.log(self._rng.standard_exponential(len(frame)))
+
+    def add(self, entries):
+        """Offer newly recorded entries (dicts or DiseaseEntry rows); returns how many were offered"""
+        if not entries:
+            return 0
+        ids = [entry.get('id') if isinstance(entry, dict) else getattr(entry, 'id', None)
+               for entry in entries]
+        ids = [entry_id for entry_id in ids if entry_id is not None]
+        if ids:
+            self.last_id = max(self.last_id, max(ids))
+
+        frame = entries_to_dataframe(entries).dropna(subset=['latitude', 'longitude'])
+        keys = self._keys(frame)
+        records = frame.to_dict('records')
+        diseases = frame['disease_name'].to_numpy()
+        for disease in frame['disease_name'].unique():
+            mask = diseases == disease
+            kept_keys, kept = self._strata.get(disease, (np.empty(0), []))
+            all_keys = np.concatenate([kept_keys, keys[mask]])
+            candidates = kept + [record for record, keep in zip(records, mask) if keep]
+            if len(candidates) > self.size_per_disease:
+                top = np.argpartition(all_keys, -self.size_per_disease)[-self.size_per_disease:]
+                all_keys, candidates = all_keys[top], [candidates[i] for i in top]
+            self._strata[disease] = (all_keys, candidates)
+        self.seen += len(frame)
+        return len(frame)
+
+    def sample(self):
+        """The entries currently in the reservoir, in the format entries_to_dataframe reads"""
+        return [entry for _, entries in self._strata.values() for entry in entries]
+
+    def counts(self):
+        return {disease: len(entries) for disease, (_, entries) in self._strata.items()}
+
+    def compatible(self, other):
+        """Whether other was built with the same settings from the same source"""
+        return (isinstance(other, StratifiedReservoir)
+                and (other.size_per_disease, other.half_life_days, other.source)
+                == (self.size_per_disease, self.half_life_days, self.source))
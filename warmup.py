@@ -0,0 +1,69 @@
+"""
+Background warm-up after startup
+
+Importing the app no longer imports sklearn, pandas, folium or the Supabase
+client, and the saved model is no longer unpickled in create_app. Instead a
+WarmUp runs those steps on a background thread once the worker starts, so it
+can accept connections right away; /ready reports 503 until they finish.
+Requests that need the model before then load it themselves (or wait for the
+load already in progress).
+"""
+import logging
+import os
+import threading
+import time
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+WARMUP_SECONDS = REGISTRY.gauge(
+    'warmup_step_seconds', 'Time each startup warm-up step took in this worker', ('step',)
+)
+
+class WarmUp:
+    """Runs named startup steps once per process and tracks whether they are done"""
+
+    def __init__(self, steps):
+        self.steps = steps
+        self._results = {}
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._pid = None
+
+    def ensure_started(self):
+        """Start the steps on a daemon thread, again in a forked child"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._results = {}
+                self._done = threading.Event()
+                self._pid = os.getpid()
+                threading.Thread(target=self.run, name='warmup', daemon=True).start()
+
+    def run(self):
+        """Run every step in order on the calling thread"""
+        self._pid = os.getpid()
+        for name, step in self.steps.items():
+            started = time.perf_counter()
+            error = None
+            try:
+                step()
+            except Exception as e:
+                error = str(e)
+                logger.warning(f"Warm-up step {name} failed: {e}")
+            elapsed = time.perf_counter() - started
+            WARMUP_SECONDS.set(elapsed, step=name)
+            with self._lock:
+                self._results[name] = {'seconds': round(elapsed, 3), 'error': error}
+        self._done.set()
+        logger.info(f"Warm-up finished in {sum(r['seconds'] for r in self._results.values()):.2f}s")
+
+    @property
+    def ready(self):
+        return self._done.is_set()
+
+    def snapshot(self):
+        """Per-step timings; steps that have not finished report None"""
+        with self._lock:
+            return {name: self._results.get(name) for name in self.steps}